@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 - 2013 Björn Larsson
+
+# This file is part of pytvdbapi.
+#
+# pytvdbapi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pytvdbapi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pytvdbapi.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compares the time used by the available XML backends to parse synthetic
+full series data, both building the element tree and using parse_xml, and
+building the records while the data is read using iterparse_xml.
+
+Usage: python benchmarks/parse_backends.py [repeat]
+"""
+
+from __future__ import absolute_import, print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pytvdbapi import xmlhelpers  # noqa: E402  # pylint: disable=C0413
+
+_EPISODE = """<Episode>
+<id>{id}</id>
+<Combined_episodenumber>{number}</Combined_episodenumber>
+<Combined_season>{season}</Combined_season>
+<Director>|Michael Cuesta|</Director>
+<EpisodeName>Episode &amp; {id}</EpisodeName>
+<EpisodeNumber>{number}</EpisodeNumber>
+<FirstAired>2006-10-{day:02d}</FirstAired>
+<GuestStars>|Geoff Pierson|Mark L. Young|</GuestStars>
+<IMDB_ID></IMDB_ID>
+<Language>en</Language>
+<Overview>At a murder scene, Dexter wonders if the killer is a copycat. {overview}</Overview>
+<ProductionCode>{season}{number:02d}</ProductionCode>
+<Rating>7.8</Rating>
+<RatingCount>118</RatingCount>
+<SeasonNumber>{season}</SeasonNumber>
+<Writer>Clyde Phillips</Writer>
+<absolute_number>{id}</absolute_number>
+<filename>episodes/79349/{id}.jpg</filename>
+<lastupdated>1365001430</lastupdated>
+<seasonid>{season}</seasonid>
+<seriesid>79349</seriesid>
+</Episode>
+"""
+
+_SERIES = """<?xml version="1.0" encoding="UTF-8" ?>
+<Data>
+<Series>
+<id>79349</id>
+<Actors>|Michael C. Hall|Jennifer Carpenter|</Actors>
+<FirstAired>2006-10-01</FirstAired>
+<Genre>|Drama|</Genre>
+<Rating>9.1</Rating>
+<SeriesName>Dexter</SeriesName>
+<zap2it_id>SH859795</zap2it_id>
+</Series>
+{episodes}</Data>
+"""
+
+
+def _document(episodes):
+    """Creates a series document with the given number of episodes"""
+    return _SERIES.format(episodes=''.join(
+        _EPISODE.format(id=i, season=i // 20 + 1, number=i % 20 + 1, day=i % 28 + 1,
+                        overview='Dexter. ' * (i % 10))
+        for i in range(episodes))).encode('utf-8')
+
+
+def _tree(data):
+    """Parses the data using the element tree"""
+    tree = xmlhelpers.generate_tree(data)
+    return [(element, item) for element in ('Series', 'Episode')
+            for item in xmlhelpers.parse_xml(tree, element)]
+
+
+def _records(data):
+    """Parses the data while it is read"""
+    return list(xmlhelpers.iterparse_xml(data, ('Series', 'Episode')))
+
+
+def main(repeat=5):
+    """Runs the benchmark"""
+    backends = sorted(xmlhelpers.BACKENDS)
+    print("Backends: {0}, best of {1} runs".format(', '.join(backends), repeat))
+
+    default = xmlhelpers.get_backend()
+    try:
+        for episodes in (100, 1000, 10000):
+            data = _document(episodes)
+            print("\n{0} episodes, {1} kB".format(episodes, len(data) // 1024))
+
+            expected = None
+            for backend in backends:
+                xmlhelpers.set_backend(backend)
+                for name, function in (('tree', _tree), ('records', _records)):
+                    result = sorted(function(data), key=lambda item: (item[0], item[1]['id']))
+                    if expected is None:
+                        expected = result
+                    assert result == expected, "The {0} backend gives a different result".format(backend)
+
+                    elapsed = min(timeit.repeat(lambda: function(data), number=1, repeat=repeat))
+                    print("{0:>8} {1:>8}: {2:8.2f} ms".format(backend, name, elapsed * 1000))
+    finally:
+        xmlhelpers.set_backend(default)
+
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:2]])
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 - 2013 Björn Larsson
+
+# This file is part of pytvdbapi.
+#
+# pytvdbapi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pytvdbapi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pytvdbapi.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compares the time used to convert the values of the full series data using
+the single pass classifier and the conversion by trial used before, and
+using the schema of the episodes.
+
+Usage: python benchmarks/parse_values.py [episodes] [repeat]
+"""
+
+from __future__ import absolute_import, print_function
+
+import datetime
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pytvdbapi import xmlhelpers  # noqa: E402  # pylint: disable=C0413
+from pytvdbapi.xmlhelpers import generate_tree, parse_xml  # noqa: E402  # pylint: disable=C0413
+
+_FIXTURE = os.path.join(os.path.dirname(__file__), '..', 'pytvdbapi', 'tests', 'data', 'series.xml')
+
+
+def _trial(value):
+    """The conversion used before, trying each type in turn"""
+    if value:
+        value = value.strip()
+    else:
+        value = ""
+
+    try:
+        value = datetime.datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        if '|' in value:
+            value = value.strip("|").split("|")
+            value = [s.strip() for s in value]
+        else:
+            if re.match(r"^\d+\.\d+$", value):
+                value = float(value)
+            elif re.match(r"^\d+$", value):
+                value = int(value)
+
+    return value
+
+
+def _document(episodes):
+    """Creates a series document with the given number of episodes"""
+    with open(_FIXTURE, 'rb') as handle:
+        data = handle.read()
+
+    start = data.index(b'<Episode>')
+    end = data.index(b'</Episode>') + len(b'</Episode>')
+    return data[:start] + data[start:end] * episodes + data[data.rindex(b'</Episode>') + len(b'</Episode>'):]
+
+
+def main(episodes=5000, repeat=5):
+    """Runs the benchmark"""
+    tree = generate_tree(_document(episodes))
+    print("{0} episodes, best of {1} runs".format(len(tree.findall('Episode')), repeat))
+
+    converters = [('trial', _trial), ('classifier', xmlhelpers._convert)]  # pylint: disable=W0212
+    results, times = list(), list()
+    try:
+        for name, converter in converters:
+            xmlhelpers._convert = converter  # pylint: disable=W0212
+            results.append(parse_xml(tree, 'Episode', schema={}))
+            elapsed = timeit.repeat(lambda: parse_xml(tree, 'Episode', schema={}), number=1, repeat=repeat)
+            times.append(min(elapsed))
+            print("{0:>12}: {1:.3f} s".format(name, times[-1]))
+    finally:
+        xmlhelpers._convert = converters[1][1]  # pylint: disable=W0212
+
+    assert results[0] == results[1], "The converted values differ"
+    print("{0:>12}: {1:.1f}x".format('speedup', times[0] / times[1]))
+
+    schema = min(timeit.repeat(lambda: parse_xml(tree, 'Episode'), number=1, repeat=repeat))
+    print("{0:>12}: {1:.3f} s, {2:.1f}x".format('schema', schema, times[0] / schema))
+
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:3]])
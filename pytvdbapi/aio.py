@@ -0,0 +1,726 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 - 2013 Björn Larsson
+
+# This file is part of pytvdbapi.
+#
+# pytvdbapi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pytvdbapi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pytvdbapi.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+A module providing an asyncio based version of the API.
+
+.. versionadded:: 0.5
+
+The :class:`AsyncTVDB` class mirrors the :class:`pytvdbapi.api.TVDB` class
+but will never block. All functions that need to load data from the server
+return an :class:`asyncio.Future` that can be awaited from a coroutine. This
+makes it possible to have a large number of requests in flight at the same
+time using a single event loop.
+
+This module requires the :mod:`asyncio` module, available in Python 3.4 and
+later.
+
+Example::
+
+    import asyncio
+    from pytvdbapi.aio import AsyncTVDB
+
+    async def main():
+        db = AsyncTVDB("B43FF87DE395DF56")
+        search = await db.search("Dexter", "en")
+        show = await search[0].load()
+        print(show[1][2])
+
+    asyncio.get_event_loop().run_until_complete(main())
+"""
+
+import logging
+from collections import deque
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None  # pylint: disable=C0103
+
+# pylint: disable=E0611, F0401
+try:
+    from urllib import quote
+    from urlparse import urljoin, urlsplit
+except ImportError:
+    from urllib.parse import quote, urljoin, urlsplit
+# pylint: enable=E0611, F0401
+
+from pytvdbapi import error
+from pytvdbapi.__init__ import __NAME__ as name, version
+from pytvdbapi.api import (Episode, Search, Show, _ACTORS, _BANNERS, _SERIES, _normalize_query, _parse,
+                           _single, _validate_language, __actors__, __banners__, __episode__, __mirrors__,
+                           __search__, __series__)
+from pytvdbapi.cache import NegativeCache, ParseCache
+from pytvdbapi.loader import normalize_url
+from pytvdbapi.mirror import MirrorList, TypeMask
+from pytvdbapi.utils import LRUCache
+from pytvdbapi.xmlhelpers import generate_tree
+
+__all__ = ['AsyncLoader', 'AsyncShow', 'AsyncTVDB']
+
+logger = logging.getLogger(__name__)  # pylint: disable=C0103
+
+# The maximum number of redirects to follow for a single request
+MAX_REDIRECTS = 5
+
+
+def _check_asyncio():
+    """Raises PytvdbapiError if asyncio is not available"""
+    if asyncio is None:
+        raise error.PytvdbapiError("The asyncio module is required to use {0}".format(__name__))
+
+
+def _new_future(loop):
+    """Creates a new future attached to *loop*"""
+    try:
+        return loop.create_future()
+    except AttributeError:  # Python < 3.5.2
+        return asyncio.Future(loop=loop)
+
+
+def _ensure_future(coroutine, loop):
+    """Schedules the coroutine on the loop and returns a future"""
+    ensure = getattr(asyncio, 'ensure_future', None) or getattr(asyncio, 'async')
+    return ensure(coroutine, loop=loop)
+
+
+def _copy_result(source, target):
+    """Copies the outcome of the future *source* to the future *target*"""
+    if target.done():
+        return
+
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+def _then(future, callback, loop, errback=None):
+    """
+    :param future: The future to chain on
+    :param callback: Called with the result of *future*
+    :param loop: The event loop to use
+    :param errback: Optional. Called with the exception if *future* fails.
+    :return: A new future
+
+    Chains the callback on *future*. The returned future is resolved with
+    the value returned from the callback. If the callback returns a future,
+    the returned future will follow that future instead. Exceptions raised
+    are propagated to the returned future.
+    """
+    result = _new_future(loop)
+
+    def _done(fut):
+        """Calls the callbacks once the future is done"""
+        if result.done():
+            return
+        if fut.cancelled():
+            result.cancel()
+            return
+
+        try:
+            if fut.exception() is not None:
+                if errback is None:
+                    raise fut.exception()
+                value = errback(fut.exception())
+            else:
+                value = callback(fut.result())
+        except Exception as _error:  # pylint: disable=W0703
+            result.set_exception(_error)
+            return
+
+        if isinstance(value, asyncio.Future):
+            value.add_done_callback(lambda f: _copy_result(f, result))
+        else:
+            result.set_result(value)
+
+    future.add_done_callback(_done)
+    return result
+
+
+_Protocol = asyncio.Protocol if asyncio is not None else object  # pylint: disable=C0103
+
+
+class _HTTPProtocol(_Protocol):
+    """
+    Reads a single HTTP/1.1 response from the transport and resolves the
+    future with a tuple of (status, headers, body).
+    """
+    def __init__(self, future):
+        self.future = future
+        self.transport = None
+        self.buffer = bytearray()
+        self.body = bytearray()
+        self.status, self.headers = None, None
+        self.length, self.chunked = None, False
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self.buffer.extend(data)
+        try:
+            self._parse()
+        except (ValueError, IndexError):
+            self._fail(error.ConnectionError("Bad response received from server"))
+
+    def eof_received(self):
+        if self.status is not None and self.length is None and not self.chunked:
+            # The body is delimited by the server closing the connection
+            self.body = self.buffer
+            self._finish()
+        return False
+
+    def connection_lost(self, exc):
+        if not self.future.done():
+            self._fail(error.ConnectionError("Connection lost. {0}".format(exc)))
+
+    def close(self):
+        """Closes the transport"""
+        if self.transport is not None:
+            self.transport.close()
+
+    def _parse(self):
+        """Parses as much of the response as is available in the buffer"""
+        if self.status is None:
+            end = self.buffer.find(b'\r\n\r\n')
+            if end < 0:
+                return
+
+            lines = bytes(self.buffer[:end]).decode('iso-8859-1').split('\r\n')
+            del self.buffer[:end + 4]
+
+            self.status = int(lines[0].split(None, 2)[1])
+            self.headers = dict()
+            for line in lines[1:]:
+                key, _, value = line.partition(':')
+                self.headers[key.strip().lower()] = value.strip()
+
+            if 'chunked' in self.headers.get('transfer-encoding', '').lower():
+                self.chunked = True
+            elif 'content-length' in self.headers:
+                self.length = int(self.headers['content-length'])
+
+        if self.chunked:
+            self._parse_chunks()
+        elif self.length is not None and len(self.buffer) >= self.length:
+            del self.buffer[self.length:]
+            self.body = self.buffer
+            self._finish()
+
+    def _parse_chunks(self):
+        """Moves all complete chunks from the buffer to the body"""
+        while True:
+            end = self.buffer.find(b'\r\n')
+            if end < 0:
+                return
+
+            size = int(bytes(self.buffer[:end]).split(b';')[0], 16)
+            if size == 0:
+                self._finish()
+                return
+
+            if len(self.buffer) < end + size + 4:
+                return
+
+            self.body.extend(self.buffer[end + 2:end + 2 + size])
+            del self.buffer[:end + size + 4]
+
+    def _finish(self):
+        """Resolves the future with the response and closes the connection"""
+        if not self.future.done():
+            self.future.set_result((self.status, self.headers, bytes(self.body)))
+        self.close()
+
+    def _fail(self, exc):
+        """Fails the future with *exc* and closes the connection"""
+        if not self.future.done():
+            self.future.set_exception(exc)
+        self.close()
+
+
+class AsyncLoader(object):
+    """
+    :param loop: Optional. The event loop to use. Defaults to the event loop
+        that is current when the request is made.
+    :param max_connections: The maximum number of connections open at the
+        same time. Requests above this number will wait for a connection to
+        be released.
+    :param timeout: The number of seconds before a request is aborted.
+
+    A non blocking loader using :mod:`asyncio` to load the data. It
+    implements the same protocol as :class:`pytvdbapi.loader.Loader` with
+    the difference that :func:`load` returns an :class:`asyncio.Future`
+    resolving to the loaded data.
+
+    Requests for a URL already being loaded are coalesced, sharing the
+    result of the request in progress.
+
+    .. note:: The AsyncLoader does not keep a local cache, the *cache*
+        argument is accepted for compatibility with the loader protocol.
+    """
+    def __init__(self, loop=None, max_connections=100, timeout=60):
+        _check_asyncio()
+
+        if max_connections < 1:
+            raise error.TVDBValueError("max_connections must be at least 1")
+
+        self._loop = loop
+        self.max_connections, self.timeout = max_connections, timeout
+
+        self._active = 0
+        self._waiting = deque()
+        self._flights = dict()
+
+    @property
+    def loop(self):
+        """The event loop used by the loader"""
+        return self._loop or asyncio.get_event_loop()
+
+    def load(self, url, cache=True):  # pylint: disable=W0613
+        """
+        :param url: The URL to be loaded
+        :param cache: Ignored.
+        :return: A future resolving to the content of the url as bytes. It will
+            fail with ConnectionError if the url could not be loaded.
+        """
+        loop = self.loop
+        key = normalize_url(url)
+
+        shared = self._flights.get(key)
+        if shared is None:
+            shared = self._flights[key] = self._load(url, loop)
+            shared.add_done_callback(lambda _: self._flights.pop(key, None))
+
+        # Each caller gets its own future, cancelling it does not affect the
+        # other callers sharing the request.
+        result = _new_future(loop)
+        shared.add_done_callback(lambda f: _copy_result(f, result))
+        return result
+
+    def _load(self, url, loop):
+        """Loads the url once a connection slot is available"""
+        logger.debug("Loading data from {0}".format(url))
+
+        acquired = self._acquire(loop)
+
+        def _done(_):
+            """Releases the connection slot, or stops waiting for one"""
+            if acquired.done() and not acquired.cancelled():
+                self._release()
+            else:
+                acquired.cancel()
+
+        result = _then(acquired, lambda _: self._get(url, loop, MAX_REDIRECTS), loop)
+        result.add_done_callback(_done)
+        return result
+
+    def _acquire(self, loop):
+        """Returns a future resolved when a connection slot is available"""
+        future = _new_future(loop)
+        if self._active < self.max_connections:
+            self._active += 1
+            future.set_result(None)
+        else:
+            self._waiting.append(future)
+        return future
+
+    def _release(self):
+        """Hands the connection slot over to the next waiting request"""
+        while self._waiting:
+            future = self._waiting.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    def _get(self, url, loop, redirections):
+        """Performs the GET request, following redirects"""
+        parts = urlsplit(url)
+        secure = parts.scheme == 'https'
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        response = _new_future(loop)
+        protocol = _HTTPProtocol(response)
+
+        def _timeout():
+            """Aborts the request, also while connecting"""
+            connect.cancel()
+            protocol._fail(error.ConnectionError("Timeout loading {0}".format(url)))
+
+        handle = loop.call_later(self.timeout, _timeout)
+        response.add_done_callback(lambda _: handle.cancel())
+
+        def _send(connected):
+            """Sends the request once connected, or fails the response"""
+            if connected.cancelled():
+                return
+            if connected.exception() is not None:
+                protocol._fail(error.ConnectionError("Unable to connect to {0}. {1}".format(
+                    url, connected.exception())))
+                return
+
+            transport = connected.result()[0]
+            if response.done():
+                # The request timed out or failed while connecting
+                transport.close()
+                return
+
+            request = ("GET {0} HTTP/1.1\r\n"
+                       "Host: {1}\r\n"
+                       "User-Agent: {2}/{3}\r\n"
+                       "Accept-Encoding: identity\r\n"
+                       "Connection: close\r\n\r\n").format(path, parts.netloc, name, version())
+            transport.write(request.encode('ascii'))
+
+        def _handle(result):
+            """Checks the status of the response"""
+            status, headers, body = result
+            if status in (301, 302, 303, 307) and 'location' in headers and redirections > 0:
+                return self._get(urljoin(url, headers['location']), loop, redirections - 1)
+            elif status in [404]:
+                raise error.TVDBNotFoundError("Data not found")
+            elif status not in [200]:
+                raise error.ConnectionError("Bad status returned from server. {0}".format(status))
+            else:
+                return body
+
+        connect = _ensure_future(loop.create_connection(lambda: protocol, parts.hostname,
+                                                        parts.port or (443 if secure else 80),
+                                                        ssl=secure), loop)
+        connect.add_done_callback(_send)
+
+        # The timeout covers the whole request, so the response is always settled
+        return _then(response, _handle, loop)
+
+
+class AsyncShow(Show):
+    """
+    :raise: :class:`pytvdbapi.error.PytvdbapiError` if accessing the seasons
+        before the show has been loaded.
+
+    A :class:`pytvdbapi.api.Show` returned by :class:`AsyncTVDB`. The show
+    will never load any data implicitly. Instead, the full data set is loaded
+    by calling :func:`load` and waiting for the returned future.
+    """
+    def __init__(self, data, api, language, config):
+        super(AsyncShow, self).__init__(data, api, language, config)
+        self._loaded = False
+
+    def __dir__(self):
+        return [d for d in super(AsyncShow, self).__dir__() if d != '_loaded']
+
+    def _populate_data(self):
+        if not self._loaded:
+            raise error.PytvdbapiError("The data for {0} is not loaded. Use load() to load it".format(self))
+
+    def update(self):
+        """
+        :return: A future resolving to the show
+
+        The same as :func:`load`.
+        """
+        return self.load()
+
+    def load(self):
+        """
+        :return: A future resolving to the show
+
+        Loads the full data set for the show. If the *actors* or *banners*
+        keyword arguments were used when creating the :class:`AsyncTVDB`
+        instance, the actors and banners will be loaded at the same time.
+        """
+        loop = self.api.loop
+        url = self._url(__series__, language=self.lang)
+
+        def _set_data(data):
+            """Populates the show"""
+            self._set_series_data(_parse(self.api, url, data, _SERIES))
+            self._loaded = True
+
+        futures = [_then(self.api.loader.load(url), _set_data, loop)]
+
+        if self.config.get('actors', False):
+            futures.append(self.load_actors())
+
+        if self.config.get('banners', False):
+            futures.append(self.load_banners())
+
+        return _then(asyncio.gather(*futures), lambda _: self, loop)
+
+    def load_actors(self):
+        """
+        :return: A future resolving to the list of :class:`pytvdbapi.actor.Actor` objects
+
+        Loads the extended actor information into the *actor_objects*
+        attribute of the show.
+        """
+        url = self._url(__actors__)
+
+        def _set_data(data):
+            """Creates the actor objects"""
+            self._set_actors(_parse(self.api, url, data, _ACTORS))
+            return self.actor_objects
+
+        return _then(self.api.loader.load(url), _set_data, self.api.loop)
+
+    def load_banners(self):
+        """
+        :return: A future resolving to the list of :class:`pytvdbapi.banner.Banner` objects
+
+        Loads the extended banner information into the *banner_objects*
+        attribute of the show.
+        """
+        url = self._url(__banners__)
+
+        def _set_data(data):
+            """Creates the banner objects"""
+            self._set_banners(_parse(self.api, url, data, _BANNERS))
+            return self.banner_objects
+
+        return _then(self.api.loader.load(url), _set_data, self.api.loop)
+
+
+class AsyncTVDB(object):
+    """
+    :param api_key: The API key to use to communicate with the server
+    :param kwargs:
+
+    The asyncio version of :class:`pytvdbapi.api.TVDB`. It supports the
+    *actors*, *banners* and *ignore_case* keyword arguments of
+    :class:`pytvdbapi.api.TVDB`. In addition the following keyword arguments
+    are supported:
+
+    * *loop* (default=None) The event loop to use. Defaults to the event loop
+      that is current when the requests are made.
+
+    * *max_connections* (default=100) The maximum number of connections to
+      have open at the same time.
+
+    * *loader* (default=None) The loader object to use. Its *load* function
+      should return a future as described in :class:`AsyncLoader`. If not
+      provided, an :class:`AsyncLoader` will be used.
+
+    * *parse_cache*, *negative_cache*, *search_cache_size* and
+      *search_cache_ttl* The same as for :class:`pytvdbapi.api.TVDB`.
+
+    Apart from the functions returning futures, it is used the same way as
+    :class:`pytvdbapi.api.TVDB`. The shows returned are :class:`AsyncShow`
+    instances.
+    """
+    def __init__(self, api_key, **kwargs):
+        _check_asyncio()
+
+        self.config = dict()
+        self.search_buffer = LRUCache(kwargs.get('search_cache_size', 128),
+                                      kwargs.get('search_cache_ttl', 3600))
+
+        self.config['api_key'] = api_key
+        self.config['actors'] = kwargs.get('actors', False)
+        self.config['banners'] = kwargs.get('banners', False)
+        self.config['ignore_case'] = kwargs.get('ignore_case', False)
+
+        self._loop = kwargs.get('loop', None)
+        self.loader = kwargs.get('loader', None) or AsyncLoader(
+            loop=self._loop, max_connections=kwargs.get('max_connections', 100))
+
+        parse_cache = kwargs.get('parse_cache', True)
+        self.parse_cache = ParseCache() if parse_cache is True else (parse_cache or None)
+
+        negative_cache = kwargs.get('negative_cache', True)
+        self.negative_cache = NegativeCache() if negative_cache is True else (negative_cache or None)
+
+        self.mirrors = None
+        self._mirrors = None
+
+    @property
+    def loop(self):
+        """The event loop used"""
+        return self._loop or asyncio.get_event_loop()
+
+    def _load_mirrors(self):
+        """Returns a future resolving to the list of mirrors"""
+        if self._mirrors is None or (self._mirrors.done() and (
+                self._mirrors.cancelled() or self._mirrors.exception() is not None)):
+
+            def _set_mirrors(data):
+                """Creates the mirror list"""
+                self.mirrors = MirrorList(generate_tree(data))
+                return self.mirrors
+
+            future = self.loader.load(__mirrors__.format(**self.config))
+            self._mirrors = _then(future, _set_mirrors, self.loop)
+
+        return self._mirrors
+
+    def _url(self, template, **kwargs):
+        """Formats the URL template using the current mirror and API key"""
+        context = {'mirror': self.mirrors.get_mirror(TypeMask.XML).url,
+                   'api_key': self.config['api_key']}
+        context.update(kwargs)
+
+        return template.format(**context)
+
+    def _load(self, template, cache, elements, message=None, **kwargs):
+        """
+        Returns a future resolving to the parsed data once the mirrors are
+        available, see :func:`pytvdbapi.api._parse`.
+        """
+        def _load_url(_):
+            """Loads and parses the data"""
+            url = self._url(template, **kwargs)
+            return _then(self.loader.load(url, cache),
+                         lambda data: _parse(self, url, data, elements, message), self.loop)
+
+        return _then(self._load_mirrors(), _load_url, self.loop)
+
+    def _remember_missing(self, key, cache, message, load):
+        """
+        The asyncio version of :func:`pytvdbapi.api._remember_missing`,
+        *load* returns a future.
+        """
+        negative = self.negative_cache
+        if negative is None:
+            return load()
+
+        if cache is True and key in negative:
+            future = _new_future(self.loop)
+            future.set_exception(error.TVDBIdError(message))
+            return future
+
+        def _found(result):
+            """Forgets the key if it was found after all"""
+            negative.discard(key)
+            return result
+
+        def _missing(exc):
+            """Remembers the missing key"""
+            if isinstance(exc, error.TVDBIdError):
+                negative.add(key)
+            raise exc
+
+        return _then(load(), _found, self.loop, _missing)
+
+    def search(self, show, language, cache=True):
+        """
+        :param show: The show name to search for
+        :param language: The language abbreviation to search for. E.g. "en"
+        :param cache: If False, the local cache will not be used and the
+            resources will be reloaded from server.
+        :return: A future resolving to a :class:`pytvdbapi.api.Search` instance
+        :raise: :class:`pytvdbapi.error.TVDBValueError`
+
+        The asyncio version of :func:`pytvdbapi.api.TVDB.search`.
+        """
+        logger.debug("Searching for {0} using language {1}".format(show, language))
+
+        _validate_language(language)
+
+        query, key = _normalize_query(show)
+        shows = self.search_buffer.get((key, language)) if cache is True else None
+        if shows is not None:
+            future = _new_future(self.loop)
+            future.set_result(Search(shows, show, language))
+            return future
+
+        def _create_search(data):
+            """Creates the search result"""
+            shows = [AsyncShow(d, self, language, self.config) for d in data['Series']]
+            self.search_buffer[(key, language)] = shows
+            return Search(shows, show, language)
+
+        future = self._load(__search__, cache, ('Series',), series=quote(query.encode('utf-8')),
+                            language=language)
+        return _then(future, _create_search, self.loop)
+
+    def get_series(self, series_id, language, cache=True):
+        """
+        :param series_id: The Show Id to fetch
+        :param language: The language abbreviation to search for. E.g. "en"
+        :param cache: If False, the local cache will not be used and the
+                    resources will be reloaded from server.
+        :return: A future resolving to an :class:`AsyncShow` instance
+        :raise: :class:`pytvdbapi.error.TVDBValueError`, :class:`pytvdbapi.error.TVDBIdError`
+
+        The asyncio version of :func:`pytvdbapi.api.TVDB.get_series`.
+        """
+        logger.debug("Getting series with id {0} with language {1}".format(series_id, language))
+
+        _validate_language(language)
+        message = "No Show with id {0} found".format(series_id)
+
+        def _not_found(exc):
+            """Translates the not found error"""
+            if isinstance(exc, error.TVDBNotFoundError):
+                raise error.TVDBIdError(message)
+            raise exc
+
+        def _create_show(data):
+            """Creates the show"""
+            series = _single(data['Series'], "Series", message)
+            return AsyncShow(series, self, language, self.config)
+
+        def _load_show():
+            """Loads the show"""
+            future = self._load(__series__, cache, ('Series',), message, seriesid=series_id,
+                                language=language)
+            return _then(future, _create_show, self.loop, _not_found)
+
+        key = ('series', '{0}'.format(series_id), language)
+        return self._remember_missing(key, cache, message, _load_show)
+
+    def get_episode(self, episode_id, language, cache=True):
+        """
+        :param episode_id: The Episode Id to fetch
+        :param language: The language abbreviation to search for. E.g. "en"
+        :param cache: If False, the local cache will not be used and the
+                    resources will be reloaded from server.
+        :return: A future resolving to a :class:`pytvdbapi.api.Episode` instance
+        :raise: :class:`pytvdbapi.error.TVDBValueError`, :class:`pytvdbapi.error.TVDBIdError`
+
+        The asyncio version of :func:`pytvdbapi.api.TVDB.get_episode`.
+        """
+        logger.debug("Getting episode with id {0} with language {1}".format(episode_id, language))
+
+        _validate_language(language)
+        message = "No Episode with id {0} found".format(episode_id)
+
+        def _not_found(exc):
+            """Translates the not found error"""
+            if isinstance(exc, error.TVDBNotFoundError):
+                raise error.TVDBIdError(message)
+            raise exc
+
+        def _create_episode(data):
+            """Creates the episode"""
+            episode = _single(data['Episode'], "Episode", message)
+            return Episode(episode, None, self.config)
+
+        def _load_episode():
+            """Loads the episode"""
+            future = self._load(__episode__, cache, ('Episode',), message, episodeid=episode_id,
+                                language=language)
+            return _then(future, _create_episode, self.loop, _not_found)
+
+        return self._remember_missing(('episode', '{0}'.format(episode_id), language), cache, message,
+                                      _load_episode)
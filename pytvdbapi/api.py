@@ -36,36 +36,56 @@ Basic usage::
 
 from __future__ import absolute_import, print_function, unicode_literals
 
+import io
 import logging
 import tempfile
-import sys
+import threading
 import os
-from collections import Mapping
+import unicodedata
+import zipfile
+from collections import Mapping, deque
 
 # pylint: disable=E0611, F0401, W0622
 from pytvdbapi.actor import Actor
 from pytvdbapi.banner import Banner
-from pytvdbapi.utils import InsensitiveDictionary
+from pytvdbapi.utils import InsensitiveDictionary, LazyDictionary
 
 
 try:
     from urllib import quote
 except ImportError:
     from urllib.parse import quote
+
+try:
+    from Queue import Queue
+except ImportError:
+    from queue import Queue
     # pylint: enable=E0611, F0401
 
 from pytvdbapi import error
+from pytvdbapi.cache import NegativeCache, ParseCache
 from pytvdbapi.__init__ import __NAME__ as name
-from pytvdbapi.loader import Loader
+from pytvdbapi.loader import OFFLINE, STALE_IF_ERROR, STALE_WHILE_REVALIDATE, Loader
 from pytvdbapi.mirror import MirrorList, TypeMask
-from pytvdbapi.utils import merge
-from pytvdbapi.xmlhelpers import parse_xml, generate_tree
+from pytvdbapi.utils import LRUCache, merge
+from pytvdbapi.xmlhelpers import RawRecord, iterparse_xml, parse_xml, generate_tree
+
+# The elements parsed from the data of the different resources
+_SERIES = ('Series', 'Episode')
+_ACTORS = ('Actor',)
+_BANNERS = ('Banner',)
+
+# The elements converted on first access with the lazy_types keyword argument
+_LAZY = frozenset(_SERIES)
 
 # URL templates used for loading the data from thetvdb.com
 __mirrors__ = "http://www.thetvdb.com/api/{api_key}/mirrors.xml"
 __time__ = "http://www.thetvdb.com/api/Updates.php?type=none"
+__updates__ = "http://www.thetvdb.com/api/Updates.php?type=all&time={time}"
+__updates_zip__ = "{mirror}/api/{api_key}/updates/updates_{period}.zip"
 __search__ = "http://www.thetvdb.com/api/GetSeries.php?seriesname={series}&language={language}"
 __series__ = "{mirror}/api/{api_key}/series/{seriesid}/all/{language}.xml"
+__zip__ = "{mirror}/api/{api_key}/series/{seriesid}/all/{language}.zip"
 __episode__ = "{mirror}/api/{api_key}/episodes/{episodeid}/{language}.xml"
 __actors__ = "{mirror}/api/{api_key}/series/{seriesid}/actors.xml"
 __banners__ = "{mirror}/api/{api_key}/series/{seriesid}/banners.xml"
@@ -77,6 +97,205 @@ __all__ = ['Language', 'Episode', 'Season', 'Show', 'Search', 'TVDB']
 logger = logging.getLogger(__name__)
 
 
+def _validate_language(language):
+    """Raises TVDBValueError if *language* is not a supported language"""
+    if language != 'all' and language not in __LANGUAGES__:
+        raise error.TVDBValueError("{0} is not a valid language".format(language))
+
+
+def _load_raw(api, url, cache=True):
+    """
+    Loads the url as bytes if the loader of the api supports it. The bytes
+    are passed on to the XML parser as they are, avoiding the cost of
+    decoding and encoding the data again. The serving mode of the api is
+    used unless *cache* is used to bypass the cache, the *offline* mode is
+    always used.
+    """
+    return _load_content(api, url, cache)[0]
+
+
+def _load_content(api, url, cache=True):
+    """
+    Loads the url like :func:`_load_raw`, returning a tuple of the data and
+    its age. The age is None unless the loader supports *load_content*.
+    """
+    mode = getattr(api, 'mode', None)
+    if mode == OFFLINE or (mode is not None and cache is True):
+        cache = mode
+
+    if hasattr(api.loader, 'load_content'):
+        content = api.loader.load_content(url, cache)
+        return content.data, content.age
+
+    return getattr(api.loader, 'load_raw', api.loader.load)(url, cache), None
+
+
+def _lazy(api, elements):
+    """
+    Returns True if the *elements* should be parsed into raw records, as
+    requested by the lazy_types keyword argument of the api
+    """
+    return getattr(api, 'config', {}).get('lazy_types', False) and _LAZY.issuperset(elements)
+
+
+def _cached_as(elements, lazy):
+    """Returns the elements used to cache the parsed result"""
+    return tuple(elements) + ('raw',) if lazy else elements
+
+
+def _parse(api, url, data, elements, message=None):
+    """
+    Parses the XML data loaded from *url*, returning a dictionary with the
+    list of parsed items for each of the *elements*. If the api has a parse
+    cache, the data is only parsed if it has changed since it was last
+    parsed. If *message* is provided, TVDBIdError is raised using it if no
+    data was returned.
+    """
+    if message is not None and (not data or data.isspace()):
+        raise error.TVDBIdError(message)
+
+    lazy = _lazy(api, elements)
+    cache = getattr(api, 'parse_cache', None)
+    result = cache.get(url, data, _cached_as(elements, lazy)) if cache is not None else None
+
+    if result is None:
+        tree = generate_tree(data)
+        result = dict((element, parse_xml(tree, element, lazy=lazy)) for element in elements)
+        if cache is not None:
+            cache.set(url, data, _cached_as(elements, lazy), result)
+
+    return result
+
+
+def _stream(api, data, elements):
+    """
+    Parses the XML data like :func:`_parse`, but yields the (element, item)
+    tuples while the data is parsed. The parse cache is not used, as it
+    would need all the items to be kept in memory.
+    """
+    return iterparse_xml(data, elements, lazy=_lazy(api, elements))
+
+
+def _normalize_query(show):
+    """
+    Normalizes the search query, returning the query to send to the server
+    and the key used for caching the result. Different spelling using Unicode
+    compatibility characters, white space or case give the same key.
+    """
+    if isinstance(show, bytes):
+        show = show.decode('utf-8')
+
+    query = ' '.join(unicodedata.normalize('NFKC', show).split())
+    return query, getattr(query, 'casefold', query.lower)()
+
+
+def _stored(api, cache):
+    """Returns the store of the api if it should be used, otherwise None"""
+    return getattr(api, 'store', None) if cache is True else None
+
+
+def _converted(record):
+    """Returns the record with all values converted"""
+    return record.converted() if isinstance(record, RawRecord) else record
+
+
+def _dictionary(record, ignore_case):
+    """
+    Creates the dictionary of attributes of a parsed record. The values of
+    raw records are converted when first accessed.
+    """
+    if isinstance(record, RawRecord):
+        data = LazyDictionary(ignore_case=ignore_case)
+        data.update_raw(record)
+        return data
+
+    return InsensitiveDictionary(record, ignore_case=ignore_case)
+
+
+def _save(api, language, parsed):
+    """Adds the parsed full series data to the store of the api, if any"""
+    store = getattr(api, 'store', None)
+    if store is not None and len(parsed['Series']) == 1:
+        store.put_series(language, _converted(parsed['Series'][0]),
+                         [_converted(episode) for episode in parsed['Episode']])
+
+
+def _remember_missing(api, key, cache, message, function, *args):
+    """
+    Calls *function*, remembering *key* in the negative cache of the api if
+    the id is not found. Ids already known to be missing raise TVDBIdError
+    using *message* without calling *function*, unless *cache* is used to
+    bypass the cache.
+    """
+    negative = getattr(api, 'negative_cache', None)
+    if negative is None:
+        return function(*args)  # pylint: disable=W0142
+
+    if cache is True and key in negative:
+        raise error.TVDBIdError(message)
+
+    try:
+        result = function(*args)  # pylint: disable=W0142
+    except error.TVDBIdError:
+        negative.add(key)
+        raise
+
+    negative.discard(key)
+    return result
+
+
+def _read_zip(data, language):
+    """
+    Reads the full series zip archive in memory. Returns a tuple with the
+    XML data of the series, actors and banners. The actors and banners are
+    None if not included in the archive.
+    """
+    if not isinstance(data, bytes):
+        raise error.BadData("The zip archive must be loaded as bytes")
+
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipfile:
+        raise error.BadData("Bad zip data received")
+
+    try:
+        names = archive.namelist()
+        members = tuple(archive.read(name) if name in names else None
+                        for name in ('{0}.xml'.format(language), 'actors.xml', 'banners.xml'))
+    finally:
+        archive.close()
+
+    if members[0] is None:
+        raise error.BadData("The zip archive does not contain {0}.xml".format(language))
+
+    return members
+
+
+def _parse_zip(api, url, data, language):
+    """
+    Parses the full series zip archive. Returns a tuple with the parsed
+    series, actors and banners data, see :func:`_parse`.
+    """
+    members = _read_zip(data, language)
+    names = ('{0}.xml'.format(language), 'actors.xml', 'banners.xml')
+
+    return tuple(_parse(api, '{0}#{1}'.format(url, name), member, elements) if member is not None else None
+                 for name, member, elements in zip(names, members, (_SERIES, _ACTORS, _BANNERS)))
+
+
+def _single(items, element, message):
+    """
+    Returns the single *element* of a request for a single item, raising
+    TVDBIdError using *message* if the element is missing.
+    """
+    assert len(items) <= 1, "Should not find more than one {0}".format(element)
+
+    if len(items) >= 1:
+        return items[0]
+    else:
+        raise error.TVDBIdError(message)
+
+
 class Language(object):
     """
     Representing a language that is supported by the API.
@@ -130,8 +349,11 @@ class Episode(object):
     All episode values returned from thetvdb.com_ are
     accessible as attributes of the episode object. The attributes will be
     named exactly as returned from thetvdb.com_ and are case sensitive.
-    TVDBAttributeError will be raised if accessing an invalid attribute. Some
-    type conversions of the attributes will take place as follows:
+    TVDBAttributeError will be raised if accessing an invalid attribute. The
+    known attributes are converted to the type given by
+    :data:`pytvdbapi.xmlhelpers.SCHEMAS`, e.g. *GuestStars* is always a
+    list and *ProductionCode* always a string. Other attributes will be
+    converted as follows:
 
     * Strings of the format yyyy-mm-dd will be converted into a\
         :class:`datetime.date` object.
@@ -158,7 +380,7 @@ class Episode(object):
         'EpImgFlag', 'EpisodeName', 'EpisodeNumber', 'FirstAired',
         'GuestStars', 'IMDB_ID', 'Language', 'Overview', 'ProductionCode',
         'Rating', 'RatingCount', 'SeasonNumber', 'Writer', 'absolute_number',
-        'filename', 'id', 'lastupdated', 'season', 'seasonid', 'seriesid',
+        'age', 'filename', 'id', 'lastupdated', 'season', 'seasonid', 'seriesid',
         ...]
 
         >>> episode.EpisodeName
@@ -184,9 +406,10 @@ class Episode(object):
 
     def __init__(self, data, season, config):
         self.season, self.config = season, config
+        self.age = None
         ignore_case = self.config.get('ignore_case', False)
 
-        self.data = InsensitiveDictionary(ignore_case=ignore_case, **data)  # pylint: disable=W0142
+        self.data = _dictionary(data, ignore_case)
 
     def __getattr__(self, item):
         try:
@@ -322,7 +545,7 @@ class Show(Mapping):
         >>> show = search[0]
         >>> dir(show) #doctest: +NORMALIZE_WHITESPACE
         ['AliasNames', 'FirstAired', 'IMDB_ID', 'Network', 'Overview',
-          'SeriesName', 'actor_objects', 'api', 'banner', 'banner_objects',
+          'SeriesName', 'actor_objects', 'age', 'api', 'banner', 'banner_objects',
            'id', 'lang', 'language', 'seasons', 'seriesid', 'zap2it_id']
 
         >>> show.update()
@@ -332,7 +555,7 @@ class Show(Mapping):
          'ContentRating', 'FirstAired', 'Genre', 'IMDB_ID',
         'Language', 'Network', 'NetworkID', 'Overview', 'Rating',
          'RatingCount', 'Runtime', 'SeriesID', 'SeriesName',
-        'Status', 'actor_objects', 'added', 'addedBy', 'api',
+        'Status', 'actor_objects', 'added', 'addedBy', 'age', 'api',
          'banner', 'banner_objects', 'fanart', 'id', 'lang',
         'language', 'lastupdated', 'poster', 'seasons', 'seriesid',
          ...]
@@ -365,12 +588,13 @@ class Show(Mapping):
     def __init__(self, data, api, language, config):
         self.api, self.lang, self.config = api, language, config
         self.seasons = dict()
+        self.age = None
 
         self.actor_objects = list()
         self.banner_objects = list()
 
         self.ignore_case = self.config.get('ignore_case', False)
-        self.data = InsensitiveDictionary(ignore_case=self.ignore_case, **data)  # pylint: disable=W0142
+        self.data = _dictionary(data, self.ignore_case)
 
     def __getattr__(self, item):
         try:
@@ -425,35 +649,95 @@ class Show(Mapping):
         """
         logger.debug("Populating season data from URL.")
 
+        store = _stored(self.api, True)
+        series = store.series(self.id, self.lang) if store is not None else None
+
+        if series is not None:
+            self._set_series_data({'Series': [series], 'Episode': store.episodes(self.id, self.lang)})
+        elif self.config.get('use_zip', False):
+            url = self._url(__zip__, mirror=self.api.mirrors.get_mirror(TypeMask.ZIP).url,
+                            language=self.lang)
+            data, self.age = _load_content(self.api, url)
+            parsed = _parse_zip(self.api, url, data, self.lang)
+            _save(self.api, self.lang, parsed[0])
+            self._set_zip_data(parsed)
+            return
+        else:
+            url = self._url(__series__, language=self.lang)
+            data, self.age = _load_content(self.api, url)
+            if store is not None:
+                parsed = _parse(self.api, url, data, _SERIES)
+                _save(self.api, self.lang, parsed)
+                self._set_series_data(parsed)
+            else:
+                # The records are used while parsed, without keeping the whole document
+                self._set_records(_stream(self.api, data, _SERIES))
+
+        #If requested, load the extra actors data
+        if self.config.get('actors', False):
+            self.load_actors()
+
+        #if requested, load the extra banners data
+        if self.config.get('banners', False):
+            self.load_banners()
+
+    def _url(self, template, **kwargs):
+        """Formats the URL template with the context of the show"""
         context = {'mirror': self.api.mirrors.get_mirror(TypeMask.XML).url,
                    'api_key': self.config['api_key'],
-                   'seriesid': self.id,
-                   'language': self.lang}
+                   'seriesid': self.id}
+        context.update(kwargs)
 
-        url = __series__.format(**context)
-        data = generate_tree(self.api.loader.load(url))
-        episodes = [d for d in parse_xml(data, "Episode")]
+        return template.format(**context)
 
-        show_data = parse_xml(data, "Series")
-        assert len(show_data) == 1, "Should only have 1 Show section"
+    def _set_series_data(self, data):
+        """
+        Updates the show attributes and creates the :class:`Season` and
+        :class:`Episode` objects from the parsed full series data.
+        """
+        assert len(data['Series']) == 1, "Should only have 1 Show section"
 
-        self.data = merge(self.data, InsensitiveDictionary(show_data[0], ignore_case=self.ignore_case))
+        self._set_records([('Series', item) for item in data['Series']] +
+                          [('Episode', item) for item in data['Episode']])
 
-        for episode_data in episodes:
-            season_nr = int(episode_data['SeasonNumber'])
+    def _set_records(self, records):
+        """
+        Updates the show attributes and creates the :class:`Season` and
+        :class:`Episode` objects from the (element, item) tuples of the full
+        series data, one at a time.
+        """
+        for element, item in records:
+            if element == 'Series':
+                if isinstance(item, RawRecord):
+                    if not isinstance(self.data, LazyDictionary):
+                        self.data = LazyDictionary(self.data, ignore_case=self.ignore_case)
+                    self.data.update_raw(item)
+                else:
+                    self.data = merge(self.data, InsensitiveDictionary(item, ignore_case=self.ignore_case))
+                continue
+
+            season_nr = int(item['SeasonNumber'])
             if not season_nr in self.seasons:
                 self.seasons[season_nr] = Season(season_nr, self)
 
-            episode = Episode(episode_data, self.seasons[season_nr], self.config)
+            episode = Episode(item, self.seasons[season_nr], self.config)
+            episode.age = self.age
             self.seasons[season_nr].append(episode)
 
-        #If requested, load the extra actors data
-        if self.config.get('actors', False):
-            self.load_actors()
+    def _set_zip_data(self, data):
+        """
+        Populates the show, including the actors and banners, from the parsed
+        data of the full series zip archive.
+        """
+        series, actors, banners = data
 
-        #if requested, load the extra banners data
-        if self.config.get('banners', False):
-            self.load_banners()
+        self._set_series_data(series)
+
+        if actors is not None:
+            self._set_actors(actors)
+
+        if banners is not None:
+            self._set_banners(banners)
 
     def load_actors(self):
         """
@@ -473,20 +757,17 @@ class Show(Mapping):
           :class:`TVDB` for information on how to use the *actors* keyword argument.
 
         """
-        context = {'mirror': self.api.mirrors.get_mirror(TypeMask.XML).url,
-                   'api_key': self.config['api_key'],
-                   'seriesid': self.id}
-        url = __actors__.format(**context)
-
+        url = self._url(__actors__)
         logger.debug('Loading Actors data from {0}'.format(url))
 
-        data = generate_tree(self.api.loader.load(url))
+        self._set_actors(_parse(self.api, url, _load_raw(self.api, url), _ACTORS))
 
+    def _set_actors(self, data):
+        """Creates the :class:`Actor` objects from the parsed data"""
         mirror = self.api.mirrors.get_mirror(TypeMask.BANNER).url
 
         #generate all the Actor objects
-        self.actor_objects = [Actor(mirror, d, self)
-                              for d in parse_xml(data, 'Actor')]
+        self.actor_objects = [Actor(mirror, d, self) for d in data['Actor']]
 
     def load_banners(self):
         """
@@ -502,17 +783,16 @@ class Show(Mapping):
           :class:`TVDB` for information on how to use the *banners* keyword argument.
 
         """
-        context = {'mirror': self.api.mirrors.get_mirror(TypeMask.XML).url,
-                   'api_key': self.config['api_key'],
-                   'seriesid': self.id}
-
-        url = __banners__.format(**context)
+        url = self._url(__banners__)
         logger.debug('Loading Banner data from {0}'.format(url))
 
-        data = generate_tree(self.api.loader.load(url))
+        self._set_banners(_parse(self.api, url, _load_raw(self.api, url), _BANNERS))
+
+    def _set_banners(self, data):
+        """Creates the :class:`Banner` objects from the parsed data"""
         mirror = self.api.mirrors.get_mirror(TypeMask.BANNER).url
 
-        self.banner_objects = [Banner(mirror, b, self) for b in parse_xml(data, "Banner")]
+        self.banner_objects = [Banner(mirror, b, self) for b in data['Banner']]
 
 
 class Search(object):
@@ -543,8 +823,9 @@ class Search(object):
         <Show - Dexter>
     """
 
-    def __init__(self, result, search, language):
+    def __init__(self, result, search, language, age=None):
         self.result, self.search, self.language = result, search, language
+        self.age = age
 
     def __len__(self):
         return len(self.result)
@@ -559,6 +840,14 @@ class Search(object):
         return iter(self.result)
 
 
+class _SeriesJob(object):
+    """The state of a single Show Id fetched by :func:`TVDB.get_series_many`"""
+    def __init__(self, series_id):
+        self.series_id = series_id
+        self.show, self.result = None, None
+        self.remaining = 1
+
+
 class TVDB(object):
     """
     :param api_key: The API key to use to communicate with the server
@@ -596,13 +885,137 @@ class TVDB(object):
       case insensitive manner. If set to False, the default, all
       attributes will be case sensitive and retain the same casing
       as provided by `thetvdb.com <http://thetvdb.com>`_.
+
+    .. versionadded:: 0.5
+
+    * *loader* (default=None) The loader object to use for loading the data
+      from the server. It should implement the loader protocol described in
+      :mod:`pytvdbapi.loader`. If not provided, a
+      :class:`pytvdbapi.loader.Loader` using *cache_dir* will be created.
+
+      Example::
+
+          >>> from pytvdbapi import api
+          >>> from pytvdbapi.loader import Loader
+          >>> loader = Loader("/tmp/pytvdbapi", pool_size=4)
+          >>> db = api.TVDB("B43FF87DE395DF56", loader=loader)
+
+    * *use_zip* (default=False) If set to True, the full data set of a show
+      will be loaded from the zip archive provided by
+      `thetvdb.com <http://thetvdb.com>`_. The archive contains the series,
+      actors and banners data, so a single request is needed to load
+      everything regardless of the *actors* and *banners* keyword arguments.
+      This requires the loader to return the data as bytes, see
+      :func:`pytvdbapi.loader.Loader.load_raw`.
+
+    * *cache_max_bytes* (default=None) The maximum size, in bytes, of the
+      cache in *cache_dir*. Once the cache grows larger, the least recently
+      used data is removed. By default the size is not limited.
+
+    * *cache_max_age* (default=None) The number of seconds to keep the data
+      in the cache in *cache_dir*. By default the data is kept until removed
+      by *cache_max_bytes*.
+
+    * *freshness* (default=None) A :class:`pytvdbapi.loader.FreshnessPolicy`
+      deciding how long the cached data of each type of resource, and of
+      shows by their *Status*, is used before it is revalidated with the
+      server. By default the cache headers sent by the server are followed.
+
+      Example::
+
+          from pytvdbapi import api
+          from pytvdbapi.loader import FreshnessPolicy
+
+          week = 7 * 24 * 60 * 60
+          policy = FreshnessPolicy(mirrors=week, status={'Ended': 4 * week, 'Continuing': 60 * 60})
+          db = api.TVDB("B43FF87DE395DF56", freshness=policy)
+
+    * *parse_cache* (default=True) If True, the parsed data is kept in a
+      :class:`pytvdbapi.cache.ParseCache` so data loaded again from the cache
+      is not parsed again. The default cache keeps at most 32 MB of parsed
+      data in memory. A :class:`pytvdbapi.cache.ParseCache` instance may
+      be provided instead, e.g. to persist the parsed data to disk or to
+      change its size. If set to False, the data is parsed every time it is
+      loaded.
+
+      The full data of a show is parsed while it is read, creating the
+      seasons and episodes one record at a time, and is not added to the
+      parse cache. Without a *store*, only one record is kept in memory
+      besides the loaded data.
+
+    * *negative_cache* (default=True) If True, the ids of the series and
+      episodes not found on the server are remembered for an hour in a
+      :class:`pytvdbapi.cache.NegativeCache`, so that loading them again
+      raises :class:`pytvdbapi.error.TVDBIdError` without asking the server.
+      A :class:`pytvdbapi.cache.NegativeCache` or
+      :class:`pytvdbapi.cache.BloomNegativeCache` instance may be provided
+      instead, e.g. to remember the ids longer or between sessions. If set to
+      False, missing ids are not remembered.
+
+    * *search_cache_size* (default=128) The number of search results to keep
+      in memory. Searches differing only in case, white space or Unicode
+      normalization share the same result.
+
+    * *search_cache_ttl* (default=3600) The number of seconds to keep the
+      search results in memory. If None, they are kept until removed by
+      *search_cache_size*.
+
+    * *store* (default=None) A :class:`pytvdbapi.store.Store` keeping the
+      records of the loaded shows and episodes. Shows and episodes found in
+      the store are returned without loading any data from the server,
+      unless the *cache* argument is used to bypass the cache. See
+      :func:`ingest_updates` to keep the store up to date.
+
+    * *mode* (default=None) The serving mode, deciding when the cached data
+      is used. It requires the loader to support the mode, as
+      :class:`pytvdbapi.loader.Loader` does. The modes are:
+
+      * :data:`pytvdbapi.loader.STALE_WHILE_REVALIDATE` The cached data is
+        returned right away, even if stale, and refreshed from the server
+        in the background.
+      * :data:`pytvdbapi.loader.STALE_IF_ERROR` The cached data is returned,
+        even if stale, if the server can not be reached or fails.
+      * :data:`pytvdbapi.loader.OFFLINE` Only the cached data is used, the
+        server is never contacted. Data not in the cache raises
+        :class:`pytvdbapi.error.ConnectionError`.
+
+      The :class:`Show`, :class:`Episode` and :class:`Search` instances have
+      an *age* attribute, with the number of seconds since the server sent
+      the data they were created from, or None if not known.
+
+      Example::
+
+          from pytvdbapi import api
+          from pytvdbapi.loader import STALE_IF_ERROR
+
+          db = api.TVDB("B43FF87DE395DF56", mode=STALE_IF_ERROR)
+          show = db.get_series(79349, "en")
+          if show.age > 24 * 60 * 60:
+              print("Using data older than a day")
+
+    * *lazy_types* (default=False) If set to True, the data of shows and
+      episodes is kept as text and each attribute is converted to its type
+      when first accessed, see :data:`pytvdbapi.xmlhelpers.SCHEMAS`. The
+      time used to parse the data then depends on the attributes used.
+      The records added to the *store* are always converted.
+
+    The functions loading data accept a *cache* argument. If set to False,
+    the locally cached data is ignored and the data is reloaded from the
+    server. If set to :data:`pytvdbapi.loader.REVALIDATE`, the server is
+    asked if the cached data is still valid and the data is only reloaded
+    if it has changed.
     """
 
     def __init__(self, api_key, **kwargs):
         self.config = dict()
 
+        self.mode = kwargs.get('mode', None)
+        if self.mode not in (None, STALE_WHILE_REVALIDATE, STALE_IF_ERROR, OFFLINE):
+            raise error.TVDBValueError("Invalid mode {0}".format(self.mode))
+
         #cache old searches to avoid hitting the server
-        self.search_buffer = dict()
+        self.search_buffer = LRUCache(kwargs.get('search_cache_size', 128),
+                                      kwargs.get('search_cache_ttl', 3600))
 
         #Store the path to where we are
         self.path = os.path.abspath(os.path.dirname(__file__))
@@ -616,14 +1029,48 @@ class TVDB(object):
         self.config['actors'] = kwargs.get('actors', False)
         self.config['banners'] = kwargs.get('banners', False)
         self.config['ignore_case'] = kwargs.get('ignore_case', False)
-
-        #Create the loader object to use
-        self.loader = Loader(self.config['cache_dir'])
+        self.config['use_zip'] = kwargs.get('use_zip', False)
+        self.config['cache_max_bytes'] = kwargs.get('cache_max_bytes', None)
+        self.config['cache_max_age'] = kwargs.get('cache_max_age', None)
+        self.config['freshness'] = kwargs.get('freshness', None)
+        self.config['lazy_types'] = kwargs.get('lazy_types', False)
+
+        #Create the loader object to use, unless one was provided
+        self.loader = kwargs.get('loader', None) or Loader(self.config['cache_dir'],
+                                                           max_bytes=self.config['cache_max_bytes'],
+                                                           max_age=self.config['cache_max_age'],
+                                                           freshness=self.config['freshness'])
+
+        #Create the cache of parsed data, unless one was provided or it is disabled
+        parse_cache = kwargs.get('parse_cache', True)
+        self.parse_cache = ParseCache() if parse_cache is True else (parse_cache or None)
+        self.store = kwargs.get('store', None)
+
+        negative_cache = kwargs.get('negative_cache', True)
+        self.negative_cache = NegativeCache() if negative_cache is True else (negative_cache or None)
 
         #Create the list of available mirrors
-        tree = generate_tree(self.loader.load(__mirrors__.format(**self.config)))
+        tree = generate_tree(_load_raw(self, __mirrors__.format(**self.config)))
         self.mirrors = MirrorList(tree)
 
+    @property
+    def cache(self):
+        """
+        .. versionadded:: 0.5
+
+        The cache used by the loader, or None if the loader does not have a
+        cache. The caches provided in :mod:`pytvdbapi.cache` can be
+        maintained using the *stats*, *prune* and *clear* functions.
+
+        Example::
+
+            db = api.TVDB("B43FF87DE395DF56", cache_max_bytes=100 * 1024 * 1024)
+            print(db.cache.stats()['bytes'])
+            db.cache.prune(max_age=7 * 24 * 60 * 60)
+            db.cache.clear(resource_type='search')
+        """
+        return getattr(self.loader, 'cache', None)
+
     def search(self, show, language, cache=True):
         """
         :param show: The show name to search for
@@ -639,8 +1086,10 @@ class TVDB(object):
         languages. It will raise :class:`pytvdbapi.error.TVDBValueError` if
         an invalid language is provided.
 
-        Searches are always cached within a session to make subsequent
-        searches with the same parameters really cheap and fast. If *cache*
+        Searches are cached within a session to make subsequent searches
+        with the same parameters really cheap and fast, see the
+        *search_cache_size* and *search_cache_ttl* keyword arguments of
+        :class:`TVDB`. If *cache*
         is set to True searches will also be cached across sessions,
         this is recommended to increase speed and to reduce the workload of
         the servers.
@@ -657,20 +1106,22 @@ class TVDB(object):
         """
         logger.debug("Searching for {0} using language {1}".format(show, language))
 
-        if language != 'all' and language not in __LANGUAGES__:
-            raise error.TVDBValueError("{0} is not a valid language".format(language))
+        _validate_language(language)
 
-        if (show, language) not in self.search_buffer or not cache:
-            if sys.version_info < (3, 0):
-                show = str(show.encode('utf-8'))
+        query, key = _normalize_query(show)
+        buffered = self.search_buffer.get((key, language)) if cache is True else None
 
-            context = {'series': quote(show), "language": language}
-            data = generate_tree(self.loader.load(__search__.format(**context), cache))
-            shows = [Show(d, self, language, self.config) for d in parse_xml(data, "Series")]
+        if buffered is None:
+            url = __search__.format(series=quote(query.encode('utf-8')), language=language)
+            data, age = _load_content(self, url, cache)
+            shows = [Show(d, self, language, self.config)
+                     for d in _parse(self, url, data, ('Series',))['Series']]
+            for _show in shows:
+                _show.age = age
 
-            self.search_buffer[(show, language)] = shows
+            buffered = self.search_buffer[(key, language)] = (shows, age)
 
-        return Search(self.search_buffer[(show, language)], show, language)
+        return Search(buffered[0], show, language, buffered[1])
 
     def get(self, series_id, language, cache=True):
         """
@@ -720,34 +1171,349 @@ class TVDB(object):
 
         logger.debug("Getting series with id {0} with language {1}".format(series_id, language))
 
-        if language != 'all' and language not in __LANGUAGES__:
-            raise error.TVDBValueError("{0} is not a valid language".format(language))
+        _validate_language(language)
 
-        context = {'seriesid': series_id, "language": language,
-                   'mirror': self.mirrors.get_mirror(TypeMask.XML).url,
-                   'api_key': self.config['api_key']}
+        return self._load_show(series_id, language, cache)
+
+    def get_series_many(self, series_ids, language, full=True, max_workers=4, cache=True):
+        """
+        .. versionadded:: 0.5
+
+        :param series_ids: An iterable of Show Ids to fetch
+        :param language: The language abbreviation to search for. E.g. "en"
+        :param full: If True, the full data set of the shows will be loaded,
+            including the actors and banners if requested using the *actors*
+            and *banners* keyword arguments.
+        :param max_workers: The maximum number of requests to run at the same
+            time.
+        :param cache: If False, the local cache will not be used and the
+                    resources will be reloaded from server.
+
+        :return: A generator yielding tuples of *(series_id, result)*
+        :raise: :class:`pytvdbapi.error.TVDBValueError`
+
+        Fetches a number of shows using a pool of *max_workers* threads. The
+        result for each Show Id is yielded as soon as it is done, in the order
+        they finish. The Show Ids are taken from *series_ids* as the workers
+        need them, and the actor and banner data of the started shows is
+        loaded before any new show is started. At most twice *max_workers*
+        shows are loaded ahead of the results consumed, so *series_ids* may
+        be a long or endless iterator. The result is either the :class:`Show()` instance or, if
+        the show could not be loaded, the exception that was raised, e.g.
+        :class:`pytvdbapi.error.TVDBIdError` or
+        :class:`pytvdbapi.error.ConnectionError`. A failure for one Show Id
+        will not affect the other Ids.
+
+        When *full* is True, the series data is only loaded once and the
+        actor and banner data are loaded in parallel. If the *use_zip* keyword
+        argument is used, all data is loaded from the zip archive.
+
+        .. note:: To get any benefit from the workers the loader has to be
+            able to run several requests at the same time. Make sure that the
+            *pool_size* of the :class:`pytvdbapi.loader.Loader` is at least
+            *max_workers*.
+
+        Example::
+
+            >>> from pytvdbapi import api
+            >>> from pytvdbapi.loader import Loader
+            >>> db = api.TVDB("B43FF87DE395DF56", loader=Loader("/tmp/pytvdbapi", pool_size=4))
+            >>> for series_id, show in sorted(db.get_series_many([79349, 79168], "en")):
+            ...     print(series_id, show)
+            ...
+            79168 <Show - Friends>
+            79349 <Show - Dexter>
+
+        """
+        logger.debug("Getting series with ids {0} with language {1}".format(series_ids, language))
+
+        _validate_language(language)
+
+        if max_workers < 1:
+            raise error.TVDBValueError("max_workers must be at least 1")
+
+        ids, parts = iter(series_ids), deque()
+        results = Queue()
+        condition, stopped = threading.Condition(), threading.Event()
+        state = dict(exhausted=False, failure=None, running=0, pending=0)
+        limit = 2 * max_workers
+
+        def _finish(job, result=None):
+            """Completes one part of the job, posting the result once all parts are done"""
+            with condition:
+                if result is not None and job.result is None:
+                    job.result = result
+                job.remaining -= 1
+                done = job.remaining == 0
+
+            if done:
+                results.put((job.series_id, job.result or job.show))
+
+        def _run(job, function):
+            """Runs one part of the job"""
+            try:
+                function()
+            except error.PytvdbapiError as _error:
+                _finish(job, _error)
+            except Exception as _error:  # pylint: disable=W0703
+                _finish(job, _error)
+            else:
+                _finish(job)
+
+        def _load(job):
+            """Loads the show and queues the loading of the extra data"""
+            job.show = self._load_show(job.series_id, language, cache, full)
+
+            if full and not self.config.get('use_zip', False):
+                functions = []
+                if self.config.get('actors', False):
+                    functions.append(job.show.load_actors)
+                if self.config.get('banners', False):
+                    functions.append(job.show.load_banners)
+
+                with condition:
+                    job.remaining += len(functions)
+                    parts.extend((job, function) for function in functions)
+                    condition.notify_all()
+
+        def _next_task():
+            """
+            Returns the next task, preferring the parts of started jobs over
+            starting a new job, or None once all jobs are done
+            """
+            with condition:
+                while not stopped.is_set():
+                    if parts:
+                        state['running'] += 1
+                        return parts.popleft()
+
+                    if not state['exhausted'] and state['pending'] < limit:
+                        try:
+                            job = _SeriesJob(next(ids))
+                        except StopIteration:
+                            state['exhausted'] = True
+                        except Exception as _error:  # pylint: disable=W0703
+                            state['exhausted'], state['failure'] = True, _error
+                        else:
+                            state['running'] += 1
+                            state['pending'] += 1
+                            return job, lambda: _load(job)
+                        continue
+
+                    if state['exhausted'] and state['running'] == 0:
+                        # Wakes up the consumer once all results are posted
+                        results.put(None)
+                        return None
+
+                    condition.wait()
+
+        def _worker():
+            """Runs tasks until stopped or all jobs are done"""
+            while True:
+                task = _next_task()
+                if task is None:
+                    break
+                try:
+                    _run(*task)  # pylint: disable=W0142
+                finally:
+                    with condition:
+                        state['running'] -= 1
+                        condition.notify_all()
+
+        workers = [threading.Thread(target=_worker) for _ in range(max_workers)]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+
+        try:
+            while True:
+                item = results.get()
+                if item is None:
+                    break
+
+                with condition:
+                    state['pending'] -= 1
+                    condition.notify_all()
+
+                series_id, result = item
+                if isinstance(result, Exception) and not isinstance(result, error.PytvdbapiError):
+                    raise result
+                yield series_id, result
+
+            if state['failure'] is not None:
+                raise state['failure']  # pylint: disable=E0702
+        finally:
+            with condition:
+                stopped.set()
+                condition.notify_all()
+            for worker in workers:
+                worker.join()
+
+    def sync(self, since=None, language=None, series_ids=None, max_workers=4):
+        """
+        .. versionadded:: 0.5
+
+        :param since: The server time returned by the previous call. If None,
+            only the current server time is returned.
+        :param language: Optional. The language abbreviation to reload the
+            changed shows in. E.g. "en"
+        :param series_ids: Optional. The Show Ids to reload if they have
+            changed, used together with *language*.
+        :param max_workers: The maximum number of shows to reload at the same
+            time, see :func:`get_series_many`.
+        :return: The current server time, to pass as *since* to the next call
+        :raise: :class:`pytvdbapi.error.TVDBValueError`,
+            :class:`pytvdbapi.error.BadData`
+
+        Asks the server which series and episodes have changed since the
+        time *since*, and removes the data of those from the cache, so that
+        only the changed data is reloaded from the server. The data of the
+        changed shows in *series_ids* is reloaded right away, using a pool of
+        *max_workers* threads.
+
+        The cache is only updated if the loader has a cache supporting
+        *invalidate*, such as :class:`pytvdbapi.cache.FileCache` and
+        :class:`pytvdbapi.cache.SQLiteCache`. The changed records are removed
+        from the *store* as well.
+
+        .. note:: The server only keeps track of the changes made during the
+            last 30 days.
+
+        Example::
+
+            db = api.TVDB("B43FF87DE395DF56")
+            timestamp = db.sync()
+
+            # Later, e.g. the next day
+            timestamp = db.sync(timestamp, "en", series_ids=[79349, 79168])
+        """
+        if language is not None:
+            _validate_language(language)
+
+        if since is None:
+            tree = generate_tree(_load_raw(self, __time__, False))
+        else:
+            tree = generate_tree(_load_raw(self, __updates__.format(time=int(since)), False))
+
+        timestamp = tree.findtext('Time')
+        if timestamp is None or not timestamp.strip().isdigit():
+            raise error.BadData("No server time returned from Updates.php")
+
+        if since is None:
+            return int(timestamp)
+
+        series = set(int(item.text) for item in tree.findall('Series'))
+        episodes = set(int(item.text) for item in tree.findall('Episode'))
+        logger.debug("{0} series and {1} episodes changed since {2}".format(
+            len(series), len(episodes), since))
+
+        for target in (self.cache, self.store):
+            invalidate = getattr(target, 'invalidate', None)
+            if invalidate is not None:
+                invalidate(series, episodes)
+        if series:
+            self.search_buffer.clear()
+
+        if language is not None and series_ids is not None:
+            changed = sorted(series.intersection(int(series_id) for series_id in series_ids))
+            for series_id, result in self.get_series_many(changed, language, max_workers=max_workers,
+                                                          cache=False):
+                if isinstance(result, Exception):
+                    logger.warning("Unable to reload series {0}: {1}".format(series_id, result))
+
+        return int(timestamp)
+
+    def ingest_updates(self, period='day'):
+        """
+        .. versionadded:: 0.5
+
+        :param period: The period of the updates archive, one of *day*,
+            *week* or *month*
+        :return: A dictionary with the number of *series*, *episodes* and
+            *banners* records read, see :func:`pytvdbapi.store.Store.ingest`
+        :raise: :class:`pytvdbapi.error.TVDBValueError`,
+            :class:`pytvdbapi.error.BadData`
+
+        Loads the archive of the records changed on the server during the
+        last *period* and updates the *store* with them. Use a period at least
+        as long as the time since the last call.
+        """
+        if self.store is None:
+            raise error.TVDBValueError("ingest_updates requires the store keyword argument")
+        if period not in ('day', 'week', 'month'):
+            raise error.TVDBValueError("Invalid period {0}".format(period))
+
+        url = self._url(__updates_zip__, mirror=self.mirrors.get_mirror(TypeMask.ZIP).url, period=period)
+        return self.store.ingest(_load_raw(self, url, False))
+
+    def _load_show(self, series_id, language, cache, full=False):
+        """
+        Loads the show with the given id. If *full* is True, the seasons of
+        the show will be populated from the same data.
+        """
+        return _remember_missing(self, ('series', '{0}'.format(series_id), language), cache,
+                                 "Series id {0} not found".format(series_id),
+                                 self._fetch_show, series_id, language, cache, full)
+
+    def _fetch_show(self, series_id, language, cache, full):
+        """Loads the show, see :func:`_load_show`"""
+        use_zip = full and self.config.get('use_zip', False)
+
+        store = _stored(self, cache)
+        series = store.series(series_id, language) if store is not None else None
+        if series is not None:
+            return self._stored_show(series, language, full, use_zip)
+
+        if use_zip:
+            url = self._url(__zip__, mirror=self.mirrors.get_mirror(TypeMask.ZIP).url,
+                            seriesid=series_id, language=language)
+        else:
+            url = self._url(__series__, seriesid=series_id, language=language)
 
-        url = __series__.format(**context)
         try:
-            data = self.loader.load(url, cache)
+            data, age = _load_content(self, url, cache)
         except error.TVDBNotFoundError:
             raise error.TVDBIdError("Series id {0} not found".format(series_id))
         except error.ConnectionError as _error:
             logger.debug("Unable to connect to URL: {0}. {1}".format(url, _error))
             raise
 
-        if data.strip():
-            data = generate_tree(data)
-        else:
-            raise error.TVDBIdError("No Show with id {0} found".format(series_id))
-
-        series = parse_xml(data, "Series")
-        assert len(series) <= 1, "Should not find more than one series"
+        message = "No Show with id {0} found".format(series_id)
 
-        if len(series) >= 1:
-            return Show(series[0], self, language, self.config)
+        # pylint: disable=W0212
+        if use_zip:
+            parsed = _parse_zip(self, url, data, language)
+            show = Show(_single(parsed[0]['Series'], "Series", message), self, language, self.config)
+            show.age = age
+            _save(self, language, parsed[0])
+            show._set_zip_data(parsed)
         else:
-            raise error.TVDBIdError("No Show with id {0} found".format(series_id))
+            # The episodes are parsed as well to add the full data to the store
+            elements = _SERIES if full or self.store is not None else ('Series',)
+            parsed = _parse(self, url, data, elements, message)
+            show = Show(_single(parsed['Series'], "Series", message), self, language, self.config)
+            show.age = age
+            if 'Episode' in parsed:
+                _save(self, language, parsed)
+            if full:
+                show._set_series_data(parsed)
+
+        return show
+
+    def _stored_show(self, series, language, full, use_zip):
+        """Creates the show from the records in the store"""
+        show = Show(series, self, language, self.config)
+        if full:
+            # pylint: disable=W0212
+            show._set_series_data({'Series': [series], 'Episode': self.store.episodes(show.id, language)})
+
+            # The zip archive would have included the actors and banners
+            if use_zip and self.config.get('actors', False):
+                show.load_actors()
+            if use_zip and self.config.get('banners', False):
+                show.load_banners()
+
+        return show
 
     def get_episode(self, episode_id, language, cache=True):
         """
@@ -783,32 +1549,39 @@ class TVDB(object):
 
         logger.debug("Getting episode with id {0} with language {1}".format(episode_id, language))
 
-        if language != 'all' and language not in __LANGUAGES__:
-            raise error.TVDBValueError("{0} is not a valid language".format(language))
+        _validate_language(language)
 
-        context = {'episodeid': episode_id, "language": language,
-                   'mirror': self.mirrors.get_mirror(TypeMask.XML).url,
-                   'api_key': self.config['api_key']}
+        return _remember_missing(self, ('episode', '{0}'.format(episode_id), language), cache,
+                                 "No Episode with id {0} found".format(episode_id),
+                                 self._fetch_episode, episode_id, language, cache)
+
+    def _fetch_episode(self, episode_id, language, cache):
+        """Loads the episode, see :func:`get_episode`"""
+        store = _stored(self, cache)
+        episode = store.episode(episode_id, language) if store is not None else None
+        if episode is not None:
+            return Episode(episode, None, self.config)
 
-        url = __episode__.format(**context)
+        url = self._url(__episode__, episodeid=episode_id, language=language)
 
         try:
-            data = self.loader.load(url, cache)
+            data, age = _load_content(self, url, cache)
         except error.TVDBNotFoundError:
             raise error.TVDBIdError("No Episode with id {0} found".format(episode_id))
         except error.ConnectionError as _error:
             logger.debug("Unable to connect to URL: {0}. {1}".format(url, _error))
             raise
 
-        if data.strip():
-            data = generate_tree(data)
-        else:
-            raise error.TVDBIdError("No Episode with id {0} found".format(episode_id))
+        message = "No Episode with id {0} found".format(episode_id)
+        parsed = _parse(self, url, data, ('Episode',), message)
+        episode = Episode(_single(parsed['Episode'], "Episode", message), None, self.config)
+        episode.age = age
+        return episode
 
-        episodes = parse_xml(data, "Episode")
-        assert len(episodes) <= 1, "Should not find more than one episodes"
+    def _url(self, template, **kwargs):
+        """Formats the URL template using the current mirror and API key"""
+        context = {'mirror': self.mirrors.get_mirror(TypeMask.XML).url,
+                   'api_key': self.config['api_key']}
+        context.update(kwargs)
 
-        if len(episodes) >= 1:
-            return Episode(episodes[0], None, self.config)
-        else:
-            raise error.TVDBIdError("No Episode with id {0} found".format(episode_id))
+        return template.format(**context)
@@ -0,0 +1,1038 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 - 2013 Björn Larsson
+
+# This file is part of pytvdbapi.
+#
+# pytvdbapi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pytvdbapi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pytvdbapi.  If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+A module providing cache backends for the :class:`pytvdbapi.loader.Loader`.
+
+.. versionadded:: 0.5
+
+By default the loader uses the :class:`FileCache`, storing one file for each
+URL in the cache directory. With a large number of cached resources, the
+:class:`SQLiteCache` storing all entries in a single SQLite database is a
+better alternative. An existing cache directory can be moved into the
+database using :func:`migrate`.
+
+Both caches can be limited in size and age using the *max_bytes* and
+*max_age* arguments. Once the cache grows above *max_bytes*, the least
+recently used entries are removed. The caches can also be maintained
+explicitly using the *stats*, *prune*, *clear* and *invalidate* functions, available
+through :attr:`pytvdbapi.api.TVDB.cache`. Entries can be removed while other
+processes are using the same cache.
+
+Example::
+
+    from pytvdbapi import api
+    from pytvdbapi.cache import SQLiteCache, migrate
+    from pytvdbapi.loader import Loader
+
+    cache = SQLiteCache("/tmp/pytvdbapi.db", max_bytes=512 * 1024 * 1024)
+    migrate("/tmp/pytvdbapi", cache)
+
+    db = api.TVDB("B43FF87DE395DF56", loader=Loader("/tmp/pytvdbapi", cache=cache))
+    print(db.cache.stats())
+"""
+
+import hashlib
+import logging
+import math
+import os
+import re
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+import httplib2
+
+try:
+    import cPickle as pickle  # pylint: disable=F0401
+except ImportError:
+    import pickle
+
+from pytvdbapi import error
+from pytvdbapi.loader import cache_key, normalize_url, resource_type
+from pytvdbapi.utils import LRUCache
+
+__all__ = ['BloomFilter', 'BloomNegativeCache', 'FileCache', 'NegativeCache', 'ParseCache', 'SQLiteCache',
+           'migrate']
+
+logger = logging.getLogger(__name__)  # pylint: disable=C0103
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    resource TEXT NOT NULL,
+    id TEXT,
+    language TEXT,
+    headers BLOB NOT NULL,
+    body BLOB NOT NULL,
+    compressed INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    stored REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_resource ON entries (resource, id, language);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+# Separates the headers from the body of a cache entry
+_SEPARATOR = b"\r\n\r\n"
+
+# Matches the URL stored by httplib2 in the cached headers
+_LOCATION = re.compile(br'^content-location:\s*(\S+)\s*$', re.IGNORECASE | re.MULTILINE)
+
+# The prefix of the temporary files used while writing the cache files
+_TEMPORARY = '.tmp'
+
+# When the size limit is exceeded, the cache is pruned to this fraction of
+# the limit, to avoid pruning again on the next write.
+_LOW_WATER = 0.9
+
+# The number of seconds between updates of the last access time of an entry
+_ACCESS_RESOLUTION = 60
+
+# The resource types identified by a series id, and by an episode id
+_SERIES_RESOURCES = ('series', 'zip', 'actors', 'banners')
+_EPISODE_RESOURCES = ('episode',)
+
+
+def _decompress(value):
+    """Decompresses a cache entry stored compressed"""
+    if value[:1] == b'x':
+        try:
+            return zlib.decompress(value)
+        except zlib.error:
+            pass
+    return value
+
+
+def _location(entry):
+    """Returns the URL stored in the cache entry, or None"""
+    match = _LOCATION.search(entry.split(_SEPARATOR, 1)[0])
+    if not entry.startswith(b"status:") or match is None:
+        return None
+    return match.group(1).decode('utf-8')
+
+
+def _targets(series_ids, episode_ids):
+    """Returns the set of (resource type, id) of the entries to invalidate"""
+    targets = set()
+    for resources, ids in ((_SERIES_RESOURCES, series_ids), (_EPISODE_RESOURCES, episode_ids)):
+        for _id in ids:
+            targets.update((resource, str(_id)) for resource in resources)
+    return targets
+
+
+def _write(directory, filename, data):
+    """
+    Writes the data to a temporary file in the directory, then renames it to
+    *filename* so that it is never read partially written.
+    """
+    handle, temporary = tempfile.mkstemp(prefix=_TEMPORARY, dir=directory)
+    try:
+        os.write(handle, data)
+    finally:
+        os.close(handle)
+
+    try:
+        os.rename(temporary, filename)
+    except OSError:  # The file exists on Windows
+        os.remove(filename)
+        os.rename(temporary, filename)
+
+
+def _new_stats():
+    """Creates the dictionary returned by the stats functions"""
+    return dict(entries=0, bytes=0, resources=dict())
+
+
+def _add_stats(stats, resource, entries, size):
+    """Adds the entries of the resource type to the stats"""
+    stats['entries'] += entries
+    stats['bytes'] += size
+
+    resources = stats['resources'].setdefault(resource, dict(entries=0, bytes=0))
+    resources['entries'] += entries
+    resources['bytes'] += size
+
+
+class FileCache(object):
+    """
+    :param path: The cache directory. It is created if it does not exist.
+    :param compress: If True, the cached data is stored compressed.
+    :param max_bytes: Optional. The maximum size of the cache, in bytes.
+    :param max_age: Optional. The number of seconds to keep the entries.
+
+    The default cache of the :class:`pytvdbapi.loader.Loader`, storing each
+    entry in a file named after its key. It uses the same file names as the
+    httplib2 file cache. The loader stores the entries using the key from
+    :func:`pytvdbapi.loader.cache_key`, but still finds the entries of
+    existing cache directories, stored using the URL.
+
+    The files are written to a temporary file first and then renamed, so
+    other processes never read a partially written entry.
+    """
+    def __init__(self, path, compress=True, max_bytes=None, max_age=None):
+        self.path, self.compress = os.path.abspath(path), compress
+        self.max_bytes, self.max_age = max_bytes, max_age
+
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+
+        self._size = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _filename(self, key):
+        """Returns the path of the file used for the key"""
+        return os.path.join(self.path, httplib2.safename(key))
+
+    def get(self, key):
+        """
+        :param key: The URL of the entry
+        :return: The cached entry, or None if not found
+        """
+        filename, now = self._filename(key), time.time()
+        try:
+            modified = os.path.getmtime(filename)
+            if self.max_age is not None and modified < now - self.max_age:
+                return None
+
+            with open(filename, 'rb') as handle:
+                value = handle.read()
+
+            # Record the access, used to find the least recently used entries
+            if os.path.getatime(filename) < now - _ACCESS_RESOLUTION:
+                os.utime(filename, (now, modified))
+        except (IOError, OSError):
+            return None
+
+        return _decompress(value)
+
+    def set(self, key, value):
+        """
+        :param key: The URL of the entry
+        :param value: The entry to store
+        """
+        if self.compress:
+            value = zlib.compress(value)
+
+        _write(self.path, self._filename(key), value)
+        self._grow(len(value))
+
+    def delete(self, key):
+        """
+        :param key: The URL of the entry
+
+        Deletes the entry, if it exists.
+        """
+        try:
+            os.remove(self._filename(key))
+        except OSError:
+            pass
+
+    def _grow(self, size):
+        """Keeps track of the size of the cache, pruning it if needed"""
+        if self.max_bytes is None:
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(entry[1] for entry in self._entries())
+            else:
+                self._size += size
+            exceeded = self._size > self.max_bytes
+
+        if exceeded:
+            self.prune(max_bytes=int(self.max_bytes * _LOW_WATER))
+
+    def _entries(self):
+        """Returns a list of (filename, size, modified, accessed) of the entries"""
+        entries = list()
+        for name in os.listdir(self.path):
+            if name.startswith(_TEMPORARY):
+                continue
+            filename = os.path.join(self.path, name)
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                continue
+            entries.append((filename, stat.st_size, stat.st_mtime, stat.st_atime))
+        return entries
+
+    def _remove(self, filenames):
+        """Removes the files, returning the number of removed files"""
+        count = 0
+        for filename in filenames:
+            try:
+                os.remove(filename)
+                count += 1
+            except OSError:
+                pass
+        return count
+
+    def prune(self, max_bytes=None, max_age=None):
+        """
+        :param max_bytes: Optional. The size to prune the cache to. Defaults
+            to the *max_bytes* of the cache.
+        :param max_age: Optional. The age of the entries to remove. Defaults
+            to the *max_age* of the cache.
+        :return: The number of removed entries
+
+        Removes the entries older than *max_age*, and then the least recently
+        used entries until the cache is no larger than *max_bytes*.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        max_age = self.max_age if max_age is None else max_age
+
+        entries, removed = self._entries(), list()
+        if max_age is not None:
+            limit = time.time() - max_age
+            removed = [entry for entry in entries if entry[2] < limit]
+            entries = [entry for entry in entries if entry[2] >= limit]
+
+        size = sum(entry[1] for entry in entries)
+        if max_bytes is not None and size > max_bytes:
+            entries.sort(key=lambda entry: max(entry[2], entry[3]))
+            while entries and size > max_bytes:
+                entry = entries.pop(0)
+                removed.append(entry)
+                size -= entry[1]
+
+        count = self._remove(entry[0] for entry in removed)
+        with self._lock:
+            self._size = size
+
+        logger.debug("Removed {0} entries from the cache".format(count))
+        return count
+
+    def _read(self, filename):
+        """Returns the URL stored in the file, or None"""
+        try:
+            with open(filename, 'rb') as handle:
+                return _location(_decompress(handle.read()))
+        except (IOError, OSError):
+            return None
+
+    def stats(self):
+        """
+        :return: A dictionary with the number of *entries* and the number of
+            *bytes* in the cache, and the same numbers for each resource type
+            in *resources*.
+
+        .. note:: Each file has to be read to find the resource type, this can
+            take some time for a large cache.
+        """
+        stats = _new_stats()
+        for filename, size, _, _ in self._entries():
+            url = self._read(filename)
+            _add_stats(stats, resource_type(url).type if url else 'other', 1, size)
+        return stats
+
+    def clear(self, resource_type=None):  # pylint: disable=W0621
+        """
+        :param resource_type: Optional. Only remove the entries of this
+            resource type, as returned by :func:`pytvdbapi.loader.resource_type`.
+        :return: The number of removed entries
+
+        Removes the entries from the cache.
+        """
+        entries = self._entries()
+        if resource_type is not None:
+            entries = [entry for entry in entries if self._type(entry[0]) == resource_type]
+
+        with self._lock:
+            self._size = None
+        return self._remove(entry[0] for entry in entries)
+
+    def invalidate(self, series_ids=(), episode_ids=()):
+        """
+        :param series_ids: The ids of the series to remove
+        :param episode_ids: The ids of the episodes to remove
+        :return: The number of removed entries
+
+        Removes the entries of the series, in all languages and including the
+        zip archives, actors and banners, and the entries of the episodes.
+
+        .. note:: Each file has to be read to find the resource, this can take
+            some time for a large cache.
+        """
+        targets = _targets(series_ids, episode_ids)
+        if not targets:
+            return 0
+
+        filenames = list()
+        for filename, _, _, _ in self._entries():
+            url = self._read(filename)
+            if url is not None and resource_type(url)[:2] in targets:
+                filenames.append(filename)
+
+        with self._lock:
+            self._size = None
+        return self._remove(filenames)
+
+    def _type(self, filename):
+        """Returns the resource type of the entry stored in the file"""
+        url = self._read(filename)
+        return resource_type(url).type if url else 'other'
+
+
+class SQLiteCache(object):
+    """
+    :param path: The path of the database file. It is created if it does not
+        exist.
+    :param compress: If True, the cached data is stored compressed.
+    :param timeout: The number of seconds to wait for the database if it is
+        locked by another process.
+    :param max_bytes: Optional. The maximum size of the cache, in bytes.
+    :param max_age: Optional. The number of seconds to keep the entries.
+
+    A cache for the :class:`pytvdbapi.loader.Loader` storing all entries in
+    a single SQLite database. The entries are indexed by the normalized URL
+    and by the resource type, id and language of the URL.
+
+    The database uses write-ahead logging, allowing several threads and
+    processes to read from the cache while it is being written to. Each
+    thread uses its own database connection.
+    """
+    def __init__(self, path, compress=True, timeout=30, max_bytes=None, max_age=None):
+        self.path, self.compress, self.timeout = os.path.abspath(path), compress, timeout
+        self.max_bytes, self.max_age = max_bytes, max_age
+
+        directory = os.path.dirname(self.path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self._local = threading.local()
+        self._connections = list()
+        self._lock = threading.Lock()
+        self._size = None
+
+        self._connection().executescript(_SCHEMA)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        for attribute in ('_local', '_connections', '_lock'):
+            del state[attribute]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+        self._connections = list()
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        """Returns the database connection of the current thread"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout,
+                                         isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def get(self, key):
+        """
+        :param key: The URL of the entry
+        :return: The cached entry, or None if not found
+        """
+        key, now = normalize_url(key), time.time()
+        connection = self._connection()
+
+        row = connection.execute("SELECT headers, body, compressed, stored, accessed FROM entries "
+                                 "WHERE key = ?", (key,)).fetchone()
+        if row is None or (self.max_age is not None and row[3] < now - self.max_age):
+            return None
+
+        # Record the access, used to find the least recently used entries
+        if row[4] < now - _ACCESS_RESOLUTION:
+            connection.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+
+        headers, body = bytes(row[0]), bytes(row[1])
+        if row[2]:
+            body = zlib.decompress(body)
+        return headers + body
+
+    def set(self, key, value):
+        """
+        :param key: The URL of the entry
+        :param value: The entry to store
+
+        Stores the entry, replacing any existing entry for the same URL.
+        """
+        index = value.find(_SEPARATOR)
+        index = len(value) if index < 0 else index + len(_SEPARATOR)
+        headers, body = value[:index], value[index:]
+
+        compressed = self.compress and len(body) > 0
+        if compressed:
+            body = zlib.compress(body)
+
+        key, now = normalize_url(key), time.time()
+        resource = resource_type(key)
+        self._connection().execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, resource.type, resource.id, resource.language, sqlite3.Binary(headers),
+             sqlite3.Binary(body), int(compressed), len(headers) + len(body), now, now))
+
+        self._grow(len(headers) + len(body))
+
+    def delete(self, key):
+        """
+        :param key: The URL of the entry
+
+        Deletes the entry, if it exists.
+        """
+        self._connection().execute("DELETE FROM entries WHERE key = ?", (normalize_url(key),))
+
+    def _total(self, connection):
+        """Returns the total size of the entries"""
+        return connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _grow(self, size):
+        """Keeps track of the size of the cache, pruning it if needed"""
+        if self.max_bytes is None:
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._total(self._connection())
+            else:
+                self._size += size
+            exceeded = self._size > self.max_bytes
+
+        if exceeded:
+            self.prune(max_bytes=int(self.max_bytes * _LOW_WATER))
+
+    def prune(self, max_bytes=None, max_age=None):
+        """
+        :param max_bytes: Optional. The size to prune the cache to. Defaults
+            to the *max_bytes* of the cache.
+        :param max_age: Optional. The age of the entries to remove. Defaults
+            to the *max_age* of the cache.
+        :return: The number of removed entries
+
+        Removes the entries older than *max_age*, and then the least recently
+        used entries until the cache is no larger than *max_bytes*.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        max_age = self.max_age if max_age is None else max_age
+
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            count = 0
+            if max_age is not None:
+                count += connection.execute(
+                    "DELETE FROM entries WHERE stored < ?", (time.time() - max_age,)).rowcount
+
+            size = self._total(connection)
+            if max_bytes is not None and size > max_bytes:
+                keys = list()
+                for key, entry_size in connection.execute("SELECT key, size FROM entries ORDER BY accessed"):
+                    if size <= max_bytes:
+                        break
+                    keys.append((key,))
+                    size -= entry_size
+                connection.executemany("DELETE FROM entries WHERE key = ?", keys)
+                count += len(keys)
+
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+        with self._lock:
+            self._size = size
+
+        logger.debug("Removed {0} entries from the cache".format(count))
+        return count
+
+    def stats(self):
+        """
+        :return: A dictionary with the number of *entries* and the number of
+            *bytes* in the cache, and the same numbers for each resource type
+            in *resources*.
+        """
+        stats = _new_stats()
+        for resource, entries, size in self._connection().execute(
+                "SELECT resource, COUNT(*), SUM(size) FROM entries GROUP BY resource"):
+            _add_stats(stats, resource, entries, size)
+        return stats
+
+    def clear(self, resource_type=None):  # pylint: disable=W0621
+        """
+        :param resource_type: Optional. Only remove the entries of this
+            resource type, as returned by :func:`pytvdbapi.loader.resource_type`.
+        :return: The number of removed entries
+
+        Removes the entries from the cache.
+        """
+        if resource_type is None:
+            cursor = self._connection().execute("DELETE FROM entries")
+        else:
+            cursor = self._connection().execute("DELETE FROM entries WHERE resource = ?", (resource_type,))
+
+        with self._lock:
+            self._size = None
+        return cursor.rowcount
+
+    def invalidate(self, series_ids=(), episode_ids=()):
+        """
+        :param series_ids: The ids of the series to remove
+        :param episode_ids: The ids of the episodes to remove
+        :return: The number of removed entries
+
+        Removes the entries of the series, in all languages and including the
+        zip archives, actors and banners, and the entries of the episodes.
+        """
+        targets = sorted(_targets(series_ids, episode_ids))
+
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            count = 0
+            for target in targets:
+                count += connection.execute(
+                    "DELETE FROM entries WHERE resource = ? AND id = ?", target).rowcount
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+        with self._lock:
+            self._size = None
+        return count
+
+    def close(self):
+        """Closes all database connections"""
+        with self._lock:
+            connections, self._connections = self._connections, list()
+        self._local = threading.local()
+
+        for connection in connections:
+            connection.close()
+
+
+class ParseCache(object):
+    """
+    :param max_entries: The maximum number of results to keep in memory.
+    :param max_bytes: The maximum size, in bytes, of the pickled results kept
+        in memory. Larger results are only kept in *path*, if used.
+    :param path: Optional. A directory to store the results in, to keep them
+        between sessions.
+
+    A cache for the parsed XML data, used by :class:`pytvdbapi.api.TVDB` to
+    avoid parsing the same data again. The results are stored pickled,
+    together with a hash of the data they were parsed from. When the same
+    URL is loaded again, the stored result is used if the data is
+    unchanged, whether it was served from the HTTP cache or reloaded from
+    the server.
+
+    .. warning:: The stored results are loaded using :mod:`pickle`, only use
+        a *path* that can not be written to by others.
+    """
+    # Changed when the format of the stored results changes
+    version = 3
+
+    def __init__(self, max_entries=256, path=None, max_bytes=32 * 1024 * 1024):
+        self.max_entries, self.max_bytes, self.path = max_entries, max_bytes, path and os.path.abspath(path)
+
+        if self.path is not None and not os.path.isdir(self.path):
+            os.makedirs(self.path)
+
+        self._entries = dict()
+        self._tick = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = dict(hits=0, misses=0)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self):
+        """A dictionary with the number of *hits* and *misses*"""
+        with self._lock:
+            return dict(self._stats)
+
+    @property
+    def size(self):
+        """The size, in bytes, of the pickled results kept in memory"""
+        with self._lock:
+            return self._bytes
+
+    @staticmethod
+    def _digest(data):
+        """Returns the hash of the data"""
+        if not isinstance(data, bytes):
+            data = data.encode('utf-8')
+        return hashlib.sha1(data).digest()
+
+    @staticmethod
+    def _key(url, elements):
+        """Returns the key of the url, keeping the zip member, and elements"""
+        url, separator, member = url.partition('#')
+        key = '{0}{1}{2}#{3}'.format(cache_key(url), separator, member, '/'.join(elements))
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def get(self, url, data, elements):
+        """
+        :param url: The URL the data was loaded from
+        :param data: The loaded data
+        :param elements: The parsed elements
+        :return: The stored result, or None if not found or the data has
+            changed.
+        """
+        key, digest = self._key(url, elements), self._digest(data)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._tick += 1
+                entry[0] = self._tick
+
+        if entry is None and self.path is not None:
+            entry = self._read(key)
+
+        if entry is None or entry[1] != digest:
+            with self._lock:
+                self._stats['misses'] += 1
+            return None
+
+        with self._lock:
+            self._stats['hits'] += 1
+        return pickle.loads(entry[2])
+
+    def set(self, url, data, elements, result):
+        """
+        :param url: The URL the data was loaded from
+        :param data: The loaded data
+        :param elements: The parsed elements
+        :param result: The result of parsing the data
+        """
+        key, digest = self._key(url, elements), self._digest(data)
+        value = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+
+        self._store(key, digest, value)
+        if self.path is not None:
+            _write(self.path, os.path.join(self.path, key),
+                   pickle.dumps((self.version, digest, value), pickle.HIGHEST_PROTOCOL))
+
+    def _store(self, key, digest, value):
+        """Stores the entry in memory, removing the least recently used"""
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[2])
+
+            if len(value) > self.max_bytes:
+                return
+
+            self._tick += 1
+            self._entries[key] = [self._tick, digest, value]
+            self._bytes += len(value)
+
+            if len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                # Remove at least the oldest tenth of the entries at once
+                count = len(self._entries) // 10 + 1
+                for name in sorted(self._entries, key=lambda name: self._entries[name][0]):
+                    if count <= 0 and self._bytes <= self.max_bytes:
+                        break
+                    self._bytes -= len(self._entries.pop(name)[2])
+                    count -= 1
+
+    def _read(self, key):
+        """Reads the entry from the directory, returns None if not found"""
+        try:
+            with open(os.path.join(self.path, key), 'rb') as handle:
+                version, digest, value = pickle.load(handle)
+        except (IOError, OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return None
+
+        if version != self.version:
+            return None
+
+        self._store(key, digest, value)
+        return [None, digest, value]
+
+    def clear(self):
+        """Removes all stored results"""
+        with self._lock:
+            self._entries = dict()
+            self._bytes = 0
+
+        if self.path is not None:
+            for name in os.listdir(self.path):
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass
+
+
+class NegativeCache(object):
+    """
+    :param ttl: The number of seconds to remember the missing ids
+    :param max_entries: The maximum number of ids to remember
+
+    A cache of the ids not found on the server, used by
+    :class:`pytvdbapi.api.TVDB` to avoid asking the server for the same
+    missing series and episodes again. The keys are tuples of the kind of
+    id, *series* or *episode*, the id and the language.
+    """
+    def __init__(self, ttl=3600, max_entries=10000):
+        self.ttl = ttl
+        self._entries = LRUCache(max_entries, ttl)
+
+    @property
+    def stats(self):
+        """A dictionary with the number of *hits* and *misses*"""
+        return self._entries.stats
+
+    def __contains__(self, key):
+        return self._entries.get(key) is not None
+
+    def add(self, key):
+        """Remembers that the key is missing"""
+        self._entries[key] = True
+
+    def discard(self, key):
+        """Forgets the key, if it was found after all"""
+        self._entries.discard(key)
+
+    def clear(self):
+        """Forgets all keys"""
+        self._entries.clear()
+
+
+class BloomFilter(object):
+    """
+    :param capacity: The number of keys the filter is sized for
+    :param error_rate: The probability of a false positive when the filter
+        holds *capacity* keys
+
+    A set of strings using a fixed amount of memory. Checking for a key added
+    to the filter always returns True, but keys never added may also be
+    reported as present, with a probability of about *error_rate*.
+    """
+    def __init__(self, capacity=100000, error_rate=0.001):
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise error.TVDBValueError("capacity must be positive and error_rate between 0 and 1")
+
+        self.capacity, self.error_rate = capacity, error_rate
+        self.size = int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, int(round(self.size / float(capacity) * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        """Returns the bit positions of the key, using double hashing"""
+        first, second = struct.unpack('>QQ', hashlib.sha1(key.encode('utf-8')).digest()[:16])
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        """Adds the key to the filter"""
+        for position in self._positions(key):
+            self.bits[position // 8] |= 1 << (position % 8)
+
+    def __contains__(self, key):
+        for position in self._positions(key):
+            if not self.bits[position // 8] & (1 << (position % 8)):
+                return False
+        return True
+
+
+class BloomNegativeCache(object):
+    """
+    :param ttl: The minimum number of seconds to remember the missing ids.
+        They are remembered for at most twice as long.
+    :param capacity: The number of ids each filter is sized for
+    :param error_rate: The probability of reporting an id as missing by
+        mistake
+    :param path: Optional. The file to keep the filters in between sessions.
+
+    A :class:`NegativeCache` storing the missing ids in two
+    :class:`BloomFilter` instances, using little memory even for millions of
+    ids. New ids are added to the current filter, which replaces the
+    previous filter once it is *ttl* seconds old.
+
+    Ids can not be removed from a Bloom filter, so an id found after all is
+    remembered as missing until the filter it was added to is replaced. Use
+    the *cache* argument to bypass the cache for such ids.
+
+    The filters are written to *path* by :func:`save`, and at most once a
+    minute when new ids are added.
+    """
+    # The minimum number of seconds between saving the filters
+    save_interval = 60
+
+    # The function used to keep track of time, replaceable for testing
+    _clock = staticmethod(time.time)
+
+    def __init__(self, ttl=86400, capacity=100000, error_rate=0.001, path=None):
+        self.ttl, self.capacity, self.error_rate = ttl, capacity, error_rate
+        self.path = path and os.path.abspath(path)
+
+        self._lock = threading.Lock()
+        self._saved = self._clock()
+        self._started, self._filters = self._clock(), [BloomFilter(capacity, error_rate)]
+        self._stats = dict(hits=0, misses=0)
+
+        if self.path is not None:
+            self._load()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self):
+        """A dictionary with the number of *hits* and *misses*"""
+        with self._lock:
+            return dict(self._stats)
+
+    def _load(self):
+        """Loads the filters saved in the file"""
+        try:
+            with open(self.path, 'rb') as handle:
+                started, filters = pickle.load(handle)
+        except (IOError, OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return
+
+        self._started, self._filters = started, filters
+
+    def save(self):
+        """Writes the filters to the file, if a *path* was provided"""
+        if self.path is None:
+            return
+
+        with self._lock:
+            data = pickle.dumps((self._started, self._filters), pickle.HIGHEST_PROTOCOL)
+            self._saved = self._clock()
+
+        _write(os.path.dirname(self.path), self.path, data)
+
+    def _rotate(self, now):
+        """Replaces the previous filter if the current filter is old enough"""
+        if now - self._started >= 2 * self.ttl:
+            self._started, self._filters = now, [BloomFilter(self.capacity, self.error_rate)]
+        elif now - self._started >= self.ttl:
+            self._started = now
+            self._filters = [BloomFilter(self.capacity, self.error_rate)] + self._filters[:1]
+
+    @staticmethod
+    def _key(key):
+        """Returns the string used for the key in the filters"""
+        return '/'.join('{0}'.format(part) for part in key)
+
+    def __contains__(self, key):
+        key = self._key(key)
+        with self._lock:
+            self._rotate(self._clock())
+            found = any(key in bloom for bloom in self._filters)
+            self._stats['hits' if found else 'misses'] += 1
+        return found
+
+    def add(self, key):
+        """Remembers that the key is missing"""
+        key, now = self._key(key), self._clock()
+        with self._lock:
+            self._rotate(now)
+            self._filters[0].add(key)
+            save = self._saved + self.save_interval <= now
+
+        if save:
+            self.save()
+
+    def discard(self, key):
+        """Does nothing, ids can not be removed from a Bloom filter"""
+        pass
+
+    def clear(self):
+        """Forgets all keys"""
+        with self._lock:
+            self._started, self._filters = self._clock(), [BloomFilter(self.capacity, self.error_rate)]
+
+
+def migrate(cache_dir, cache, remove=False, canonical_keys=True):
+    """
+    :param cache_dir: The cache directory used by the :class:`FileCache` or
+        the httplib2 file cache
+    :param cache: The cache to move the entries to, e.g. a
+        :class:`SQLiteCache`
+    :param remove: If True, the migrated files are removed
+    :param canonical_keys: If True, the entries are stored using the key from
+        :func:`pytvdbapi.loader.cache_key`, as done by the loader by default.
+        Set to False for a loader created with *canonical_keys* set to False.
+    :return: The number of migrated entries
+
+    Moves the entries of an existing cache directory into *cache*. Files that
+    are not recognized as cache entries are left untouched.
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+
+    count = 0
+    for name in sorted(os.listdir(cache_dir)):
+        path = os.path.join(cache_dir, name)
+        if not os.path.isfile(path) or name.startswith(_TEMPORARY):
+            continue
+
+        with open(path, 'rb') as handle:
+            entry = _decompress(handle.read())
+
+        url = _location(entry)
+        if url is None:
+            logger.debug("Skipping {0}, not a cache entry".format(name))
+            continue
+
+        cache.set(cache_key(url) if canonical_keys else url, entry)
+        count += 1
+
+        if remove:
+            os.remove(path)
+
+    logger.debug("Migrated {0} entries from {1}".format(count, cache_dir))
+    return count
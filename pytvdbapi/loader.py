@@ -19,54 +19,1026 @@
 
 """
 A module providing the default loader to use to load urls.
+
+.. versionadded:: 0.5
+
+The loader used by :class:`pytvdbapi.api.TVDB` can be replaced by passing
+the *loader* keyword argument. Any object implementing the loader protocol
+can be used. The protocol consists of a single method:
+
+.. function:: load(url, cache=True)
+
+    :param url: The URL to be loaded
+    :param cache: If False, any locally cached data should be ignored and
+        the resource should be reloaded from the server.
+    :return: The content of the url as bytes or str
+    :raise: :class:`pytvdbapi.error.TVDBNotFoundError` if the resource does
+        not exist on the server, :class:`pytvdbapi.error.ConnectionError`
+        if the resource could not be loaded.
+
+A loader can optionally implement the *load_raw* function, taking the same
+arguments as *load* but always returning bytes. If available, it will be
+used instead of *load*.
 """
 
 import logging
-import os
+import random
+import re
+import socket
+import threading
+import time
+import zlib
+from collections import namedtuple
+from email.utils import mktime_tz, parsedate_tz
+
+try:
+    from Queue import Queue  # pylint: disable=F0401
+except ImportError:
+    from queue import Queue  # pylint: disable=F0401
+
+try:
+    from httplib import HTTPResponse  # pylint: disable=F0401
+except ImportError:
+    from http.client import HTTPResponse  # pylint: disable=F0401
+
+try:
+    from urlparse import urlsplit, urlunsplit  # pylint: disable=F0401
+except ImportError:
+    from urllib.parse import urlsplit, urlunsplit  # pylint: disable=F0401, E0611
 
 import httplib2
 
 from pytvdbapi import error
 
+__all__ = ['Loader', 'RetryPolicy', 'FreshnessPolicy', 'SingleFlight', 'Content', 'REVALIDATE',
+           'STALE_WHILE_REVALIDATE', 'STALE_IF_ERROR', 'OFFLINE', 'Resource', 'cache_key', 'normalize_url',
+           'resource_type']
 
-#Module logger object
 logger = logging.getLogger(__name__)  # pylint: disable=C0103
 
+# Ports that can be left out of a normalized URL
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Matches the API key in the URLs
+_API_KEY = re.compile(r'/api/([0-9A-Fa-f]{16})/')
+
+#: Passed as the *cache* argument to revalidate the cached data with the
+#: server using a conditional request, instead of reloading it.
+REVALIDATE = 'revalidate'
+
+#: Passed as the *cache* argument to use the cached data right away, even if
+#: it is stale, and refresh it from the server in the background.
+STALE_WHILE_REVALIDATE = 'stale-while-revalidate'
+
+#: Passed as the *cache* argument to use the cached data, even if it is
+#: stale, when the server can not be reached or returns an error.
+STALE_IF_ERROR = 'stale-if-error'
+
+#: Passed as the *cache* argument to only use the cached data, without
+#: contacting the server.
+OFFLINE = 'offline'
+
+# The resource types of the API, matched against the path and query of the URL
+_RESOURCES = [(name, re.compile(regexp, re.IGNORECASE)) for name, regexp in [
+    ('mirrors', r'/api/[^/]+/mirrors\.xml(\?|$)'),
+    ('time', r'/api/Updates\.php\?(.*&)?type=none(&|$)'),
+    ('updates', r'/api/Updates\.php(\?|$)'),
+    ('updates', r'/api/[^/]+/updates/updates_(?P<id>day|week|month|all)\.(xml|zip)(\?|$)'),
+    ('search', r'/api/GetSeries\.php(\?|$)'),
+    ('series', r'/api/[^/]+/series/(?P<id>\d+)/all/(?P<language>\w+)\.xml(\?|$)'),
+    ('zip', r'/api/[^/]+/series/(?P<id>\d+)/all/(?P<language>\w+)\.zip(\?|$)'),
+    ('actors', r'/api/[^/]+/series/(?P<id>\d+)/actors\.xml(\?|$)'),
+    ('banners', r'/api/[^/]+/series/(?P<id>\d+)/banners\.xml(\?|$)'),
+    ('series', r'/api/[^/]+/series/(?P<id>\d+)/(?P<language>\w+)\.xml(\?|$)'),
+    ('episode', r'/api/[^/]+/episodes/(?P<id>\d+)/(?P<language>\w+)\.xml(\?|$)')]]
+
+# The resource types belonging to a series, identified by the series id
+_SERIES_TYPES = frozenset(['series', 'zip', 'actors', 'banners'])
+
+# The status of the show in the series data
+_STATUS = re.compile(br'<Status>\s*(\w+)\s*</Status>')
+
+# The number of bytes to read at a time when decompressing a response
+_CHUNK_SIZE = 16 * 1024
+
+# Matches the language parameter of the query string
+_LANGUAGE = re.compile(r'(^|&)language=(?P<language>\w+)')
+
+
+class Content(namedtuple('Content', 'data age stale')):
+    """
+    .. versionadded:: 0.5
+
+    The content returned by :func:`Loader.load_content`, a named tuple of:
+
+    * *data*: The loaded bytes, as returned by :func:`Loader.load_raw`
+    * *age*: The number of seconds since the server sent the data, 0 if it
+      was just downloaded
+    * *stale*: True if the data was served from the cache without checking
+      that it is still valid
+
+    The data is referenced as it is, without being copied.
+    """
+    __slots__ = ()
+
+
+def _content(response, content, now, stale=False):
+    """Returns the :class:`Content` of the response"""
+    date = response.get('date')
+    date = parsedate_tz(date) if date and getattr(response, 'fromcache', False) else None
+    age = max(0.0, now - mktime_tz(date)) if date is not None else 0.0
+    return Content(content, age, stale)
+
+
+class Resource(namedtuple('Resource', 'type id language')):
+    """
+    .. versionadded:: 0.5
+
+    The API resource requested by a URL, as returned by
+    :func:`resource_type`. The *id* and *language* are None if they are not
+    part of the URL.
+    """
+    __slots__ = ()
+
+
+def resource_type(url):
+    """
+    .. versionadded:: 0.5
+
+    :param url: The URL to identify
+    :return: A :class:`Resource` describing the URL
+
+    Identifies the type of resource requested by a URL of the API. The type
+    is one of *mirrors*, *time*, *updates*, *search*, *series*, *zip*,
+    *actors*, *banners*, *episode* or *other* if the URL is not recognized.
+    """
+    parts = urlsplit(url)
+    path = parts.path + ('?' + parts.query if parts.query else '')
+
+    for name, regexp in _RESOURCES:
+        match = regexp.search(path)
+        if match:
+            groups = match.groupdict()
+            language = groups.get('language')
+            if language is None:
+                query = _LANGUAGE.search(parts.query)
+                language = query.group('language') if query else None
+            return Resource(name, groups.get('id'), language)
+
+    return Resource('other', None, None)
+
+
+def normalize_url(url):
+    """
+    .. versionadded:: 0.5
+
+    :param url: The URL to normalize
+    :return: The normalized URL
+
+    Normalizes the URL so that different spellings of the same URL compare
+    equal. The scheme and host are converted to lower case, default ports
+    and the fragment are removed.
+    """
+    parts = urlsplit(url)
+    scheme, netloc = parts.scheme.lower(), parts.netloc.lower()
+
+    port = ':{0}'.format(_DEFAULT_PORTS.get(scheme))
+    if netloc.endswith(port):
+        netloc = netloc[:-len(port)]
+
+    return urlunsplit((scheme, netloc, parts.path or '/', parts.query, ''))
+
+
+def cache_key(url):
+    """
+    .. versionadded:: 0.5
+
+    :param url: The URL to create the key for
+    :return: The key used to cache the data of the URL
+
+    Creates the cache key of the URL. The key of the API resources, as
+    identified by :func:`resource_type`, does not include the scheme, the
+    mirror host or the API key, so the same resource loaded from any mirror
+    or using any API key is cached once::
+
+        tvdb:/api/-/series/79349/all/en.xml
+
+    Other URLs are normalized by :func:`normalize_url`.
+    """
+    if resource_type(url).type == 'other':
+        return normalize_url(url)
+
+    parts = urlsplit(url)
+    return urlunsplit(('tvdb', '', _API_KEY.sub('/api/-/', parts.path), parts.query, ''))
+
+
+class _KeyedCache(object):
+    """
+    Wraps the cache, storing the entries using the key from :func:`cache_key`.
+    Entries stored using the URL itself, as done by the httplib2 file cache,
+    are still found.
+    """
+    def __init__(self, cache):
+        self.cache = cache
+
+    def get(self, key):
+        """Returns the cached entry of the URL"""
+        value = self.cache.get(cache_key(key))
+        if value is None and cache_key(key) != key:
+            value = self.cache.get(key)
+        return value
+
+    def set(self, key, value):
+        """Caches the entry of the URL"""
+        self.cache.set(cache_key(key), value)
+
+    def delete(self, key):
+        """Removes the cached entry of the URL"""
+        self.cache.delete(cache_key(key))
+        if cache_key(key) != key:
+            self.cache.delete(key)
+
+
+class _Flight(object):
+    """A request in progress, shared by all callers of the same URL"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result, self.error = None, None
+        self.waiting = 0
+
+
+class SingleFlight(object):
+    """
+    .. versionadded:: 0.5
+
+    Coalesces concurrent calls using the same key. The first caller for a key
+    performs the call, any caller using the same key while the call is in
+    progress waits for it to finish and shares the result, or the raised
+    exception. The key is forgotten as soon as the call is done, so this is
+    not a cache.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = dict()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._flights)
+
+    def waiting(self, key):
+        """:return: The number of callers waiting for the call using *key*"""
+        with self._lock:
+            flight = self._flights.get(key)
+            return flight.waiting if flight is not None else 0
+
+    def call(self, key, func, *args):
+        """
+        :param key: The key identifying the call
+        :param func: The function to call
+        :param args: The arguments to pass to *func*
+        :return: The value returned by *func*
+
+        Calls *func* unless a call with the same key is already in progress,
+        in which case the result of that call is returned instead.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.waiting += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func(*args)
+        except Exception as _error:
+            flight.error = _error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+        return flight.result
+
+
+def _retry_after(value, now):
+    """
+    Converts the value of a Retry-After header, given either as a number of
+    seconds or as a HTTP date, to a number of seconds. Returns None if the
+    value could not be parsed.
+    """
+    if value is None:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        date = parsedate_tz(value)
+        if date is None:
+            return None
+        return max(0.0, mktime_tz(date) - now)
+
+
+class RetryPolicy(object):
+    """
+    .. versionadded:: 0.5
+
+    :param retries: The maximum number of times to retry a failed request.
+    :param backoff: The delay, in seconds, before the first retry. The delay
+        is doubled for each retry.
+    :param max_backoff: The maximum delay, in seconds, between two retries.
+    :param deadline: Optional. The maximum number of seconds a single load
+        may take, including retries and waiting for the rate limit.
+    :param statuses: The response statuses that should be retried.
+    :param seed: Optional. A seed for the random jitter.
+
+    Controls how :class:`Loader` retries requests failing due to a
+    connection problem or one of the given response statuses. The delay
+    before each retry is randomly chosen between half and the full
+    exponential backoff, to avoid several clients retrying in lockstep. If
+    the server sends a Retry-After header, the loader will wait at least
+    that long. A request is not retried if the delay would exceed the
+    deadline.
+    """
+    def __init__(self, retries=3, backoff=0.5, max_backoff=30, deadline=None,
+                 statuses=(429, 500, 502, 503, 504), seed=None):
+        if retries < 0 or backoff < 0 or max_backoff < 0:
+            raise error.TVDBValueError("retries and backoff can not be negative")
+        if deadline is not None and deadline <= 0:
+            raise error.TVDBValueError("deadline must be positive")
+
+        self.retries, self.backoff, self.max_backoff = retries, backoff, max_backoff
+        self.deadline, self.statuses = deadline, frozenset(statuses)
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def delay(self, attempt, retry_after=None):
+        """
+        :param attempt: The number of retries already made
+        :param retry_after: Optional. The delay requested by the server
+        :return: The number of seconds to wait before the next retry
+        """
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        with self._lock:
+            delay = self._random.uniform(delay / 2.0, delay)
+
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+class FreshnessPolicy(object):
+    """
+    .. versionadded:: 0.5
+
+    :param default: Optional. The number of seconds the data of resource
+        types not given is considered fresh.
+    :param status: Optional. A dictionary mapping the *Status* of a show,
+        such as *Ended* or *Continuing*, to the number of seconds the data
+        of the show is considered fresh.
+    :param kwargs: The number of seconds the data of each resource type,
+        as returned by :func:`resource_type`, is considered fresh.
+
+    Decides how long the cached data is used by :class:`Loader` before it
+    is revalidated with the server, instead of following the cache headers
+    sent by the server. Resource types without a freshness, when no
+    *default* is given, follow the cache headers.
+
+    The status of a show applies to the *series*, *zip*, *actors* and
+    *banners* resources of the show, once the series data has been loaded
+    and the loader knows the status. It takes precedence over the freshness
+    of the resource type.
+
+    Example::
+
+        from pytvdbapi.loader import FreshnessPolicy, Loader
+
+        day = 24 * 60 * 60
+        policy = FreshnessPolicy(mirrors=30 * day, banners=7 * day, series=day,
+                                 status={'Ended': 30 * day, 'Continuing': 60 * 60})
+        loader = Loader("/tmp/pytvdbapi", freshness=policy)
+    """
+    def __init__(self, default=None, status=None, **kwargs):
+        unknown = set(kwargs) - set(name for name, _ in _RESOURCES)
+        if unknown:
+            raise error.TVDBValueError("Unknown resource types {0}".format(", ".join(sorted(unknown))))
+
+        values = [default] + list(kwargs.values()) + list((status or {}).values())
+        if [value for value in values if value is not None and value < 0]:
+            raise error.TVDBValueError("The freshness can not be negative")
+
+        self.default, self.status, self.resources = default, dict(status or {}), kwargs
+
+    def max_age(self, resource, status=None):
+        """
+        :param resource: The resource type
+        :param status: Optional. The status of the show the resource belongs to
+        :return: The number of seconds the data is fresh, or None to follow
+            the cache headers
+        """
+        if status is not None and resource in _SERIES_TYPES and status in self.status:
+            return self.status[status]
+        return self.resources.get(resource, self.default)
+
+
+class _TokenBucket(object):
+    """
+    A token bucket allowing *rate* requests per second, with bursts of at
+    most *burst* requests.
+    """
+    def __init__(self, rate, burst, now):
+        self.rate, self.burst = float(rate), burst
+        self.tokens, self.updated = float(burst), now
+        self._lock = threading.Lock()
+
+    def reserve(self, now, limit=None):
+        """
+        Reserves a token, returning the number of seconds to wait before it
+        can be used. If the wait would exceed *limit* no token is reserved
+        and None is returned.
+        """
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            wait = max(0.0, (1 - self.tokens) / self.rate)
+            if limit is not None and wait > limit:
+                return None
+
+            self.tokens -= 1
+            return wait
+
+
+class _Decoder(object):
+    """
+    Incrementally decompresses data compressed using the gzip or deflate
+    content encoding. Deflate data is accepted both with and without the
+    zlib header, as servers disagree on what it should be.
+    """
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self._decoder = zlib.decompressobj(16 + zlib.MAX_WBITS if encoding == 'gzip' else zlib.MAX_WBITS)
+        self._started = False
+
+    def decompress(self, data):
+        """Returns the decompressed part of *data*"""
+        try:
+            result = self._decoder.decompress(data)
+        except zlib.error:
+            if self._started or self.encoding != 'deflate':
+                raise
+            self._decoder = zlib.decompressobj(-zlib.MAX_WBITS)
+            result = self._decoder.decompress(data)
+
+        self._started = True
+        return result
+
+    def flush(self):
+        """Returns any remaining decompressed data"""
+        return self._decoder.flush()
+
+
+class _DecodingResponse(HTTPResponse):
+    """
+    A HTTPResponse decompressing the body while it is read, instead of
+    reading the whole compressed body before decompressing it. The number of
+    bytes received and the size of the decompressed body are recorded.
+
+    The content encoding header is renamed the same way httplib2 does once
+    the content has been decompressed, so it is not decompressed again.
+    """
+    def begin(self):
+        HTTPResponse.begin(self)
+
+        self.received, self.decoded = 0, None
+        self.encoding = (self.getheader('content-encoding') or '').strip().lower()
+        if self.encoding not in ('gzip', 'deflate'):
+            self.encoding = None
+
+    def getheaders(self):
+        headers = HTTPResponse.getheaders(self)
+        if self.encoding is None or self.decoded is None:
+            return headers
+
+        headers = [(key, value) for key, value in headers
+                   if key.lower() not in ('content-encoding', 'content-length')]
+        return headers + [('-content-encoding', self.encoding), ('content-length', str(self.decoded))]
+
+    def read(self, amt=None):
+        if self.encoding is None or amt is not None:
+            data = HTTPResponse.read(self, amt)
+            self.received += len(data)
+            return data
+
+        decoder, parts = _Decoder(self.encoding), list()
+        try:
+            while True:
+                chunk = HTTPResponse.read(self, _CHUNK_SIZE)
+                if not chunk:
+                    break
+                self.received += len(chunk)
+                parts.append(decoder.decompress(chunk))
+            parts.append(decoder.flush())
+        except zlib.error:
+            raise httplib2.FailedToDecompressContent(
+                "Content purported to be compressed with {0} but failed to decompress.".format(
+                    self.encoding), dict(), b"")
+
+        data = b"".join(parts)
+        self.decoded = len(data)
+        return data
+
+
+class _HTTPConnection(httplib2.HTTPConnectionWithTimeout):
+    """A connection decompressing the responses as they are read"""
+    response_class = _DecodingResponse
+
+    def getresponse(self):  # pylint: disable=W0221
+        self.response = httplib2.HTTPConnectionWithTimeout.getresponse(self)
+        return self.response
+
+
+class _HTTPSConnection(httplib2.HTTPSConnectionWithTimeout):
+    """A connection decompressing the responses as they are read"""
+    response_class = _DecodingResponse
+
+    def getresponse(self):  # pylint: disable=W0221
+        self.response = httplib2.HTTPSConnectionWithTimeout.getresponse(self)
+        return self.response
+
+
+_CONNECTIONS = {'http': _HTTPConnection, 'https': _HTTPSConnection}
+
+
+class _Http(httplib2.Http):
+    """
+    A :class:`httplib2.Http` keeping track of the status returned by the
+    server, which is otherwise hidden when a cached response is used, and
+    the number of bytes received for each request.
+    """
+    def __init__(self, *args, **kwargs):
+        super(_Http, self).__init__(*args, **kwargs)
+        self.server_status, self.received = None, 0
+
+    def request(self, uri, *args, **kwargs):  # pylint: disable=W0221
+        self.server_status, self.received = None, 0
+
+        if kwargs.get('connection_type') is None:
+            kwargs['connection_type'] = _CONNECTIONS.get(urlsplit(uri).scheme.lower())
+        return super(_Http, self).request(uri, *args, **kwargs)
+
+    def _request(self, *args, **kwargs):  # pylint: disable=W0221
+        response, content = super(_Http, self)._request(*args, **kwargs)
+        self.server_status = response.status
+        return response, content
+
+    def _conn_request(self, conn, *args, **kwargs):  # pylint: disable=W0221
+        response, content = super(_Http, self)._conn_request(conn, *args, **kwargs)
+        raw = getattr(conn, 'response', None)
+        self.received += raw.received if isinstance(raw, _DecodingResponse) else len(content)
+        return response, content
+
+    def cache_status(self, response):
+        """
+        Returns *hit* if the response was served from the cache without
+        contacting the server, *revalidated* if the server confirmed that
+        the cached data was still valid, and *download* otherwise.
+        """
+        if not getattr(response, 'fromcache', False):
+            return 'download'
+        elif self.server_status is None:
+            return 'hit'
+        elif self.server_status == 304:
+            return 'revalidated'
+        return 'download'
+
 
 class Loader(object):
     """
+    :param cache_path: The directory to use for caching the requests
+    :param pool_size: The number of keep-alive connections to keep open to
+        each host. This is also the number of requests that can be in flight
+        at the same time when the loader is shared between threads.
+    :param timeout: Optional socket timeout, in seconds.
+    :param coalesce: If True, concurrent requests for the same URL are
+        coalesced into a single request.
+    :param retry: Optional. A :class:`RetryPolicy` controlling how failed
+        requests are retried. By default requests are not retried.
+    :param rate: Optional. The maximum number of requests per second to make
+        using the same API key.
+    :param burst: The number of requests that can be made at once before
+        the *rate* applies.
+    :param compress_cache: If True, the data is stored compressed in the
+        cache directory.
+    :param max_bytes: Optional. The maximum size of the cache directory, in
+        bytes. The least recently used entries are removed to stay below it.
+    :param max_age: Optional. The number of seconds to keep the entries in
+        the cache directory.
+    :param cache: Optional. An object to use for caching instead of the
+        files in *cache_path*, such as a :class:`pytvdbapi.cache.SQLiteCache`.
+        It should implement the same *get*, *set* and *delete* functions as
+        the httplib2 caches.
+    :param freshness: Optional. A :class:`FreshnessPolicy` deciding how long
+        the cached data is used, instead of the cache headers of the server.
+    :param canonical_keys: If True, the data is cached using the key from
+        :func:`cache_key`, shared by all mirrors and API keys. Entries cached
+        using the URL are still found. If False, the URL is used as the key.
+
+    The *cache* argument of :func:`load` and :func:`load_raw` can be set to
+    :data:`REVALIDATE`, to make the loader ask the server if the cached
+    data is still valid. Unlike reloading the data with *cache* set to
+    False, the server will only send the data if it has changed.
+
     A object for loading data from a provided url.
     Uses httplib2 to do the heavy lifting.
+
+    The loader keeps a pool of *pool_size* connection objects sharing the
+    same cache. Each connection object keeps the connection to a host alive
+    between requests, avoiding the cost of setting up a new TCP connection
+    for every request made to the same mirror. The loader is safe to use
+    from multiple threads.
+
+    When the loader is shared between threads, several threads requesting
+    the same URL at the same time will share the result of a single request
+    instead of each downloading the same data. Errors are shared the same
+    way.
+
+    The number of requests, retries and the time spent waiting are counted
+    and available through :attr:`stats`. The use of the cache is counted
+    for each type of resource and is available through :attr:`cache_stats`.
+
+    The loader asks the server to compress the data using gzip or deflate,
+    and decompresses it while it is received.
     """
-    def __init__(self, cache_path):
-        self.http = httplib2.Http(cache=os.path.abspath(cache_path))
+    def __init__(self, cache_path, pool_size=1, timeout=None, coalesce=True,
+                 retry=None, rate=None, burst=1, compress_cache=True, max_bytes=None, max_age=None,
+                 cache=None, freshness=None, canonical_keys=True):
+        if pool_size < 1:
+            raise error.TVDBValueError("pool_size must be at least 1")
+        if rate is not None and (rate <= 0 or burst < 1):
+            raise error.TVDBValueError("rate must be positive and burst at least 1")
+
+        if cache is None:
+            # Imported here as the cache module depends on this module
+            from pytvdbapi.cache import FileCache  # pylint: disable=W0404
+
+            cache = FileCache(cache_path, compress_cache, max_bytes, max_age)
+        self.cache = cache
+
+        self.pool_size, self.timeout, self.coalesce = pool_size, timeout, coalesce
+        self.retry, self.rate, self.burst = retry, rate, burst
+        self.freshness, self._statuses = freshness, dict()
+        self.canonical_keys = canonical_keys
+        self._stats = dict(requests=0, retries=0, failures=0, retry_wait=0.0, rate_wait=0.0)
+        self._cache_stats = dict()
+        self._setup()
+
+    def _setup(self):
+        """Creates the connection pool and the synchronization objects"""
+        self._pool = Queue()
+        for _ in range(self.pool_size):
+            cache = _KeyedCache(self.cache) if self.canonical_keys else self.cache
+            self._pool.put(_Http(cache=cache, timeout=self.timeout))
+
+        self._flights = SingleFlight() if self.coalesce else None
+        self._buckets = dict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_stats'], state['_cache_stats'] = self.stats, self.cache_stats
+        for attribute in ('_pool', '_flights', '_buckets', '_refreshing', '_lock'):
+            del state[attribute]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._setup()
+
+    # The functions used to keep track of time, replaceable for testing
+    _clock = staticmethod(time.time)
+    _sleep = staticmethod(time.sleep)
+
+    @property
+    def stats(self):
+        """
+        .. versionadded:: 0.5
+
+        A dictionary with the counters of the loader:
+
+        * *requests*: The number of requests made, including those answered
+          from the cache
+        * *retries*: The number of requests retried
+        * *failures*: The number of loads that failed after all retries
+        * *retry_wait*: The number of seconds spent waiting between retries
+        * *rate_wait*: The number of seconds spent waiting for the rate limit
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    @property
+    def cache_stats(self):
+        """
+        .. versionadded:: 0.5
+
+        A dictionary with the cache counters for each resource type, as
+        returned by :func:`resource_type`. The counters of each type are:
+
+        * *hits*: The number of times the cached data was used directly
+        * *revalidations*: The number of times the server confirmed that the
+          cached data was still valid
+        * *downloads*: The number of times the data was downloaded
+        * *bytes_saved*: The number of bytes not downloaded thanks to the
+          cache
+        * *bytes_downloaded*: The number of bytes downloaded, after
+          decompression
+        * *bytes_received*: The number of bytes received from the server,
+          before decompression
+        """
+        with self._lock:
+            return dict((name, dict(stats)) for name, stats in self._cache_stats.items())
+
+    def _count_cache(self, url, status, size, received):
+        """Increments the cache counters for the resource type of the url"""
+        name = resource_type(url).type
+        with self._lock:
+            stats = self._cache_stats.get(name)
+            if stats is None:
+                stats = self._cache_stats[name] = dict(
+                    hits=0, revalidations=0, downloads=0, bytes_saved=0, bytes_downloaded=0, bytes_received=0)
+
+            stats['bytes_received'] += received
+            if status == 'download':
+                stats['downloads'] += 1
+                stats['bytes_downloaded'] += size
+            else:
+                stats['hits' if status == 'hit' else 'revalidations'] += 1
+                stats['bytes_saved'] += size
+
+    def _count(self, **kwargs):
+        """Increments the counters"""
+        with self._lock:
+            for name, value in kwargs.items():
+                self._stats[name] += value
+
+    def _throttle(self, url, deadline):
+        """
+        Waits until the rate limit for the API key used by the url allows
+        another request. Returns False if that would exceed the deadline.
+        """
+        if self.rate is None:
+            return True
+
+        match = _API_KEY.search(url)
+        key = match.group(1).upper() if match else None
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _TokenBucket(self.rate, self.burst, self._clock())
+
+        now = self._clock()
+        wait = bucket.reserve(now, None if deadline is None else deadline - now)
+        if wait is None:
+            return False
+        if wait > 0:
+            self._count(rate_wait=wait)
+            self._sleep(wait)
+        return True
+
+    @property
+    def http(self):
+        """
+        A :class:`httplib2.Http` instance from the pool. Kept for backwards
+        compatibility, the instance is not reserved for the caller.
+        """
+        http = self._pool.get()
+        self._pool.put(http)
+        return http
+
+    def _request(self, url, headers):
+        """Performs the request using a connection object from the pool"""
+        http = self._pool.get()
+        try:
+            response, content = http.request(url, headers=headers)
+            response.cache_status = http.cache_status(response)
+            response.received = http.received
+            return response, content
+        finally:
+            self._pool.put(http)
 
     def load(self, url, cache=True):
         """
         :param url: The URL to be loaded
         :param cache: Optional. Set if the cache should be ignored or not.
+        :return: The content of the url as a string
+        :raise: ConnectionError if the url could not be loaded
+
+        .. note:: The API uses :func:`load_raw`, this function is kept for
+            backwards compatibility.
+        """
+        return self.load_raw(url, cache).decode("utf-8")
+
+    def load_raw(self, url, cache=True):
+        """
+        .. versionadded:: 0.5
+
+        :param url: The URL to be loaded
+        :param cache: Optional. Set if the cache should be ignored or not,
+            or one of :data:`REVALIDATE`, :data:`STALE_WHILE_REVALIDATE`,
+            :data:`STALE_IF_ERROR` or :data:`OFFLINE`.
         :return: The content of the url as bytes
         :raise: ConnectionError if the url could not be loaded
 
+        Loads the url without decoding the content. The API uses this
+        function when it is available, passing the bytes directly to the XML
+        parser. It is also needed to load binary data, such as the zip
+        archives. Custom loaders should implement this function to avoid the
+        cost of decoding the data and to support the *use_zip* keyword
+        argument of :class:`pytvdbapi.api.TVDB`.
+        """
+        return self.load_content(url, cache).data
+
+    def load_content(self, url, cache=True):
         """
+        .. versionadded:: 0.5
+
+        :param url: The URL to be loaded
+        :param cache: Optional. The same as for :func:`load_raw`
+        :return: The :class:`Content` of the url
+        :raise: ConnectionError if the url could not be loaded
 
+        Loads the url like :func:`load_raw`, also returning the age of the
+        data and whether it is stale. The API uses this function when it is
+        available to know the age of the data.
+        """
+        if self._flights is None:
+            return self._load(url, cache)
+        else:
+            key = cache_key(url) if self.canonical_keys else normalize_url(url)
+            return self._flights.call((key, cache), self._load, url, cache)
+
+    def _load(self, url, cache):
+        """Loads the url, see :func:`load_raw`"""
         logger.debug("Loading data from {0}".format(url))
 
-        header = dict()
-        if not cache:
+        resource = resource_type(url)
+        content = self._serve(url, resource, cache)
+
+        if self.freshness is not None and resource.type == 'series':
+            match = _STATUS.search(content.data)
+            if match is not None:
+                self._statuses[resource.id] = match.group(1).decode('ascii')
+        return content
+
+    def _serve(self, url, resource, cache):
+        """Loads the url from the cache or the server as requested by *cache*"""
+        header = {'accept-encoding': 'gzip, deflate'}
+        if cache is True and self.freshness is not None:
+            status = self._statuses.get(resource.id) if resource.type in _SERIES_TYPES else None
+            max_age = self.freshness.max_age(resource.type, status)
+            if max_age is not None:
+                content = self._cached(url, header, count=False)
+                if content is not None and content.age < max_age:
+                    self._count_cache(url, 'hit', len(content.data), 0)
+                    return content._replace(stale=False)
+
+                logger.debug("Revalidating data older than {0} seconds.".format(max_age))
+                header['cache-control'] = 'max-age=0'
+        elif cache == REVALIDATE:
+            logger.debug("Revalidating cached data.")
+            header['cache-control'] = 'max-age=0'
+        elif not cache:
             logger.debug("Ignoring cached data.")
             header['cache-control'] = 'no-cache'
+        elif cache in (OFFLINE, STALE_WHILE_REVALIDATE):
+            content = self._cached(url, header)
+            if content is not None:
+                if cache == STALE_WHILE_REVALIDATE:
+                    self._refresh(url, header)
+                return content
+            elif cache == OFFLINE:
+                self._count(failures=1)
+                raise error.ConnectionError("{0} is not cached".format(url))
+        elif cache == STALE_IF_ERROR:
+            try:
+                return self._download(url, header)
+            except error.ConnectionError:
+                content = self._cached(url, header)
+                if content is None:
+                    raise
+                logger.debug("Using stale data for {0}".format(url))
+                return content
+
+        return self._download(url, header)
 
+    def _cached(self, url, header, count=True):
+        """Returns the cached content of the url, even if stale, or None if not cached"""
+        response, content = self._request(url, dict(header, **{'cache-control': 'only-if-cached'}))
+        if response.status == 504 or not getattr(response, 'fromcache', False):
+            return None
+
+        if count:
+            self._count_cache(url, 'hit', len(content), 0)
+        return _content(response, content, self._clock(), stale=True)
+
+    def _refresh(self, url, header):
+        """Reloads the url in a background thread, unless already done"""
+        with self._lock:
+            if url in self._refreshing:
+                return
+            self._refreshing.add(url)
+
+        def _run():
+            """Reloads the url"""
+            try:
+                self._download(url, header)
+            except error.PytvdbapiError as _error:
+                logger.debug("Unable to refresh {0}: {1}".format(url, _error))
+            finally:
+                with self._lock:
+                    self._refreshing.discard(url)
+
+        thread = threading.Thread(target=_run)
+        thread.daemon = True
+        thread.start()
+
+    def _download(self, url, header):
+        """Loads the url from the server, retrying as configured"""
+        policy = self.retry
+        deadline = None
+        if policy is not None and policy.deadline is not None:
+            deadline = self._clock() + policy.deadline
+
+        attempt = 0
+        while True:
+            if not self._throttle(url, deadline):
+                self._count(failures=1)
+                raise error.ConnectionError("Deadline exceeded waiting to load {0}".format(url))
+
+            content, message, retry_after = self._fetch(url, header)
+            if message is None:
+                return content
+
+            delay = None
+            if policy is not None and attempt < policy.retries and retry_after is not False:
+                delay = policy.delay(attempt, retry_after)
+                if deadline is not None and self._clock() + delay > deadline:
+                    delay = None
+
+            if delay is None:
+                self._count(failures=1)
+                raise error.ConnectionError(message)
+
+            logger.debug("Retrying {0} in {1:.2f} seconds".format(url, delay))
+            self._count(retries=1, retry_wait=delay)
+            self._sleep(delay)
+            attempt += 1
+
+    def _fetch(self, url, header):
+        """
+        Performs a single request, returning a tuple of the content, an error
+        message and the number of seconds to wait before retrying. The error
+        message is None if the request succeeded. The number of seconds is
+        None if the server did not request a delay, or False if the request
+        should not be retried.
+        """
+        self._count(requests=1)
         try:
-            response, content = self.http.request(url, headers=header)
-        except (httplib2.RelativeURIError, httplib2.ServerNotFoundError):
-            raise error.ConnectionError("Unable to connect to {0}"
-                                        .format(url))
+            response, content = self._request(url, header)
+        except httplib2.RelativeURIError:
+            return None, "Unable to connect to {0}".format(url), False
+        except (httplib2.ServerNotFoundError, httplib2.FailedToDecompressContent, socket.error):
+            return None, "Unable to connect to {0}".format(url), None
 
         if response.status in [404]:
             raise error.TVDBNotFoundError("Data not found")
         elif response.status not in [200, 304]:
-            raise error.ConnectionError("Bad status returned from server. {0}"
-                                        .format(response.status))
+            message = "Bad status returned from server. {0}".format(response.status)
+            if self.retry is None or response.status not in self.retry.statuses:
+                return None, message, False
+            return None, message, _retry_after(response.get('retry-after'), self._clock())
         else:
-            return content.decode("utf-8")
+            received = getattr(response, 'received', len(content))
+            logger.debug("Received {0} bytes, {1} bytes decompressed".format(received, len(content)))
+
+            self._count_cache(url, getattr(response, 'cache_status', 'download'), len(content), received)
+            return _content(response, content, self._clock()), None, None
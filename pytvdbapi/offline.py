@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 - 2013 Björn Larsson
+
+# This file is part of pytvdbapi.
+#
+# pytvdbapi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pytvdbapi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pytvdbapi.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+A module providing loaders for working without network access.
+
+.. versionadded:: 0.5
+
+The :class:`RecordingLoader` wraps another loader and stores every response
+it loads in a directory. The :class:`ReplayLoader` serves the stored
+responses back from that directory without accessing the network. This
+makes it possible to run and benchmark the API reproducibly, e.g. on a
+machine without network access.
+
+Each response is stored in two files named after the SHA-1 hash of the
+cache key of the URL, placed in a sub directory named after the first two
+characters of the hash::
+
+    <path>/<hash[:2]>/<hash>.json  # The URL and the status of the response
+    <path>/<hash[:2]>/<hash>.data  # The content of the response
+
+The cache key, created by :func:`pytvdbapi.loader.cache_key`, does not
+include the mirror host or the API key, so that the recorded data can be
+replayed regardless of the mirror and the API key used.
+
+Example::
+
+    >>> from pytvdbapi import api
+    >>> from pytvdbapi.loader import Loader
+    >>> from pytvdbapi.offline import RecordingLoader, ReplayLoader
+    >>> loader = RecordingLoader(Loader("/tmp/pytvdbapi"), "/tmp/recorded")
+    >>> db = api.TVDB("B43FF87DE395DF56", loader=loader)
+    >>> db.get_series(79349, "en").SeriesName
+    'Dexter'
+
+    >>> db = api.TVDB("B43FF87DE395DF56", loader=ReplayLoader("/tmp/recorded"))
+    >>> db.get_series(79349, "en").SeriesName
+    'Dexter'
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from pytvdbapi import error
+from pytvdbapi.loader import _API_KEY, cache_key
+
+__all__ = ['RecordingLoader', 'ReplayLoader']
+
+logger = logging.getLogger(__name__)  # pylint: disable=C0103
+
+
+def _strip_key(url):
+    """Removes the API key from the url"""
+    return _API_KEY.sub('/api/', url)
+
+
+def _paths(path, url):
+    """Returns the paths of the meta data and data files for the url"""
+    digest = hashlib.sha1(cache_key(url).encode('utf-8')).hexdigest()
+    base = os.path.join(path, digest[:2], digest)
+
+    return base + '.json', base + '.data'
+
+
+def _write(filename, data):
+    """Writes the data to the file, replacing any existing file"""
+    tmp = '{0}.{1}.tmp'.format(filename, threading.current_thread().ident)
+    with io.open(tmp, 'wb') as handle:
+        handle.write(data)
+
+    if os.path.exists(filename):
+        os.remove(filename)
+    os.rename(tmp, filename)
+
+
+class RecordingLoader(object):
+    """
+    :param loader: The loader to use to load the data
+    :param path: The directory to store the responses in
+
+    A loader recording all responses loaded by *loader* to *path*. Missing
+    data, raising :class:`pytvdbapi.error.TVDBNotFoundError`, is recorded as
+    well. Connection errors are not recorded.
+    """
+    def __init__(self, loader, path):
+        self.loader, self.path = loader, os.path.abspath(path)
+
+    def load(self, url, cache=True):
+        """
+        :param url: The URL to be loaded
+        :param cache: Passed to the wrapped loader
+        :return: The content of the url as a string
+        """
+        return self.load_raw(url, cache).decode('utf-8')
+
+    def load_raw(self, url, cache=True):
+        """
+        :param url: The URL to be loaded
+        :param cache: Passed to the wrapped loader
+        :return: The content of the url as bytes
+        """
+        load = getattr(self.loader, 'load_raw', self.loader.load)
+
+        try:
+            data = load(url, cache)
+        except error.TVDBNotFoundError:
+            self._record(url, 404, b'')
+            raise
+
+        if not isinstance(data, bytes):
+            data = data.encode('utf-8')
+
+        self._record(url, 200, data)
+        return data
+
+    def _record(self, url, status, data):
+        """Stores the response"""
+        meta, content = _paths(self.path, url)
+        logger.debug("Recording {0} to {1}".format(url, content))
+
+        directory = os.path.dirname(meta)
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:  # Created by another thread
+                pass
+
+        _write(content, data)
+        _write(meta, json.dumps({'url': _strip_key(url), 'status': status}).encode('utf-8'))
+
+
+class ReplayLoader(object):
+    """
+    :param path: The directory containing the recorded responses
+    :param latency: Optional. The number of seconds to wait before returning
+        each response. Can also be a callable taking the url and returning the
+        number of seconds.
+    :param error_rate: Optional. The probability, between 0 and 1, that a
+        request will fail with :class:`pytvdbapi.error.ConnectionError`.
+    :param seed: Optional. The seed used for the error injection. Using the
+        same seed will make the same requests fail.
+
+    A loader serving the responses recorded by :class:`RecordingLoader`.
+    Requests for urls that have not been recorded will raise
+    :class:`pytvdbapi.error.ConnectionError`.
+    """
+    def __init__(self, path, latency=0, error_rate=0.0, seed=None):
+        if not 0 <= error_rate <= 1:
+            raise error.TVDBValueError("error_rate must be between 0 and 1")
+
+        self.path = os.path.abspath(path)
+        self.latency, self.error_rate = latency, error_rate
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def load(self, url, cache=True):
+        """
+        :param url: The URL to be loaded
+        :param cache: Ignored
+        :return: The content of the url as a string
+        """
+        return self.load_raw(url, cache).decode('utf-8')
+
+    def load_raw(self, url, cache=True):  # pylint: disable=W0613
+        """
+        :param url: The URL to be loaded
+        :param cache: Ignored
+        :return: The content of the url as bytes
+        """
+        logger.debug("Replaying data for {0}".format(url))
+
+        latency = self.latency(url) if callable(self.latency) else self.latency
+        if latency:
+            time.sleep(latency)
+
+        if self.error_rate:
+            with self._lock:
+                failed = self._random.random() < self.error_rate
+            if failed:
+                raise error.ConnectionError("Injected error loading {0}".format(url))
+
+        meta, content = _paths(self.path, url)
+        try:
+            with io.open(meta, 'rb') as handle:
+                status = json.loads(handle.read().decode('utf-8'))['status']
+            with io.open(content, 'rb') as handle:
+                data = handle.read()
+        except (IOError, ValueError, KeyError):
+            raise error.ConnectionError("No recorded data for {0}".format(url))
+
+        if status in [404]:
+            raise error.TVDBNotFoundError("Data not found")
+
+        return data
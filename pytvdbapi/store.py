@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 - 2013 Björn Larsson
+
+# This file is part of pytvdbapi.
+#
+# pytvdbapi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pytvdbapi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pytvdbapi.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+A module providing a local store of the series and episode records.
+
+.. versionadded:: 0.5
+
+Unlike the caches in :mod:`pytvdbapi.cache`, storing the responses of the
+server, the :class:`Store` keeps the parsed records of the series and their
+episodes. When a store is provided to :class:`pytvdbapi.api.TVDB`, shows and
+episodes found in the store are returned without any request to the server,
+and shows loaded from the server are added to the store.
+
+The store is kept up to date by ingesting the *updates_day*, *updates_week*
+or *updates_month* archives published by `thetvdb.com
+<http://thetvdb.com>`_, using :func:`pytvdbapi.api.TVDB.ingest_updates`.
+Records included in full are updated in the store, records only listing the
+time of the change are removed from the store if the stored record is
+older, so that they are loaded from the server the next time they are used.
+
+Example::
+
+    from pytvdbapi import api
+    from pytvdbapi.store import Store
+
+    db = api.TVDB("B43FF87DE395DF56", store=Store("/tmp/pytvdbapi-store.db"))
+    db.ingest_updates('day')
+    show = db.get_series(79349, "en")
+"""
+
+import io
+import logging
+import os
+import re
+import sqlite3
+import threading
+import zipfile
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from pytvdbapi import error
+from pytvdbapi.xmlhelpers import iterparse_xml
+
+__all__ = ['Store']
+
+logger = logging.getLogger(__name__)  # pylint: disable=C0103
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    data BLOB NOT NULL,
+    updated INTEGER NOT NULL,
+    PRIMARY KEY (id, language)
+);
+CREATE TABLE IF NOT EXISTS episodes (
+    id INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    seriesid INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    updated INTEGER NOT NULL,
+    PRIMARY KEY (id, language)
+);
+CREATE INDEX IF NOT EXISTS episodes_series ON episodes (seriesid, language);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# The fields of the records in the updates archives only listing the change
+_STUB_FIELDS = frozenset(['id', 'time', 'Series'])
+
+# The pickle protocol used for the records, readable by all Python versions
+_PROTOCOL = 2
+
+# The server time of the updates, in the start tag of the document
+_TIME = re.compile(br'<Data\s[^>]*\btime="(\d+)"')
+
+
+def _dumps(record):
+    """Pickles the record for storage"""
+    return sqlite3.Binary(pickle.dumps(record, _PROTOCOL))
+
+
+def _id(value):
+    """Returns the id as an integer, or None if it is not a valid id"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _updated(record):
+    """Returns the time the record was last updated on the server"""
+    updated = record.get('lastupdated', record.get('time', 0))
+    return updated if isinstance(updated, int) else 0
+
+
+def _members(data):
+    """Returns the XML documents of the updates archive, or the data itself"""
+    if not data.startswith(b'PK'):
+        return [data]
+
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipfile:
+        raise error.BadData("Invalid updates archive")
+
+    try:
+        return [archive.read(name) for name in archive.namelist() if name.endswith('.xml')]
+    finally:
+        archive.close()
+
+
+def _ingest_series(connection, record):
+    """Applies an updated series record"""
+    if _STUB_FIELDS.issuperset(record) or 'Language' not in record:
+        connection.execute("DELETE FROM series WHERE id = ? AND updated < ?",
+                           (record['id'], _updated(record)))
+    else:
+        connection.execute("UPDATE series SET data = ?, updated = ? WHERE id = ? AND language = ? "
+                           "AND updated <= ?", (_dumps(record), _updated(record), record['id'],
+                                                record['Language'], _updated(record)))
+
+
+def _ingest_episode(connection, record):
+    """Applies an updated episode record"""
+    seriesid = record.get('seriesid', record.get('Series'))
+    if _STUB_FIELDS.issuperset(record) or 'Language' not in record:
+        current = connection.execute("SELECT COUNT(*) FROM episodes WHERE id = ? AND updated >= ?",
+                                     (record['id'], _updated(record))).fetchone()[0]
+        if not current:
+            # The series is no longer complete, it has to be reloaded
+            connection.execute("DELETE FROM episodes WHERE id = ?", (record['id'],))
+            connection.execute("DELETE FROM series WHERE id = ?", (seriesid,))
+    else:
+        data, updated = _dumps(record), _updated(record)
+        changed = connection.execute("UPDATE episodes SET seriesid = ?, data = ?, updated = ? "
+                                     "WHERE id = ? AND language = ? AND updated <= ?",
+                                     (seriesid, data, updated, record['id'], record['Language'], updated))
+        if not changed.rowcount:
+            # Only added if not stored yet, a newer stored record is kept
+            connection.execute("INSERT OR IGNORE INTO episodes VALUES (?, ?, ?, ?, ?)",
+                               (record['id'], record['Language'], seriesid, data, updated))
+
+
+class Store(object):
+    """
+    :param path: The path of the database file. It is created if it does not
+        exist.
+    :param timeout: The number of seconds to wait for the database if it is
+        locked by another process.
+
+    A store of series and episode records in an SQLite database. Each thread
+    uses its own database connection.
+    """
+    def __init__(self, path, timeout=30):
+        self.path, self.timeout = os.path.abspath(path), timeout
+
+        directory = os.path.dirname(self.path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self._local = threading.local()
+        self._connections = list()
+        self._lock = threading.Lock()
+
+        self._connection().executescript(_SCHEMA)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        for attribute in ('_local', '_connections', '_lock'):
+            del state[attribute]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+        self._connections = list()
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        """Returns the database connection of the current thread"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout,
+                                         isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _transaction(self, function, *args):
+        """Runs the function with the connection in a write transaction"""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            result = function(connection, *args)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return result
+
+    @property
+    def time(self):
+        """The server time of the last ingested updates, or None"""
+        row = self._connection().execute("SELECT value FROM meta WHERE key = 'time'").fetchone()
+        return row[0] if row is not None else None
+
+    def series(self, series_id, language):
+        """
+        :param series_id: The Show Id
+        :param language: The language abbreviation
+        :return: The stored series record, or None if not found
+        """
+        row = self._connection().execute("SELECT data FROM series WHERE id = ? AND language = ?",
+                                         (_id(series_id), language)).fetchone()
+        return pickle.loads(bytes(row[0])) if row is not None else None
+
+    def episodes(self, series_id, language):
+        """
+        :param series_id: The Show Id
+        :param language: The language abbreviation
+        :return: The list of stored episode records of the series
+        """
+        rows = self._connection().execute("SELECT data FROM episodes WHERE seriesid = ? AND language = ?",
+                                          (_id(series_id), language))
+        return [pickle.loads(bytes(row[0])) for row in rows]
+
+    def episode(self, episode_id, language):
+        """
+        :param episode_id: The Episode Id
+        :param language: The language abbreviation
+        :return: The stored episode record, or None if not found
+        """
+        row = self._connection().execute("SELECT data FROM episodes WHERE id = ? AND language = ?",
+                                         (_id(episode_id), language)).fetchone()
+        return pickle.loads(bytes(row[0])) if row is not None else None
+
+    def put_series(self, language, series, episodes):
+        """
+        :param language: The language abbreviation
+        :param series: The series record
+        :param episodes: The list of all episode records of the series
+
+        Stores the series together with its episodes, replacing any
+        previously stored episodes of the series.
+        """
+        def _put(connection):
+            """Replaces the records"""
+            connection.execute("DELETE FROM episodes WHERE seriesid = ? AND language = ?",
+                               (series['id'], language))
+            connection.execute("INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?)",
+                               (series['id'], language, _dumps(series), _updated(series)))
+            connection.executemany(
+                "INSERT OR REPLACE INTO episodes VALUES (?, ?, ?, ?, ?)",
+                [(episode['id'], language, series['id'], _dumps(episode), _updated(episode))
+                 for episode in episodes])
+
+        self._transaction(_put)
+
+    def invalidate(self, series_ids=(), episode_ids=()):
+        """
+        :param series_ids: The ids of the series to remove
+        :param episode_ids: The ids of the episodes to remove
+        :return: The number of removed series and episode records
+
+        Removes the series, in all languages, and the series of the episodes
+        from the store.
+        """
+        def _remove(connection):
+            """Removes the records"""
+            count = 0
+            for _id in series_ids:
+                count += connection.execute("DELETE FROM series WHERE id = ?", (int(_id),)).rowcount
+            for _id in episode_ids:
+                for (seriesid,) in connection.execute("SELECT DISTINCT seriesid FROM episodes WHERE id = ?",
+                                                      (int(_id),)).fetchall():
+                    count += connection.execute("DELETE FROM series WHERE id = ?", (seriesid,)).rowcount
+                count += connection.execute("DELETE FROM episodes WHERE id = ?", (int(_id),)).rowcount
+            return count
+
+        return self._transaction(_remove)
+
+    def ingest(self, data):
+        """
+        :param data: The updates archive, or the XML document it contains
+        :return: A dictionary with the number of *series*, *episodes* and
+            *banners* records read
+        :raise: :class:`pytvdbapi.error.BadData`
+
+        Updates the store with the records of an updates archive. The records
+        are applied while the documents are parsed, and records older than
+        the stored records are ignored.
+        """
+        counts = dict(series=0, episodes=0, banners=0)
+        for member in _members(data):
+            match = _TIME.search(member[:1024])
+            time = int(match.group(1)) if match is not None else None
+            records = iterparse_xml(member, ('Series', 'Episode', 'Banner'))
+            self._transaction(self._ingest, records, time, counts)
+
+        logger.debug("Ingested {series} series and {episodes} episodes records".format(**counts))
+        return counts
+
+    @staticmethod
+    def _ingest(connection, records, time, counts):
+        """Applies the records of one updates document"""
+        for element, record in records:
+            if element == 'Series':
+                counts['series'] += 1
+                _ingest_series(connection, record)
+            elif element == 'Episode':
+                counts['episodes'] += 1
+                _ingest_episode(connection, record)
+            else:
+                counts['banners'] += 1
+
+        if time is not None:
+            connection.execute("INSERT OR REPLACE INTO meta VALUES ('time', MAX(?, COALESCE("
+                               "(SELECT value FROM meta WHERE key = 'time'), 0)))", (time,))
+
+    def close(self):
+        """Closes all database connections"""
+        with self._lock:
+            connections, self._connections = self._connections, list()
+        self._local = threading.local()
+
+        for connection in connections:
+            connection.close()
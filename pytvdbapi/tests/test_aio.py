@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 - 2013 Björn Larsson
+
+# This file is part of pytvdbapi.
+#
+# pytvdbapi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pytvdbapi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pytvdbapi.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import sys
+import threading
+import unittest
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+try:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+except ImportError:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from pytvdbapi import error
+from pytvdbapi.tests import utils
+
+
+class FixtureAsyncLoader(object):
+    """Serves the fixture files as already resolved futures"""
+    def __init__(self, loop):
+        self.loop, self.loader = loop, utils.FixtureLoader()
+
+    def load(self, url, cache=True):
+        future = asyncio.Future(loop=self.loop)
+        try:
+            future.set_result(self.loader.load(url, cache))
+        except error.PytvdbapiError as _error:
+            future.set_exception(_error)
+        return future
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves the fixture files over HTTP"""
+    protocol_version = 'HTTP/1.1'
+    paths = list()
+
+    def do_GET(self):
+        self.paths.append(self.path)
+        try:
+            body = utils.FixtureLoader().load(self.path.split('?')[0])
+        except error.TVDBNotFoundError:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        if 'chunked' in self.path:
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for i in range(0, len(body), 100):
+                chunk = body[i:i + 100]
+                self.wfile.write('{0:x}\r\n'.format(len(chunk)).encode('ascii') + chunk + b'\r\n')
+            self.wfile.write(b'0\r\n\r\n')
+        else:
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@unittest.skipIf(asyncio is None, "asyncio is not available")
+class TestAsyncTVDB(unittest.TestCase):
+    def setUp(self):
+        from pytvdbapi.aio import AsyncTVDB
+
+        self.loop = asyncio.new_event_loop()
+        self.api = AsyncTVDB("B43FF87DE395DF56", loop=self.loop, actors=True, banners=True,
+                             loader=FixtureAsyncLoader(self.loop))
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_future(self, future):
+        return self.loop.run_until_complete(future)
+
+    def test_search(self):
+        """It should be possible to search for a show"""
+        search = self.run_future(self.api.search("Dexter", "en"))
+
+        self.assertEqual(len(search), 1)
+        self.assertEqual(search[0].SeriesName, "Dexter")
+
+    def test_load_show(self):
+        """Loading the show should load seasons, actors and banners"""
+        show = self.run_future(self.api.get_series(79349, "en"))
+        self.assertTrue(self.run_future(show.load()) is show)
+
+        self.assertEqual(len(show), 2)
+        self.assertEqual(show[1][2].EpisodeName, "Crocodile")
+        self.assertEqual(len(show.actor_objects), 2)
+        self.assertEqual(len(show.banner_objects), 2)
+
+    def test_not_loaded(self):
+        """Accessing the seasons before loading the show should raise an error"""
+        show = self.run_future(self.api.get_series(79349, "en"))
+
+        self.assertRaises(error.PytvdbapiError, show.__getitem__, 1)
+
+    def test_get_episode(self):
+        """It should be possible to get an episode"""
+        episode = self.run_future(self.api.get_episode(308834, "en"))
+
+        self.assertEqual(episode.EpisodeName, "Crocodile")
+
+    def test_invalid_id(self):
+        """Loading an invalid id should raise TVDBIdError"""
+        self.assertRaises(error.TVDBIdError, self.run_future, self.api.get_series(1, "en"))
+        self.assertRaises(error.TVDBIdError, self.run_future, self.api.get_episode(1, "en"))
+
+    def test_missing_remembered(self):
+        """Missing ids should not be requested again"""
+        urls = self.api.loader.loader.urls
+        for _ in range(2):
+            self.assertRaises(error.TVDBIdError, self.run_future, self.api.get_series(1, "en"))
+        self.assertEqual(len([url for url in urls if '/series/1/' in url]), 1)
+
+    def test_invalid_language(self):
+        """Using an invalid language should raise TVDBValueError"""
+        self.assertRaises(error.TVDBValueError, self.api.get_series, 79349, "foo")
+
+
+@unittest.skipIf(asyncio is None, "asyncio is not available")
+class TestAsyncLoader(unittest.TestCase):
+    def setUp(self):
+        from pytvdbapi.aio import AsyncLoader
+
+        self.server = HTTPServer(('127.0.0.1', 0), FixtureHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = 'http://127.0.0.1:{0}'.format(self.server.server_port)
+
+        self.loop = asyncio.new_event_loop()
+        self.loader = AsyncLoader(loop=self.loop, max_connections=2)
+        FixtureHandler.paths = list()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.loop.close()
+
+    def test_load(self):
+        """The loader should load the data with a content length"""
+        data = self.loop.run_until_complete(self.loader.load(self.url + '/api/key/mirrors.xml'))
+
+        self.assertEqual(data, utils.FixtureLoader().load('/mirrors.xml'))
+
+    def test_load_chunked(self):
+        """The loader should load chunked data"""
+        url = self.url + '/api/key/series/79349/all/en.xml?chunked'
+        data = self.loop.run_until_complete(self.loader.load(url.replace('.xml?chunked', '.xml')))
+        chunked = self.loop.run_until_complete(self.loader.load(url))
+
+        self.assertEqual(data, chunked)
+
+    def test_concurrent_load(self):
+        """Several requests should be able to run at the same time"""
+        futures = [self.loader.load(self.url + '/api/key/mirrors.xml?{0}'.format(i)) for i in range(5)]
+        results = self.loop.run_until_complete(asyncio.gather(*futures))
+
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(len(FixtureHandler.paths), 5)
+        self.assertEqual(self.loader._active, 0)
+
+    def test_coalesced_load(self):
+        """Concurrent requests for the same url should share a single request"""
+        url = self.url + '/api/key/mirrors.xml'
+        futures = [self.loader.load(url + '#{0}'.format(i)) for i in range(5)]
+        results = self.loop.run_until_complete(asyncio.gather(*futures))
+
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(len(FixtureHandler.paths), 1)
+        self.assertEqual(self.loader._flights, {})
+
+    def test_coalesced_cancel(self):
+        """Cancelling one caller should not affect the others sharing the request"""
+        url = self.url + '/api/key/mirrors.xml'
+        first, second = self.loader.load(url), self.loader.load(url)
+        first.cancel()
+
+        self.assertEqual(self.loop.run_until_complete(second), utils.FixtureLoader().load('/mirrors.xml'))
+
+    def test_not_found(self):
+        """Missing data should raise TVDBNotFoundError"""
+        self.assertRaises(error.TVDBNotFoundError, self.loop.run_until_complete,
+                          self.loader.load(self.url + '/foo.xml'))
+
+    def test_failed_connection(self):
+        """The loader should raise ConnectionError if unable to connect"""
+        self.assertRaises(error.ConnectionError, self.loop.run_until_complete,
+                          self.loader.load('http://laba.laba/'))
+
+    def test_connect_timeout(self):
+        """The timeout should also abort a request still connecting"""
+        from pytvdbapi.aio import AsyncLoader
+
+        pending = list()
+
+        def _connect(*args, **kwargs):  # pylint: disable=W0613
+            pending.append(asyncio.Future(loop=self.loop))
+            return pending[-1]
+
+        self.loop.create_connection = _connect
+        loader = AsyncLoader(loop=self.loop, max_connections=1, timeout=0.1)
+
+        self.assertRaises(error.ConnectionError, self.loop.run_until_complete,
+                          loader.load(self.url + '/api/key/mirrors.xml'))
+        self.assertTrue(pending[0].cancelled())
+        self.assertEqual(loader._active, 0)
+
+    def test_bad_status_line(self):
+        """A status line without a status code should fail the request"""
+        from pytvdbapi.aio import _HTTPProtocol
+
+        future = asyncio.Future(loop=self.loop)
+        _HTTPProtocol(future).data_received(b'HTTP/1.1\r\n\r\n')
+
+        self.assertRaises(error.ConnectionError, future.result)
+
+
+if __name__ == "__main__":
+    sys.exit(unittest.main())
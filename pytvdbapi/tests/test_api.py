@@ -19,6 +19,7 @@
 
 from __future__ import absolute_import, print_function, unicode_literals
 
+import itertools
 import sys
 import unittest
 import datetime
@@ -26,8 +27,9 @@ import datetime
 import pytvdbapi
 from pytvdbapi import error
 from pytvdbapi.api import TVDB
-from pytvdbapi.xmlhelpers import generate_tree
-from pytvdbapi.tests import basetest
+from pytvdbapi.loader import OFFLINE, Content
+from pytvdbapi.xmlhelpers import generate_tree, iterparse_xml, parse_xml
+from pytvdbapi.tests import basetest, utils
 
 
 def _load_show(show):
@@ -114,6 +116,327 @@ class TestApi(basetest.pytvdbapiTest):
         self.assertNotEqual(m, None)
 
 
+class TestCustomLoader(unittest.TestCase):
+    """Tests using a custom loader, these do not need network access"""
+
+    def setUp(self):
+        self.loader = utils.FixtureLoader()
+        self.api = TVDB("B43FF87DE395DF56", loader=self.loader,
+                        actors=True, banners=True)
+
+    def test_loader_used(self):
+        """The provided loader should be used for all requests"""
+        show = self.api.get_series(79349, "en")
+        show.update()
+
+        self.assertEqual(self.api.loader, self.loader)
+        self.assertEqual(len(self.loader.urls), 5)
+
+    def test_search(self):
+        """It should be possible to search using a custom loader"""
+        search = self.api.search("Dexter", "en")
+
+        self.assertEqual(len(search), 1)
+        self.assertEqual(search[0].SeriesName, "Dexter")
+
+    def test_show(self):
+        """The show data should be loaded using the custom loader"""
+        show = self.api.get_series(79349, "en")
+
+        self.assertEqual(len(show), 2)
+        self.assertEqual(show[1][2].EpisodeName, "Crocodile")
+        self.assertEqual(len(show.actor_objects), 2)
+        self.assertEqual(len(show.banner_objects), 2)
+
+    def test_episode(self):
+        """It should be possible to load an episode using a custom loader"""
+        episode = self.api.get_episode(308834, "en")
+
+        self.assertEqual(episode.EpisodeName, "Crocodile")
+
+    def test_invalid_id(self):
+        """Missing data should raise TVDBIdError"""
+        self.assertRaises(error.TVDBIdError, self.api.get_series, 1, "en")
+
+    def test_load_raw_preferred(self):
+        """The bytes returned by load_raw should be used when available"""
+        class RawLoader(utils.FixtureLoader):
+            def load(self, url, cache=True):
+                raise AssertionError("load should not be used")
+
+            def load_raw(self, url, cache=True):
+                return utils.FixtureLoader.load(self, url, cache)
+
+        api = TVDB("B43FF87DE395DF56", loader=RawLoader())
+        self.assertEqual(api.get_episode(308834, "en").EpisodeName, "Crocodile")
+
+    def test_text_loader(self):
+        """Loaders returning strings should still be supported"""
+        class TextLoader(utils.FixtureLoader):
+            def load(self, url, cache=True):
+                return utils.FixtureLoader.load(self, url, cache).decode('utf-8')
+
+        api = TVDB("B43FF87DE395DF56", loader=TextLoader())
+        self.assertEqual(api.get_episode(308834, "en").EpisodeName, "Crocodile")
+        self.assertEqual(api.search("Dexter", "en")[0].SeriesName, "Dexter")
+
+    def test_mode(self):
+        """The serving mode should be passed to the loader, and the age of the data kept"""
+        class AgeLoader(utils.FixtureLoader):
+            def load_content(self, url, cache=True):
+                self.modes.append(cache)
+                return Content(utils.FixtureLoader.load(self, url, cache), 60.0, False)
+
+        loader = AgeLoader()
+        loader.modes = list()
+        api = TVDB("B43FF87DE395DF56", loader=loader, mode=OFFLINE)
+
+        show = api.get_series(79349, "en")
+        self.assertEqual((show.age, show[1][2].age), (60.0, 60.0))
+        self.assertEqual(api.get_episode(308834, "en").age, 60.0)
+        self.assertEqual(api.search("Dexter", "en").age, 60.0)
+        self.assertEqual(set(loader.modes), set([OFFLINE]))
+
+        api.sync(1371200000)
+        self.assertEqual(loader.modes[-1], OFFLINE)
+
+        self.assertRaises(error.TVDBValueError, TVDB, "B43FF87DE395DF56", loader=loader, mode="foo")
+
+    def test_no_age(self):
+        """The age should be None if not known by the loader"""
+        self.assertEqual(self.api.get_series(79349, "en").age, None)
+
+    def test_search_normalized(self):
+        """Searches differing in case, white space or normalization should be cached together"""
+        self.api.search("Dexter", "en")
+        for show in ("dexter ", " DEXTER", "\uff24exter", b"Dexter"):
+            self.assertEqual(self.api.search(show, "en")[0].SeriesName, "Dexter")
+
+        self.assertEqual(len([url for url in self.loader.urls if "GetSeries" in url]), 1)
+        self.assertEqual(self.api.search_buffer.stats, dict(hits=4, misses=1))
+
+        self.api.search("Dexter", "en", cache=False)
+        self.assertEqual(len([url for url in self.loader.urls if "GetSeries" in url]), 2)
+
+    def test_lazy_types(self):
+        """The attributes should be converted the same way when first accessed"""
+        for ignore_case in (False, True):
+            lazy, eager = [TVDB("B43FF87DE395DF56", loader=utils.FixtureLoader(), lazy_types=lazy_types,
+                                ignore_case=ignore_case) for lazy_types in (True, False)]
+            show, expected = lazy.get_series(79349, "en"), eager.get_series(79349, "en")
+            episode = show[1][2]
+
+            self.assertEqual(show.data._raw != {}, True)
+            self.assertEqual((episode.FirstAired, episode.GuestStars, episode.ProductionCode),
+                             (datetime.date(2006, 10, 8), ['Geoff Pierson', 'Mark L. Young'], '102'))
+            self.assertEqual(sorted(show.data.items()), sorted(expected.data.items()))
+            self.assertEqual(sorted(episode.data.items()), sorted(expected[1][2].data.items()))
+            self.assertEqual(lazy.get_episode(308834, "en").Rating, 7.8)
+
+    def test_generate_tree_buffers(self):
+        """The tree generator should accept both bytes and strings"""
+        data = '<?xml version="1.0" encoding="UTF-8" ?>\n<Data>\u00e9</Data>'
+
+        for value in (data, data.encode('utf-8')):
+            self.assertEqual(generate_tree(value).text, '\u00e9')
+
+
+class TestStreaming(unittest.TestCase):
+    """Tests parsing the full series data while it is read"""
+
+    def setUp(self):
+        self.loader = utils.FixtureLoader()
+        self.data = self.loader.load("/series/79349/all/en.xml")
+
+    def test_iterparse(self):
+        """The records should be the same as those of parse_xml"""
+        tree = generate_tree(self.data)
+        records = list(iterparse_xml(self.data, ('Series', 'Episode')))
+
+        self.assertEqual([record for element, record in records if element == 'Series'],
+                         parse_xml(tree, 'Series'))
+        self.assertEqual([record for element, record in records if element == 'Episode'],
+                         parse_xml(tree, 'Episode'))
+        self.assertEqual(list(iterparse_xml(self.data.decode('utf-8'), ('Actor',))), [])
+
+    def test_bad_data(self):
+        """Bad XML data should raise BadData"""
+        data = b'<?xml version="1.0" encoding="UTF-8" ?>\n<Data><Episode><id>1</id></Episode>'
+        self.assertRaises(error.BadData, list, iterparse_xml(data, ('Episode',)))
+
+    def test_show(self):
+        """The show should be populated from the streamed records"""
+        for parse_cache in (False, True):
+            api = TVDB("B43FF87DE395DF56", loader=utils.FixtureLoader(), parse_cache=parse_cache)
+            for _ in range(2):
+                show = api.search("Dexter", "en")[0]
+                show.update()
+
+                self.assertEqual(len(show), 2)
+                self.assertEqual(show.Status, "Ended")
+                self.assertEqual(show[1][2].EpisodeName, "Crocodile")
+
+        # The streamed records are not kept for the parse cache
+        self.assertEqual(api.parse_cache.stats['hits'], 0)
+
+
+class TestZip(unittest.TestCase):
+    """Tests loading the shows from the zip archives"""
+
+    def setUp(self):
+        self.loader = utils.FixtureLoader()
+        self.api = TVDB("B43FF87DE395DF56", loader=self.loader, use_zip=True)
+
+    def test_zip(self):
+        """The full show should be loaded with a single request"""
+        show = self.api.get_series(79349, "en")
+        show.update()
+
+        self.assertEqual(len(show), 2)
+        self.assertEqual(show.Status, "Ended")
+        self.assertEqual(show[1][2].EpisodeName, "Crocodile")
+        self.assertEqual(len(show.actor_objects), 2)
+        self.assertEqual(len(show.banner_objects), 2)
+        self.assertEqual(len([u for u in self.loader.urls if u.endswith('.zip')]), 1)
+        self.assertEqual(len(self.loader.urls), 3)
+
+    def test_get_series_many(self):
+        """get_series_many should load the shows from the zip archive"""
+        results = list(self.api.get_series_many([79349], "en"))
+        show = results[0][1]
+
+        self.assertEqual(len(show.seasons), 2)
+        self.assertEqual(len(show.actor_objects), 2)
+        self.assertEqual(self.loader.urls[-1][-7:], "/en.zip")
+        self.assertEqual(len(self.loader.urls), 2)
+
+    def test_missing_files(self):
+        """Actors and banners are optional, the series data is not"""
+        series = utils.zip_fixture([('en.xml', 'series.xml')])
+        show = self.api.get_series(79349, "en")
+        show._set_zip_data(pytvdbapi.api._parse_zip(self.api, "http://zip/", series, "en"))
+
+        self.assertEqual(len(show.seasons), 2)
+        self.assertEqual(show.actor_objects, [])
+
+        self.assertRaises(error.BadData, pytvdbapi.api._read_zip, series, "sv")
+        self.assertRaises(error.BadData, pytvdbapi.api._read_zip, b"foo", "en")
+
+
+class TestSync(unittest.TestCase):
+    """Tests the incremental sync using Updates.php"""
+
+    def setUp(self):
+        self.loader = utils.FixtureLoader()
+        self.api = TVDB("B43FF87DE395DF56", loader=self.loader)
+
+    def test_time(self):
+        """The server time should be returned without invalidating anything"""
+        self.assertEqual(self.api.sync(), 1371300000)
+        self.assertTrue(self.loader.urls[-1].endswith("Updates.php?type=none"))
+
+    def test_sync(self):
+        """The changed shows should be invalidated and reloaded"""
+        invalidated = []
+
+        class Cache(object):
+            def invalidate(self, series_ids, episode_ids):
+                invalidated.append((sorted(series_ids), sorted(episode_ids)))
+
+        self.loader.cache = Cache()
+        self.api.search_buffer[("dexter", "en")] = []
+
+        self.assertEqual(self.api.sync(1371200000, "en", series_ids=[79349, 79168]), 1371300000)
+        self.assertEqual(invalidated, [([79349, 80379], [308834])])
+        self.assertEqual(len(self.api.search_buffer), 0)
+        self.assertTrue("Updates.php?type=all&time=1371200000" in self.loader.urls[1])
+
+        reloaded = [url for url in self.loader.urls if "/series/" in url]
+        self.assertEqual(len(reloaded), 1)
+        self.assertTrue("/series/79349/all/en.xml" in reloaded[0])
+
+    def test_bad_data(self):
+        """A missing server time should raise BadData"""
+        self.loader.load = lambda url, cache=True: b"<Error>Invalid time</Error>"
+        self.assertRaises(error.BadData, self.api.sync, 0)
+
+
+class TestGetSeriesMany(unittest.TestCase):
+    """Tests the concurrent loading of several shows"""
+
+    def setUp(self):
+        self.loader = utils.FixtureLoader()
+        self.api = TVDB("B43FF87DE395DF56", loader=self.loader,
+                        actors=True, banners=True)
+
+    def test_get_series_many(self):
+        """All shows should be loaded, failures returned as results"""
+        results = dict(self.api.get_series_many([79349, 1, 2], "en", max_workers=2))
+
+        self.assertEqual(sorted(results.keys()), [1, 2, 79349])
+        self.assertEqual(type(results[1]), error.TVDBIdError)
+        self.assertEqual(type(results[2]), error.TVDBIdError)
+
+        show = results[79349]
+        self.assertEqual(show.SeriesName, "Dexter")
+        self.assertEqual(len(show.seasons), 2)
+        self.assertEqual(len(show.actor_objects), 2)
+        self.assertEqual(len(show.banner_objects), 2)
+
+    def test_full_loads_series_once(self):
+        """The series data should only be loaded once for a full load"""
+        list(self.api.get_series_many([79349], "en"))
+
+        self.assertEqual(len([u for u in self.loader.urls if u.endswith('all/en.xml')]), 1)
+
+    def test_not_full(self):
+        """Only the basic show data should be loaded when full is False"""
+        results = list(self.api.get_series_many([79349], "en", full=False))
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0][1].seasons, {})
+        self.assertEqual(len(self.loader.urls), 2)
+
+    def test_invalid_arguments(self):
+        """Invalid language or worker count should raise TVDBValueError"""
+        self.assertRaises(error.TVDBValueError, list, self.api.get_series_many([79349], "foo"))
+        self.assertRaises(error.TVDBValueError, list, self.api.get_series_many([79349], "en", max_workers=0))
+
+    def test_streaming(self):
+        """The first result should be yielded before the last show is started"""
+        started = []
+
+        def _ids():
+            for i in range(100):
+                started.append(i)
+                yield 79349
+
+        results = self.api.get_series_many(_ids(), "en", max_workers=2)
+        series_id, show = next(results)
+        first = len(started)
+        results.close()
+
+        self.assertEqual((series_id, len(show.actor_objects)), (79349, 2))
+        self.assertTrue(first < 100, first)
+
+        # The actors and banners of a started show are loaded before new shows
+        self.assertTrue(len([u for u in self.loader.urls if u.endswith('all/en.xml')]) <= 2 * 2 + 2)
+
+    def test_endless_ids(self):
+        """An endless iterator of Show Ids should be supported"""
+        results = self.api.get_series_many(itertools.repeat(79349), "en", max_workers=2)
+        self.assertEqual([next(results)[0] for _ in range(3)], [79349] * 3)
+        results.close()
+
+    def test_stop_early(self):
+        """It should be possible to stop iterating before all shows are done"""
+        results = self.api.get_series_many([79349] * 10, "en", max_workers=2)
+        series_id, show = next(results)
+        results.close()
+
+        self.assertEqual(series_id, 79349)
+
+
 class TestSeason(unittest.TestCase):
     def test_seasons(self):
         """The seasons should function properly"""
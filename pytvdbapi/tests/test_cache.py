@@ -0,0 +1,553 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 - 2013 Björn Larsson
+
+# This file is part of pytvdbapi.
+#
+# pytvdbapi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pytvdbapi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pytvdbapi.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import, print_function
+
+import os
+import pickle
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+try:
+    from BaseHTTPServer import HTTPServer
+except ImportError:
+    from http.server import HTTPServer
+
+import httplib2
+
+from pytvdbapi.api import TVDB
+from pytvdbapi import error
+from pytvdbapi.cache import (BloomFilter, BloomNegativeCache, FileCache, NegativeCache, ParseCache,
+                             SQLiteCache, migrate)
+from pytvdbapi.loader import OFFLINE, REVALIDATE, Content, Loader, cache_key
+from pytvdbapi.tests import utils
+from pytvdbapi.tests.test_loader import CachingHandler
+
+URL = "http://thetvdb.com/api/B43FF87DE395DF56/series/79349/all/en.xml"
+
+
+def entry(url, body=b"<Data></Data>"):
+    """Creates a cache entry in the format used by httplib2"""
+    headers = "status: 200\r\ncontent-location: {0}\r\netag: \"v1\"\r\n\r\n".format(url)
+    return headers.encode('utf-8') + body
+
+
+class TestSQLiteCache(unittest.TestCase):
+    """Tests the SQLite cache backend"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'cache', 'pytvdbapi.db')
+        self.cache = SQLiteCache(self.path)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.tmp)
+
+    def _rows(self):
+        connection = sqlite3.connect(self.path)
+        try:
+            return connection.execute(
+                "SELECT key, resource, id, language, compressed FROM entries").fetchall()
+        finally:
+            connection.close()
+
+    def test_set_get(self):
+        """Stored entries should be returned unchanged"""
+        self.cache.set(URL, entry(URL))
+
+        self.assertEqual(self.cache.get(URL), entry(URL))
+        self.assertEqual(self.cache.get(URL.replace('79349', '1')), None)
+        self.assertEqual(len(self._rows()), 1)
+
+    def test_index(self):
+        """The entries should be indexed by the normalized url and resource"""
+        self.cache.set(URL.replace('http://thetvdb', 'HTTP://TheTVDB'), entry(URL))
+
+        self.assertEqual(self.cache.get(URL), entry(URL))
+        self.assertEqual(self._rows(), [(URL, 'series', '79349', 'en', 1)])
+
+    def test_uncompressed(self):
+        """It should be possible to store the entries uncompressed"""
+        cache = SQLiteCache(self.path, compress=False)
+        cache.set(URL, entry(URL))
+
+        self.assertEqual(self.cache.get(URL), entry(URL))
+        self.assertEqual(self._rows()[0][4], 0)
+        cache.close()
+
+    def test_delete(self):
+        """It should be possible to delete entries"""
+        self.cache.set(URL, entry(URL))
+        self.cache.delete(URL)
+        self.cache.delete(URL)
+
+        self.assertEqual(self.cache.get(URL), None)
+
+    def test_wal(self):
+        """The database should use write-ahead logging"""
+        connection = sqlite3.connect(self.path)
+        self.assertEqual(connection.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+        connection.close()
+
+    def test_threads(self):
+        """The cache should be usable from several threads"""
+        def _work(i):
+            url = URL.replace('79349', str(i))
+            self.cache.set(url, entry(url))
+            self.assertEqual(self.cache.get(url), entry(url))
+
+        threads = [threading.Thread(target=_work, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(self._rows()), 8)
+
+    def test_migrate(self):
+        """The entries of a cache directory should be migrated"""
+        cache_dir = os.path.join(self.tmp, 'files')
+        urls = [URL.replace('79349', str(i)) for i in range(3)]
+
+        httplib2.FileCache(cache_dir).set(urls[0], entry(urls[0]))
+        FileCache(cache_dir).set(urls[1], entry(urls[1]))
+        FileCache(cache_dir).set(urls[2], entry(urls[2]))
+        with open(os.path.join(cache_dir, 'other.txt'), 'w') as handle:
+            handle.write("Not a cache entry")
+
+        self.assertEqual(migrate(cache_dir, self.cache, remove=True), 3)
+        for url in urls:
+            self.assertEqual(self.cache.get(cache_key(url)), entry(url))
+        self.assertEqual(os.listdir(cache_dir), ['other.txt'])
+
+        self.assertEqual(migrate(os.path.join(self.tmp, 'missing'), self.cache), 0)
+
+    def test_migrate_urls(self):
+        """The entries should be migrated using the URL if canonical_keys is False"""
+        cache_dir = os.path.join(self.tmp, 'files')
+        httplib2.FileCache(cache_dir).set(URL, entry(URL))
+
+        self.assertEqual(migrate(cache_dir, self.cache, canonical_keys=False), 1)
+        self.assertEqual(self.cache.get(URL), entry(URL))
+
+    def test_migrate_loader(self):
+        """The migrated entries should be used by the loader"""
+        cache_dir = os.path.join(self.tmp, 'files')
+        httplib2.FileCache(cache_dir).set(URL, entry(URL))
+        migrate(cache_dir, self.cache)
+
+        loader = Loader(self.tmp, cache=self.cache)
+        self.assertEqual(loader.load_raw(URL, OFFLINE), b"<Data></Data>")
+
+    def test_url_keys(self):
+        """The loader should use the entries of an existing httplib2 cache directory"""
+        cache_dir = os.path.join(self.tmp, 'files')
+        httplib2.FileCache(cache_dir).set(URL, entry(URL))
+
+        loader = Loader(cache_dir)
+        self.assertEqual(loader.load_raw(URL, OFFLINE), b"<Data></Data>")
+
+    def test_loader(self):
+        """The loader should be able to use the cache"""
+        CachingHandler.requests = list()
+        server = HTTPServer(('127.0.0.1', 0), CachingHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+
+        try:
+            url = 'http://127.0.0.1:{0}/api/B43FF87DE395DF56/series/79349/all/en.xml'.format(
+                server.server_port)
+            loader = Loader(self.tmp, cache=self.cache)
+
+            for cache in (True, True, REVALIDATE):
+                self.assertEqual(loader.load_raw(url, cache), CachingHandler.body)
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+        self.assertEqual(CachingHandler.requests, [None, '"v1"'])
+        self.assertEqual(self._rows()[0][:2], (cache_key(url), 'series'))
+        self.assertEqual(os.listdir(self.tmp), ['cache'])
+
+
+class CacheLimitsMixin(object):
+    """Tests shared by the caches for the size and age limits"""
+
+    def create(self, **kwargs):
+        raise NotImplementedError()
+
+    def age(self, cache, url, seconds):
+        """Makes the entry appear older"""
+        raise NotImplementedError()
+
+    def access(self, cache, url, seconds):
+        """Makes the entry appear to have been accessed earlier"""
+        raise NotImplementedError()
+
+    def test_max_age(self):
+        """Entries older than max_age should not be used"""
+        cache = self.create(max_age=3600)
+        cache.set(URL, entry(URL))
+        self.assertEqual(cache.get(URL), entry(URL))
+
+        self.age(cache, URL, 7200)
+        self.assertEqual(cache.get(URL), None)
+        self.assertEqual(cache.prune(), 1)
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_max_bytes(self):
+        """The least recently used entries should be removed"""
+        cache = self.create(compress=False)
+        urls = [URL.replace('79349', str(i)) for i in range(4)]
+        for url in urls:
+            cache.set(url, entry(url))
+        size = cache.stats()['bytes']
+
+        for i, url in enumerate(urls):
+            self.access(cache, url, 1000 - i * 100)
+        self.access(cache, urls[0], 0)
+
+        cache.max_bytes = size - 1
+        cache.set(urls[3], entry(urls[3]))
+
+        remaining = [url for url in urls if cache.get(url) is not None]
+        self.assertEqual(remaining, [urls[0], urls[2], urls[3]])
+        self.assertTrue(cache.stats()['bytes'] <= cache.max_bytes)
+
+    def test_prune_explicit(self):
+        """It should be possible to prune the cache to a given size"""
+        cache = self.create()
+        for i in range(3):
+            url = URL.replace('79349', str(i))
+            cache.set(url, entry(url))
+
+        self.assertEqual(cache.prune(max_bytes=0), 3)
+        self.assertEqual(cache.prune(), 0)
+
+    def test_stats(self):
+        """The stats should be kept for each resource type"""
+        cache = self.create()
+        cache.set(URL, entry(URL))
+        actors = URL.replace('all/en.xml', 'actors.xml')
+        cache.set(actors, entry(actors))
+
+        stats = cache.stats()
+        self.assertEqual(stats['entries'], 2)
+        self.assertEqual(sorted(stats['resources'].keys()), ['actors', 'series'])
+        self.assertEqual(stats['resources']['series']['entries'], 1)
+        self.assertEqual(stats['bytes'], sum(r['bytes'] for r in stats['resources'].values()))
+
+    def test_clear(self):
+        """It should be possible to clear all or some of the entries"""
+        cache = self.create()
+        actors = URL.replace('all/en.xml', 'actors.xml')
+        for url in (URL, actors, URL.replace('79349', '1')):
+            cache.set(url, entry(url))
+
+        self.assertEqual(cache.clear(resource_type='series'), 2)
+        self.assertEqual(cache.get(actors), entry(actors))
+        self.assertEqual(cache.clear(), 1)
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_invalidate(self):
+        """The entries of the series and episodes should be removed"""
+        cache = self.create()
+        episode = URL.replace('series/79349/all', 'episodes/308834')
+        other = URL.replace('79349', '1')
+        urls = [URL, URL.replace('en.xml', 'sv.xml'), URL.replace('all/en.xml', 'banners.xml'),
+                URL.replace('.xml', '.zip'), episode, other]
+        for url in urls:
+            cache.set(url, entry(url))
+
+        self.assertEqual(cache.invalidate([79349], [308834]), 5)
+        self.assertEqual([url for url in urls if cache.get(url) is not None], [other])
+        self.assertEqual(cache.invalidate(), 0)
+
+
+class TestFileCacheLimits(CacheLimitsMixin, unittest.TestCase):
+    """Tests the limits of the file cache"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def create(self, **kwargs):
+        return FileCache(self.tmp, **kwargs)
+
+    def _touch(self, cache, url, seconds, modified):
+        filename = cache._filename(url)
+        times = os.stat(filename)
+        accessed = times.st_atime if modified else time.time() - seconds
+        os.utime(filename, (accessed, time.time() - seconds if modified else times.st_mtime - seconds))
+
+    def age(self, cache, url, seconds):
+        self._touch(cache, url, seconds, True)
+
+    def access(self, cache, url, seconds):
+        self._touch(cache, url, seconds, False)
+
+    def test_httplib2_compatible(self):
+        """Entries stored by the httplib2 file cache should be used"""
+        httplib2.FileCache(self.tmp).set(URL, entry(URL))
+        self.assertEqual(FileCache(self.tmp).get(URL), entry(URL))
+
+    def test_no_temporary_files(self):
+        """No temporary files should be left in the cache directory"""
+        FileCache(self.tmp).set(URL, entry(URL))
+        self.assertEqual(len(os.listdir(self.tmp)), 1)
+
+
+class TestSQLiteCacheLimits(CacheLimitsMixin, unittest.TestCase):
+    """Tests the limits of the SQLite cache"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.caches = list()
+
+    def tearDown(self):
+        for cache in self.caches:
+            cache.close()
+        shutil.rmtree(self.tmp)
+
+    def create(self, **kwargs):
+        self.caches.append(SQLiteCache(os.path.join(self.tmp, 'cache.db'), **kwargs))
+        return self.caches[-1]
+
+    def age(self, cache, url, seconds):
+        cache._connection().execute("UPDATE entries SET stored = stored - ? WHERE key = ?", (seconds, url))
+
+    def access(self, cache, url, seconds):
+        cache._connection().execute("UPDATE entries SET accessed = ? WHERE key = ?",
+                                    (time.time() - seconds, url))
+
+
+def _serve_fixtures(loader):
+    """Makes the loader serve the fixtures instead of loading from thetvdb.com"""
+    fixtures = utils.FixtureLoader()
+    loader.load_content = lambda url, cache=True: Content(fixtures.load(url, cache), None, False)
+
+
+class TestCacheProperty(unittest.TestCase):
+    """Tests accessing the cache through the api"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_cache(self):
+        """The cache of the loader should be available"""
+        loader = Loader(self.tmp, max_bytes=1000, max_age=60)
+        _serve_fixtures(loader)
+
+        api = TVDB("B43FF87DE395DF56", loader=loader)
+        self.assertTrue(api.cache is loader.cache)
+        self.assertEqual((api.cache.max_bytes, api.cache.max_age), (1000, 60))
+
+    def test_no_cache(self):
+        """The cache should be None if the loader does not have a cache"""
+        self.assertEqual(TVDB("B43FF87DE395DF56", loader=utils.FixtureLoader()).cache, None)
+
+
+class TestParseCache(unittest.TestCase):
+    """Tests the cache of the parsed data"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_get_set(self):
+        """The result should only be returned for the same data and elements"""
+        cache = ParseCache()
+        cache.set("http://a/", b"<Data/>", ('Series',), {'Series': [1]})
+
+        self.assertEqual(cache.get("http://a/", b"<Data/>", ('Series',)), {'Series': [1]})
+        self.assertEqual(cache.get("http://a/", b"<Data></Data>", ('Series',)), None)
+        self.assertEqual(cache.get("http://a/", b"<Data/>", ('Episode',)), None)
+        self.assertEqual(cache.stats, dict(hits=1, misses=2))
+
+    def test_mirrors(self):
+        """The results should be shared by the mirrors, but not by the zip members"""
+        cache = ParseCache()
+        cache.set("http://a/api/B43FF87DE395DF56/series/1/all/en.zip#en.xml", b"<Data/>", ('Series',), 1)
+
+        self.assertEqual(cache.get("http://b/api/0123456789ABCDEF/series/1/all/en.zip#en.xml", b"<Data/>",
+                                   ('Series',)), 1)
+        self.assertEqual(cache.get("http://a/api/B43FF87DE395DF56/series/1/all/en.zip#actors.xml", b"<Data/>",
+                                   ('Series',)), None)
+
+    def test_max_entries(self):
+        """The least recently used results should be removed"""
+        cache = ParseCache(max_entries=10)
+        for i in range(11):
+            cache.set("http://a/{0}".format(i), b"<Data/>", ('Series',), i)
+
+        self.assertEqual(cache.get("http://a/0", b"<Data/>", ('Series',)), None)
+        self.assertEqual(cache.get("http://a/10", b"<Data/>", ('Series',)), 10)
+
+    def test_max_bytes(self):
+        """The results should be removed to keep the size below max_bytes"""
+        cache = ParseCache(max_bytes=2500)
+        for i in range(3):
+            cache.set("http://a/{0}".format(i), b"<Data/>", ('Series',), b"x" * 1000)
+
+        self.assertEqual(cache.get("http://a/0", b"<Data/>", ('Series',)), None)
+        self.assertEqual(cache.get("http://a/2", b"<Data/>", ('Series',)), b"x" * 1000)
+        self.assertTrue(cache.size <= 2500, cache.size)
+
+        # Results larger than max_bytes are not kept in memory
+        cache.set("http://a/2", b"<Data/>", ('Series',), b"x" * 3000)
+        self.assertEqual(cache.get("http://a/2", b"<Data/>", ('Series',)), None)
+        self.assertTrue(cache.size <= 1100, cache.size)
+
+    def test_path(self):
+        """The results stored in the directory should be available to new caches"""
+        ParseCache(path=self.tmp).set("http://a/", b"<Data/>", ('Series',), [1, 2])
+
+        cache = ParseCache(path=self.tmp)
+        self.assertEqual(cache.get("http://a/", b"<Data/>", ('Series',)), [1, 2])
+
+        cache.clear()
+        self.assertEqual(ParseCache(path=self.tmp).get("http://a/", b"<Data/>", ('Series',)), None)
+
+    def test_api(self):
+        """Data already parsed should not be parsed again, except the streamed full series data"""
+        api = TVDB("B43FF87DE395DF56", loader=utils.FixtureLoader(), actors=True, banners=True)
+        api.get_series(79349, "en").update()
+        stats = api.parse_cache.stats
+
+        show = api.get_series(79349, "en", cache=False)
+        show.update()
+        self.assertEqual(api.parse_cache.stats['misses'], stats['misses'])
+        self.assertEqual(api.parse_cache.stats['hits'], stats['hits'] + 3)
+        self.assertEqual(show[1][2].EpisodeName, "Crocodile")
+        self.assertEqual(len(show.actor_objects), 2)
+
+    def test_api_disabled(self):
+        """It should be possible to disable the cache of the parsed data"""
+        api = TVDB("B43FF87DE395DF56", loader=utils.FixtureLoader(), parse_cache=False)
+        self.assertEqual(api.parse_cache, None)
+        self.assertEqual(api.get_episode(308834, "en").EpisodeName, "Crocodile")
+
+    def test_pickle(self):
+        """Shows loaded using the default loader should be possible to pickle"""
+        loader = Loader(self.tmp)
+        _serve_fixtures(loader)
+        show = TVDB("B43FF87DE395DF56", loader=loader).get_series(79349, "en")
+        del loader.load_content
+
+        loaded = pickle.loads(pickle.dumps(show))
+        self.assertEqual(loaded.SeriesName, show.SeriesName)
+        self.assertEqual(loaded.api.loader.pool_size, 1)
+
+
+class TestNegativeCache(unittest.TestCase):
+    """Tests remembering the missing ids"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.loader = utils.FixtureLoader()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _requests(self):
+        return len([url for url in self.loader.urls if 'mirrors' not in url])
+
+    def test_api(self):
+        """Missing ids should only be requested once"""
+        api = TVDB("B43FF87DE395DF56", loader=self.loader)
+        for _ in range(2):
+            self.assertRaises(error.TVDBIdError, api.get_series, 1, "en")
+            self.assertRaises(error.TVDBIdError, api.get_episode, 1, "en")
+        self.assertEqual(self._requests(), 2)
+
+        self.assertRaises(error.TVDBIdError, api.get_series, 1, "en", cache=False)
+        self.assertEqual(self._requests(), 3)
+        self.assertEqual(api.get_series(79349, "en").SeriesName, "Dexter")
+
+    def test_disabled(self):
+        """It should be possible to disable the negative cache"""
+        api = TVDB("B43FF87DE395DF56", loader=self.loader, negative_cache=False)
+        for _ in range(2):
+            self.assertRaises(error.TVDBIdError, api.get_series, 1, "en")
+        self.assertEqual(self._requests(), 2)
+
+    def test_ttl(self):
+        """The missing ids should be forgotten after the ttl"""
+        cache = NegativeCache(ttl=60)
+        cache._entries._clock = lambda: now
+
+        now = 1000
+        cache.add(('series', '1', 'en'))
+        self.assertTrue(('series', '1', 'en') in cache)
+        self.assertFalse(('series', '1', 'sv') in cache)
+
+        now += 60
+        self.assertFalse(('series', '1', 'en') in cache)
+
+    def test_bloom_filter(self):
+        """The filter should contain the added keys and few others"""
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add('series/{0}/en'.format(i))
+
+        self.assertTrue(all('series/{0}/en'.format(i) in bloom for i in range(1000)))
+        false_positives = sum(1 for i in range(1000, 11000) if 'series/{0}/en'.format(i) in bloom)
+        self.assertTrue(false_positives < 300, false_positives)
+        self.assertRaises(error.TVDBValueError, BloomFilter, 0)
+
+    def test_bloom_rotation(self):
+        """The ids should be remembered between ttl and twice the ttl"""
+        cache = BloomNegativeCache(ttl=60, capacity=100)
+        cache._clock = lambda: now
+
+        now = cache._started
+        cache.add(('series', 1, 'en'))
+        now += 60
+        self.assertTrue(('series', 1, 'en') in cache)
+        now += 60
+        self.assertFalse(('series', 1, 'en') in cache)
+
+    def test_bloom_path(self):
+        """The filters should be kept between sessions"""
+        path = os.path.join(self.tmp, 'missing.bloom')
+        cache = BloomNegativeCache(path=path)
+        cache.add(('episode', 1, 'en'))
+        cache.save()
+
+        api = TVDB("B43FF87DE395DF56", loader=self.loader, negative_cache=BloomNegativeCache(path=path))
+        self.assertRaises(error.TVDBIdError, api.get_episode, 1, "en")
+        self.assertEqual(self._requests(), 0)
+
+
+if __name__ == "__main__":
+    sys.exit(unittest.main())
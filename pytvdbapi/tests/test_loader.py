@@ -19,14 +19,28 @@
 
 from __future__ import absolute_import, print_function
 
+import os
 import shutil
+import socket
 import sys
 import tempfile
+import threading
+import time
 import unittest
+import zlib
 from pkg_resources import resource_filename
 
+try:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+except ImportError:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import httplib2
+
 from pytvdbapi import error
-from pytvdbapi.loader import Loader
+from pytvdbapi.loader import (OFFLINE, REVALIDATE, STALE_IF_ERROR, STALE_WHILE_REVALIDATE, FreshnessPolicy,
+                              Loader, Resource, RetryPolicy, SingleFlight, cache_key, normalize_url,
+                              resource_type)
 from pytvdbapi.tests import utils, basetest
 
 
@@ -80,5 +94,633 @@ class TestLoader(basetest.pytvdbapiTest):
 
         self.loader.load(url, cache=False)
 
+    def test_invalid_pool_size(self):
+        """Loader should raise TVDBValueError if the pool size is invalid"""
+
+        self.assertRaises(error.TVDBValueError, Loader, self.tmp, pool_size=0)
+
+    def test_pool_released_on_error(self):
+        """
+        The connection objects should be returned to the pool also when the
+        request fails
+        """
+        loader = Loader(self.tmp, pool_size=2)
+
+        for _ in range(3):
+            self.assertRaises(error.ConnectionError, loader.load,
+                              "http://laba.laba")
+
+        self.assertEqual(loader._pool.qsize(), 2)
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Tests the coalescing of concurrent requests"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.loader = Loader(self.tmp, pool_size=4)
+        self.release = threading.Event()
+        self.requests = list()
+        self.loader._request = self._request
+        self.status = 200
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _request(self, url, headers):
+        """Blocks until released, counting the requests made"""
+        self.requests.append(url)
+        self.release.wait()
+        return httplib2.Response({'status': self.status}), b'data'
+
+    def _load_concurrently(self, urls, cache=True):
+        """Loads the urls from one thread each, returning the outcomes"""
+        results = dict()
+
+        def _load(i, url):
+            try:
+                results[i] = self.loader.load_raw(url, cache)
+            except Exception as _error:
+                results[i] = _error
+
+        threads = [threading.Thread(target=_load, args=(i, url)) for i, url in enumerate(urls)]
+        for thread in threads:
+            thread.start()
+
+        # Wait for the requests to be in progress before releasing them
+        for _ in range(500 if not self.release.is_set() else 0):
+            waiting = sum(self.loader._flights.waiting(key) for key in set(
+                (normalize_url(url), cache) for url in urls))
+            if len(self.requests) + waiting == len(urls):
+                break
+            time.sleep(0.01)
+
+        self.release.set()
+        for thread in threads:
+            thread.join()
+        return [results[i] for i in range(len(urls))]
+
+    def test_coalesced(self):
+        """Concurrent requests for the same url should share one request"""
+        url = "http://thetvdb.com/api/key/series/79349/en.xml"
+        results = self._load_concurrently([url, url.replace("thetvdb", "TheTVDB"), url + "#x", url])
+
+        self.assertEqual(results, [b'data'] * 4)
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(len(self.loader._flights), 0)
+
+    def test_different_urls(self):
+        """Requests for different urls should not be coalesced"""
+        url = "http://thetvdb.com/api/key/series/{0}/en.xml"
+        results = self._load_concurrently([url.format(i) for i in range(3)])
+
+        self.assertEqual(results, [b'data'] * 3)
+        self.assertEqual(len(self.requests), 3)
+
+    def test_shared_error(self):
+        """All callers should get the error raised by the shared request"""
+        self.status = 404
+        url = "http://thetvdb.com/api/key/series/1/en.xml"
+        results = self._load_concurrently([url] * 3)
+
+        self.assertEqual(len(self.requests), 1)
+        for result in results:
+            self.assertTrue(isinstance(result, error.TVDBNotFoundError))
+
+    def test_sequential(self):
+        """The result should not be kept once the request is done"""
+        self.release.set()
+        url = "http://thetvdb.com/api/key/series/79349/en.xml"
+        self.loader.load_raw(url)
+        self.loader.load_raw(url)
+
+        self.assertEqual(len(self.requests), 2)
+
+    def test_disabled(self):
+        """It should be possible to disable the coalescing"""
+        self.loader = Loader(self.tmp, pool_size=4, coalesce=False)
+        self.loader._request = self._request
+        self.release.set()
+
+        url = "http://thetvdb.com/api/key/series/79349/en.xml"
+        self.assertEqual(self._load_concurrently([url] * 2), [b'data'] * 2)
+        self.assertEqual(len(self.requests), 2)
+
+    def test_single_flight(self):
+        """The SingleFlight should pass the arguments to the function"""
+        self.assertEqual(SingleFlight().call('key', max, 1, 2), 2)
+
+    def test_normalize_url(self):
+        """Equivalent urls should be normalized to the same url"""
+        self.assertEqual(normalize_url("HTTP://TheTVDB.com:80/api?a=B#c"), "http://thetvdb.com/api?a=B")
+        self.assertEqual(normalize_url("https://thetvdb.com:443"), "https://thetvdb.com/")
+        self.assertEqual(normalize_url("http://thetvdb.com:8080/"), "http://thetvdb.com:8080/")
+
+class TestRetry(unittest.TestCase):
+    """Tests the retry and rate limiting of the loader"""
+
+    url = "http://thetvdb.com/api/B43FF87DE395DF56/series/79349/en.xml"
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.responses, self.now = list(), 1000.0
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _loader(self, **kwargs):
+        """Creates a loader using the fake request, clock and sleep"""
+        loader = Loader(self.tmp, **kwargs)
+        loader._request = self._request
+        loader._clock = lambda: self.now
+        loader._sleep = self._sleep
+        return loader
+
+    def _sleep(self, seconds):
+        self.now += seconds
+
+    def _request(self, url, headers):
+        """Returns the next response from the list"""
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return httplib2.Response(response), b'data'
+
+    def test_no_retry(self):
+        """Requests should not be retried by default"""
+        self.responses = [{'status': 503}, {'status': 200}]
+        loader = self._loader()
+
+        self.assertRaises(error.ConnectionError, loader.load_raw, self.url)
+        self.assertEqual(loader.stats['requests'], 1)
+
+    def test_retry(self):
+        """Failed requests should be retried with an increasing delay"""
+        self.responses = [{'status': 503}, socket.error(), {'status': 429}, {'status': 200}]
+        loader = self._loader(retry=RetryPolicy(retries=3, backoff=1, seed=1))
+
+        self.assertEqual(loader.load_raw(self.url), b'data')
+
+        stats = loader.stats
+        self.assertEqual((stats['requests'], stats['retries'], stats['failures']), (4, 3, 0))
+        self.assertTrue(3.5 <= stats['retry_wait'] <= 7)
+        self.assertAlmostEqual(self.now - 1000, stats['retry_wait'])
+
+    def test_retries_exhausted(self):
+        """The error should be raised once all retries have been used"""
+        self.responses = [{'status': 500}] * 3
+        loader = self._loader(retry=RetryPolicy(retries=2))
+
+        self.assertRaises(error.ConnectionError, loader.load_raw, self.url)
+        self.assertEqual(loader.stats['requests'], 3)
+        self.assertEqual(loader.stats['failures'], 1)
+
+    def test_not_retried(self):
+        """Not found and other statuses should not be retried"""
+        self.responses = [{'status': 404}, {'status': 403}]
+        loader = self._loader(retry=RetryPolicy())
+
+        self.assertRaises(error.TVDBNotFoundError, loader.load_raw, self.url)
+        self.assertRaises(error.ConnectionError, loader.load_raw, self.url)
+        self.assertEqual(loader.stats['retries'], 0)
+
+    def test_retry_after(self):
+        """The Retry-After header should be respected"""
+        self.responses = [{'status': 503, 'retry-after': '20'}, {'status': 200}]
+        loader = self._loader(retry=RetryPolicy(backoff=0.1))
+
+        loader.load_raw(self.url)
+        self.assertEqual(self.now, 1020)
+
+    def test_retry_after_date(self):
+        """The Retry-After header can be given as a date"""
+        self.now = 784111767.0
+        self.responses = [{'status': 503, 'retry-after': 'Sun, 06 Nov 1994 08:49:37 GMT'}, {'status': 200}]
+        loader = self._loader(retry=RetryPolicy(backoff=0.1))
+
+        loader.load_raw(self.url)
+        self.assertEqual(self.now, 784111777.0)
+
+    def test_deadline(self):
+        """No retry should be made if it would exceed the deadline"""
+        self.responses = [{'status': 503}, {'status': 503, 'retry-after': '60'}, {'status': 200}]
+        loader = self._loader(retry=RetryPolicy(backoff=1, deadline=30))
+
+        self.assertRaises(error.ConnectionError, loader.load_raw, self.url)
+        self.assertEqual(loader.stats['requests'], 2)
+
+    def test_rate_limit(self):
+        """Requests using the same API key should be rate limited"""
+        self.responses = [{'status': 200}] * 5
+        loader = self._loader(rate=2, burst=2)
+
+        for _ in range(4):
+            loader.load_raw(self.url)
+        self.assertEqual(self.now, 1001)
+        self.assertEqual(loader.stats['rate_wait'], 1)
+
+        # A different API key has its own limit
+        loader.load_raw(self.url.replace("B43FF87DE395DF56", "0123456789ABCDEF"))
+        self.assertEqual(self.now, 1001)
+
+    def test_rate_limit_deadline(self):
+        """The deadline should also apply to waiting for the rate limit"""
+        self.responses = [{'status': 200}] * 2
+        loader = self._loader(rate=0.01, retry=RetryPolicy(deadline=10))
+
+        loader.load_raw(self.url)
+        self.assertRaises(error.ConnectionError, loader.load_raw, self.url)
+        self.assertEqual(loader.stats['requests'], 1)
+
+    def test_invalid_values(self):
+        """Invalid values should raise TVDBValueError"""
+        self.assertRaises(error.TVDBValueError, RetryPolicy, retries=-1)
+        self.assertRaises(error.TVDBValueError, RetryPolicy, deadline=0)
+        self.assertRaises(error.TVDBValueError, Loader, self.tmp, rate=0)
+
+
+class CachingHandler(BaseHTTPRequestHandler):
+    """Serves a fixed body supporting conditional requests"""
+    protocol_version = 'HTTP/1.0'
+    body = b'<?xml version="1.0" encoding="UTF-8" ?><Data></Data>'
+    requests = list()
+
+    def do_GET(self):
+        self.requests.append(self.headers.get('If-None-Match'))
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.send_header('ETag', '"v1"')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Cache-Control', 'max-age=3600')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCacheStats(unittest.TestCase):
+    """Tests the cache counters and revalidation using a local server"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.loader = Loader(self.tmp)
+
+        CachingHandler.requests = list()
+        self.server = HTTPServer(('127.0.0.1', 0), CachingHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = 'http://127.0.0.1:{0}/api/B43FF87DE395DF56/series/79349/all/en.xml'.format(
+            self.server.server_port)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        shutil.rmtree(self.tmp)
+
+    def test_hit(self):
+        """Fresh cached data should be counted as a hit"""
+        self.loader.load_raw(self.url)
+        self.loader.load_raw(self.url)
+
+        stats = self.loader.cache_stats['series']
+        self.assertEqual((stats['downloads'], stats['hits'], stats['revalidations']), (1, 1, 0))
+        self.assertEqual(stats['bytes_saved'], len(CachingHandler.body))
+        self.assertEqual(stats['bytes_downloaded'], len(CachingHandler.body))
+        self.assertEqual(len(CachingHandler.requests), 1)
+
+    def test_revalidate(self):
+        """Revalidation should make a conditional request"""
+        self.loader.load_raw(self.url)
+        data = self.loader.load_raw(self.url, REVALIDATE)
+
+        self.assertEqual(data, CachingHandler.body)
+        self.assertEqual(CachingHandler.requests, [None, '"v1"'])
+
+        stats = self.loader.cache_stats['series']
+        self.assertEqual((stats['downloads'], stats['hits'], stats['revalidations']), (1, 0, 1))
+        self.assertEqual(stats['bytes_saved'], len(CachingHandler.body))
+
+    def test_no_cache(self):
+        """Ignoring the cache should make an unconditional request"""
+        self.loader.load_raw(self.url)
+        self.loader.load_raw(self.url, cache=False)
+
+        self.assertEqual(CachingHandler.requests, [None, None])
+        self.assertEqual(self.loader.cache_stats['series']['downloads'], 2)
+
+    def test_shared_between_mirrors(self):
+        """The cached data should be shared by all mirrors and API keys"""
+        self.loader.load_raw(self.url)
+        for url in (self.url.replace('127.0.0.1', 'localhost'),
+                    self.url.replace('B43FF87DE395DF56', '0123456789ABCDEF')):
+            self.assertEqual(self.loader.load_raw(url), CachingHandler.body)
+
+        self.assertEqual(len(CachingHandler.requests), 1)
+
+    def test_url_keys(self):
+        """The URL should be used as the key if canonical keys are disabled"""
+        loader = Loader(self.tmp, canonical_keys=False)
+        loader.load_raw(self.url)
+        loader.load_raw(self.url.replace('B43FF87DE395DF56', '0123456789ABCDEF'))
+
+        self.assertEqual(len(CachingHandler.requests), 2)
+
+    def test_resource_types(self):
+        """The counters should be kept for each resource type"""
+        self.loader.load_raw(self.url.replace('/all/en.xml', '/actors.xml'))
+
+        self.assertEqual(list(self.loader.cache_stats.keys()), ['actors'])
+
+
+class StaleHandler(CachingHandler):
+    """Serves a body that is stale as soon as it is cached"""
+
+    def end_headers(self):
+        if self.headers.get('If-None-Match') is None:
+            self.send_header('Cache-Control', 'max-age=0')
+        BaseHTTPRequestHandler.end_headers(self)
+
+
+class TestServingModes(unittest.TestCase):
+    """Tests serving the cached data using the serving modes"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.loader = Loader(self.tmp)
+
+        StaleHandler.requests = list()
+        self.server = HTTPServer(('127.0.0.1', 0), StaleHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = 'http://127.0.0.1:{0}/api/B43FF87DE395DF56/series/79349/all/en.xml'.format(
+            self.server.server_port)
+
+    def tearDown(self):
+        self._stop()
+        shutil.rmtree(self.tmp)
+
+    def _stop(self):
+        """Stops the server"""
+        if self.thread.is_alive():
+            self.server.shutdown()
+            self.server.server_close()
+            self.thread.join()
+
+    def test_offline(self):
+        """Offline mode should only use the cached data"""
+        self.assertRaises(error.ConnectionError, self.loader.load_raw, self.url, OFFLINE)
+        self.assertEqual(self.loader.stats['failures'], 1)
+
+        self.loader.load_raw(self.url)
+        data = self.loader.load_content(self.url, OFFLINE)
+
+        self.assertEqual(data.data, StaleHandler.body)
+        self.assertTrue(data.stale)
+        self.assertTrue(data.age >= 0)
+        self.assertEqual(StaleHandler.requests, [None])
+
+    def test_stale_if_error(self):
+        """Stale data should be used if the server can not be reached"""
+        self.loader.load_raw(self.url)
+        self._stop()
+
+        data = self.loader.load_content(self.url, STALE_IF_ERROR)
+        self.assertEqual(data.data, StaleHandler.body)
+        self.assertTrue(data.stale)
+
+        self.assertRaises(error.ConnectionError, self.loader.load_raw, self.url)
+
+    def test_stale_if_error_not_cached(self):
+        """The error should be raised if there is no cached data"""
+        self._stop()
+        self.assertRaises(error.ConnectionError, self.loader.load_raw, self.url, STALE_IF_ERROR)
+
+    def test_stale_while_revalidate(self):
+        """Stale data should be returned and refreshed in the background"""
+        self.loader.load_raw(self.url)
+        data = self.loader.load_content(self.url, STALE_WHILE_REVALIDATE)
+        self.assertEqual(data.data, StaleHandler.body)
+        self.assertTrue(data.stale)
+
+        for _ in range(100):
+            if len(StaleHandler.requests) == 2 and not self.loader._refreshing:
+                break
+            time.sleep(0.05)
+        self.assertEqual(StaleHandler.requests, [None, '"v1"'])
+
+    def test_downloaded(self):
+        """Downloaded data should not be stale"""
+        data = self.loader.load_content(self.url, STALE_WHILE_REVALIDATE)
+
+        self.assertEqual(data, (StaleHandler.body, 0.0, False))
+        self.assertEqual(type(self.loader.load_raw(self.url, STALE_WHILE_REVALIDATE)), bytes)
+
+
+class EndedHandler(StaleHandler):
+    """Serves the data of an ended show, stale as soon as it is cached"""
+    body = b'<?xml version="1.0" encoding="UTF-8" ?><Data><Series><Status>Ended</Status></Series></Data>'
+
+
+class TestFreshness(unittest.TestCase):
+    """Tests overriding the cache headers using a freshness policy"""
+
+    def _start(self, handler, policy):
+        """Starts the server and creates a loader using the policy"""
+        self.tmp = tempfile.mkdtemp()
+        self.loader = Loader(self.tmp, freshness=policy)
+
+        handler.requests = list()
+        self.server = HTTPServer(('127.0.0.1', 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = 'http://127.0.0.1:{0}/api/B43FF87DE395DF56/series/79349/all/en.xml'.format(
+            self.server.server_port)
+
+    def tearDown(self):
+        if hasattr(self, 'server'):
+            self.server.shutdown()
+            self.server.server_close()
+            self.thread.join()
+            shutil.rmtree(self.tmp)
+
+    def test_fresh(self):
+        """Stale data should be used while fresh according to the policy"""
+        self._start(StaleHandler, FreshnessPolicy(series=3600))
+        self.loader.load_raw(self.url)
+        data = self.loader.load_content(self.url)
+
+        self.assertEqual(data.data, StaleHandler.body)
+        self.assertFalse(data.stale)
+        self.assertEqual(StaleHandler.requests, [None])
+        self.assertEqual(self.loader.cache_stats['series']['hits'], 1)
+
+    def test_stale(self):
+        """Fresh data should be revalidated when stale according to the policy"""
+        self._start(CachingHandler, FreshnessPolicy(default=0))
+        self.loader.load_raw(self.url)
+        self.loader.load_raw(self.url)
+
+        self.assertEqual(CachingHandler.requests, [None, '"v1"'])
+        self.assertEqual(self.loader.cache_stats['series']['revalidations'], 1)
+
+    def test_headers_followed(self):
+        """Resource types without freshness should follow the cache headers"""
+        self._start(CachingHandler, FreshnessPolicy(banners=0))
+        self.loader.load_raw(self.url)
+        self.loader.load_raw(self.url)
+
+        self.assertEqual(CachingHandler.requests, [None])
+
+    def test_status(self):
+        """The freshness of the status of the show should be used"""
+        self._start(EndedHandler, FreshnessPolicy(series=0, status={'Ended': 3600}))
+        self.loader.load_raw(self.url)
+        self.loader.load_raw(self.url)
+
+        self.assertEqual(EndedHandler.requests, [None])
+
+    def test_policy(self):
+        """The policy should validate and apply the freshness values"""
+        policy = FreshnessPolicy(default=60, status={'Ended': 3600}, actors=0)
+
+        self.assertEqual(policy.max_age('actors'), 0)
+        self.assertEqual(policy.max_age('actors', 'Ended'), 3600)
+        self.assertEqual(policy.max_age('episode', 'Ended'), 60)
+        self.assertEqual(FreshnessPolicy().max_age('series'), None)
+
+        self.assertRaises(error.TVDBValueError, FreshnessPolicy, foo=60)
+        self.assertRaises(error.TVDBValueError, FreshnessPolicy, series=-1)
+
+
+class CompressingHandler(BaseHTTPRequestHandler):
+    """Serves the series fixture compressed using the requested encoding"""
+    protocol_version = 'HTTP/1.0'
+    encodings = list()
+
+    def do_GET(self):
+        self.encodings.append(self.headers.get('Accept-Encoding'))
+        body = utils.FixtureLoader().load('/series/79349/all/en.xml')
+
+        encoding = self.path.rsplit('?', 1)[-1]
+        if encoding == 'gzip':
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        elif encoding == 'raw':
+            compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+        else:
+            compressor = zlib.compressobj()
+        body = compressor.compress(body) + compressor.flush()
+
+        self.send_response(200)
+        self.send_header('Content-Encoding', 'gzip' if encoding == 'gzip' else 'deflate')
+        self.send_header('Cache-Control', 'max-age=3600')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCompression(unittest.TestCase):
+    """Tests loading compressed data using a local server"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+        CompressingHandler.encodings = list()
+        self.server = HTTPServer(('127.0.0.1', 0), CompressingHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.url = 'http://127.0.0.1:{0}/api/B43FF87DE395DF56/series/79349/all/en.xml'.format(
+            self.server.server_port)
+        self.data = utils.FixtureLoader().load('/series/79349/all/en.xml')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        shutil.rmtree(self.tmp)
+
+    def test_encodings(self):
+        """The data should be decompressed using the content encoding"""
+        loader = Loader(self.tmp)
+        for encoding in ('gzip', 'deflate', 'raw'):
+            self.assertEqual(loader.load_raw(self.url + '?' + encoding), self.data)
+
+        self.assertEqual(CompressingHandler.encodings, ['gzip, deflate'] * 3)
+
+    def test_byte_counts(self):
+        """Both the compressed and decompressed sizes should be counted"""
+        loader = Loader(self.tmp)
+        loader.load_raw(self.url + '?gzip')
+
+        stats = loader.cache_stats['series']
+        self.assertEqual(stats['bytes_downloaded'], len(self.data))
+        self.assertTrue(0 < stats['bytes_received'] < len(self.data))
+
+    def test_cached(self):
+        """The cached data should be stored compressed and used"""
+        loader = Loader(self.tmp)
+        loader.load_raw(self.url + '?gzip')
+
+        self.assertEqual(Loader(self.tmp).load_raw(self.url + '?gzip'), self.data)
+        self.assertEqual(len(CompressingHandler.encodings), 1)
+
+        for name in os.listdir(self.tmp):
+            with open(os.path.join(self.tmp, name), 'rb') as handle:
+                self.assertTrue(len(zlib.decompress(handle.read())) > len(self.data))
+
+    def test_uncompressed_cache(self):
+        """It should be possible to store the cached data uncompressed"""
+        Loader(self.tmp, compress_cache=False).load_raw(self.url + '?gzip')
+
+        self.assertEqual(Loader(self.tmp).load_raw(self.url + '?gzip'), self.data)
+        self.assertEqual(len(CompressingHandler.encodings), 1)
+
+
+class TestResourceType(unittest.TestCase):
+    """Tests identifying the resource type of the URLs"""
+
+    def test_resource_type(self):
+        """The URLs used by the API should be identified"""
+        base = "http://thetvdb.com/api/B43FF87DE395DF56"
+        urls = {
+            base + "/mirrors.xml": Resource('mirrors', None, None),
+            "http://thetvdb.com/api/Updates.php?type=none": Resource('time', None, None),
+            "http://thetvdb.com/api/Updates.php?type=all&time=1": Resource('updates', None, None),
+            base + "/updates/updates_day.zip": Resource('updates', 'day', None),
+            "http://thetvdb.com/api/GetSeries.php?seriesname=a&language=sv": Resource('search', None, 'sv'),
+            base + "/series/79349/all/en.xml": Resource('series', '79349', 'en'),
+            base + "/series/79349/en.xml": Resource('series', '79349', 'en'),
+            base + "/series/79349/all/de.zip": Resource('zip', '79349', 'de'),
+            base + "/series/79349/actors.xml": Resource('actors', '79349', None),
+            base + "/series/79349/banners.xml": Resource('banners', '79349', None),
+            base + "/episodes/308834/en.xml": Resource('episode', '308834', 'en'),
+            "http://thetvdb.com/banners/graphical/79349-g.jpg": Resource('other', None, None)}
+
+        for url, resource in urls.items():
+            self.assertEqual(resource_type(url), resource)
+
+    def test_cache_key(self):
+        """The cache key should not depend on the mirror, scheme or API key"""
+        key = "tvdb:/api/-/series/79349/all/en.xml"
+        for url in ("http://thetvdb.com/api/B43FF87DE395DF56/series/79349/all/en.xml",
+                    "https://mirror.example.com:8080/api/0123456789ABCDEF/series/79349/all/en.xml"):
+            self.assertEqual(cache_key(url), key)
+            self.assertEqual(resource_type(cache_key(url)), resource_type(url))
+
+        self.assertEqual(cache_key("http://thetvdb.com/api/GetSeries.php?seriesname=a&language=sv"),
+                         "tvdb:/api/GetSeries.php?seriesname=a&language=sv")
+        self.assertEqual(cache_key("HTTP://TheTVDB.com:80/banners/79349-g.jpg"),
+                         "http://thetvdb.com/banners/79349-g.jpg")
+
+
 if __name__ == "__main__":
     sys.exit(unittest.main())
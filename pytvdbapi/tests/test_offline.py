@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 - 2013 Björn Larsson
+
+# This file is part of pytvdbapi.
+#
+# pytvdbapi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pytvdbapi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pytvdbapi.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+from pytvdbapi import error
+from pytvdbapi.api import TVDB
+from pytvdbapi.offline import RecordingLoader, ReplayLoader
+from pytvdbapi.tests import utils
+
+
+class TestOffline(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+        # Record a session using the fixture files
+        self.recorder = RecordingLoader(utils.FixtureLoader(), self.path)
+        api = TVDB("B43FF87DE395DF56", loader=self.recorder, actors=True, banners=True)
+        api.search("Dexter", "en")
+        api.get_series(79349, "en").update()
+        api.get_episode(308834, "en")
+        self.assertRaises(error.TVDBIdError, api.get_series, 1, "en")
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_layout(self):
+        """The responses should be stored in a hashed layout"""
+        files = []
+        for root, _, names in os.walk(self.path):
+            files += [os.path.join(os.path.relpath(root, self.path), n) for n in names]
+
+        self.assertEqual(len(files), 14)
+        for name in files:
+            directory, filename = os.path.split(name)
+            self.assertEqual(filename[:2], directory)
+            self.assertTrue(os.path.splitext(filename)[1] in ('.json', '.data'))
+
+    def test_replay(self):
+        """The recorded session should be possible to replay"""
+        api = TVDB("0123456789ABCDEF", loader=ReplayLoader(self.path), actors=True, banners=True)
+
+        self.assertEqual(api.search("Dexter", "en")[0].SeriesName, "Dexter")
+        self.assertEqual(api.get_episode(308834, "en").EpisodeName, "Crocodile")
+
+        show = api.get_series(79349, "en")
+        self.assertEqual(show[1][2].EpisodeName, "Crocodile")
+        self.assertEqual(len(show.actor_objects), 2)
+
+        self.assertRaises(error.TVDBIdError, api.get_series, 1, "en")
+
+    def test_other_mirror(self):
+        """The recorded data should be replayed regardless of the mirror"""
+        loader = ReplayLoader(self.path)
+        recorded = loader.load_raw("http://thetvdb.com/api/B43FF87DE395DF56/series/79349/all/en.xml")
+
+        self.assertEqual(loader.load_raw("http://mirror.example.com/api/0123456789ABCDEF/series/79349/all/en.xml"),
+                         recorded)
+
+    def test_not_recorded(self):
+        """Urls not recorded should raise ConnectionError"""
+        api = TVDB("B43FF87DE395DF56", loader=ReplayLoader(self.path))
+
+        self.assertRaises(error.ConnectionError, api.get_series, 79168, "en")
+
+    def test_inject_errors(self):
+        """It should be possible to inject errors"""
+        loader = ReplayLoader(self.path, error_rate=0.5, seed=1)
+
+        def _failures():
+            failures = []
+            for _ in range(20):
+                try:
+                    loader.load("http://www.thetvdb.com/api/B43FF87DE395DF56/mirrors.xml")
+                    failures.append(False)
+                except error.ConnectionError:
+                    failures.append(True)
+            return failures
+
+        failures = _failures()
+        self.assertTrue(any(failures))
+        self.assertFalse(all(failures))
+
+        loader = ReplayLoader(self.path, error_rate=0.5, seed=1)
+        self.assertEqual(_failures(), failures)
+
+        self.assertRaises(error.TVDBValueError, ReplayLoader, self.path, error_rate=2)
+
+    def test_latency(self):
+        """It should be possible to inject latency"""
+        loader = ReplayLoader(self.path, latency=lambda url: 0.05)
+
+        start = time.time()
+        loader.load("http://www.thetvdb.com/api/B43FF87DE395DF56/mirrors.xml")
+        self.assertTrue(time.time() - start >= 0.05)
+
+
+if __name__ == "__main__":
+    sys.exit(unittest.main())
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 - 2013 Björn Larsson
+
+# This file is part of pytvdbapi.
+#
+# pytvdbapi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pytvdbapi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pytvdbapi.  If not, see <http://www.gnu.org/licenses/>.
+from __future__ import absolute_import, print_function
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import zipfile
+
+from pytvdbapi import error
+from pytvdbapi.api import TVDB
+from pytvdbapi.store import Store
+from pytvdbapi.tests import utils
+
+UPDATES = b"""<?xml version="1.0" encoding="UTF-8" ?>
+<Data time="1372800000">
+<Series><id>79349</id><time>1372800000</time></Series>
+<Series><id>1</id><time>1372800000</time></Series>
+<Episode><id>2</id><Series>1</Series><time>1372800000</time></Episode>
+<Banner><Series>79349</Series><path>fanart/original/79349-1.jpg</path><time>1372800000</time></Banner>
+</Data>
+"""
+
+
+def archive(data, name='updates_day.xml'):
+    """Creates an updates archive"""
+    buf = io.BytesIO()
+    handle = zipfile.ZipFile(buf, 'w')
+    handle.writestr(name, data)
+    handle.close()
+    return buf.getvalue()
+
+
+class TestStore(unittest.TestCase):
+    """Tests the local store of the records"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.store = Store(os.path.join(self.tmp, 'store', 'pytvdbapi.db'))
+        self.loader = utils.FixtureLoader()
+        self.api = TVDB("B43FF87DE395DF56", loader=self.loader, store=self.store)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmp)
+
+    def _series_urls(self):
+        return [url for url in self.loader.urls if '/series/' in url or '/episodes/' in url]
+
+    def test_from_store(self):
+        """Shows and episodes in the store should not be loaded from the server"""
+        show = self.api.get_series(79349, "en")
+        self.assertEqual(len(self._series_urls()), 1)
+        self.assertEqual(len(self.store.episodes(79349, "en")), 3)
+
+        stored = self.api.get_series(79349, "en")
+        self.assertEqual(stored.SeriesName, show.SeriesName)
+        self.assertEqual(stored[1][2].EpisodeName, "Crocodile")
+        self.assertEqual(self.api.get_episode(308834, "en").EpisodeName, "Crocodile")
+        self.assertEqual(len(self._series_urls()), 1)
+
+        self.api.get_series(79349, "en", cache=False)
+        self.assertEqual(len(self._series_urls()), 2)
+
+    def test_ingest(self):
+        """Changed records should be removed from the store"""
+        self.api.get_series(79349, "en")
+
+        counts = self.store.ingest(archive(UPDATES))
+        self.assertEqual(counts, dict(series=2, episodes=1, banners=1))
+        self.assertEqual(self.store.series(79349, "en"), None)
+        self.assertEqual(self.store.time, 1372800000)
+
+        self.api.get_series(79349, "en")
+        self.assertEqual(len(self._series_urls()), 2)
+
+    def test_ingest_older(self):
+        """Records changed before the stored record should be kept"""
+        self.api.get_series(79349, "en")
+        self.store.ingest(UPDATES.replace(b"1372800000", b"1372700000"))
+
+        self.assertEqual(self.store.series(79349, "en")['SeriesName'], "Dexter")
+        self.assertEqual(self.store.time, 1372700000)
+
+    def test_ingest_episode(self):
+        """A changed episode should remove its series from the store"""
+        self.api.get_series(79349, "en")
+        self.store.ingest(b'<Data><Episode><id>308858</id><Series>79349</Series>'
+                          b'<time>1372800000</time></Episode></Data>')
+
+        self.assertEqual(self.store.series(79349, "en"), None)
+        self.assertEqual(self.store.episode(308858, "en"), None)
+        self.assertEqual(self.store.episode(308834, "en")['EpisodeName'], "Crocodile")
+
+    def test_ingest_full(self):
+        """Records included in full should be updated in the store"""
+        self.api.get_series(79349, "en")
+        self.store.ingest(b'<Data><Episode><id>308834</id><seriesid>79349</seriesid><Language>en</Language>'
+                          b'<EpisodeName>Alligator</EpisodeName><SeasonNumber>1</SeasonNumber>'
+                          b'<lastupdated>1372800000</lastupdated></Episode></Data>')
+
+        self.assertEqual(self.api.get_episode(308834, "en").EpisodeName, "Alligator")
+        self.assertEqual(self.store.series(79349, "en")['SeriesName'], "Dexter")
+
+    def test_ingest_out_of_order(self):
+        """Full records older than the stored records should not replace them"""
+        self.api.get_series(79349, "en")
+        day = (b'<Data time="1372800000"><Series><id>79349</id><Language>en</Language>'
+               b'<SeriesName>Dexter: New Blood</SeriesName><lastupdated>1372800000</lastupdated></Series>'
+               b'<Episode><id>308834</id><seriesid>79349</seriesid><Language>en</Language>'
+               b'<EpisodeName>Alligator</EpisodeName><lastupdated>1372800000</lastupdated></Episode>'
+               b'<Episode><id>1</id><seriesid>79349</seriesid><Language>en</Language>'
+               b'<EpisodeName>New</EpisodeName><lastupdated>1372800000</lastupdated></Episode></Data>')
+        month = day.replace(b'1372800000', b'1370000000').replace(b'Dexter: New Blood', b'Old') \
+            .replace(b'Alligator', b'Old').replace(b'>New<', b'>Old<')
+
+        self.store.ingest(archive(day))
+        self.assertEqual(self.store.ingest(archive(month, 'updates_month.xml')),
+                         dict(series=1, episodes=2, banners=0))
+
+        self.assertEqual(self.store.series(79349, "en")['SeriesName'], "Dexter: New Blood")
+        self.assertEqual(self.store.episode(308834, "en")['EpisodeName'], "Alligator")
+        self.assertEqual(self.store.episode(1, "en")['EpisodeName'], "New")
+        self.assertEqual(self.store.time, 1372800000)
+
+    def test_invalid_id(self):
+        """Invalid ids should raise the same errors as without a store"""
+        self.assertEqual(self.store.series("abc", "en"), None)
+        self.assertEqual(self.store.episodes("abc", "en"), [])
+        self.assertEqual(self.store.episode("abc", "en"), None)
+
+        self.assertRaises(error.TVDBIdError, self.api.get_series, "abc", "en")
+        self.assertRaises(error.TVDBIdError, self.api.get_episode, "abc", "en")
+
+    def test_ingest_updates(self):
+        """The updates archive should be loaded from the mirror"""
+        urls = []
+
+        def _load(url, cache=True):
+            urls.append(url)
+            return archive(UPDATES)
+
+        self.loader.load = _load
+        self.assertEqual(self.api.ingest_updates('week')['series'], 2)
+        self.assertTrue(urls[0].endswith('/updates/updates_week.zip'))
+        self.assertRaises(error.TVDBValueError, self.api.ingest_updates, 'year')
+        api = TVDB("B43FF87DE395DF56", loader=utils.FixtureLoader())
+        self.assertRaises(error.TVDBValueError, api.ingest_updates)
+
+    def test_invalidate(self):
+        """Invalidating an episode should remove its series"""
+        self.api.get_series(79349, "en")
+
+        self.assertEqual(self.store.invalidate(episode_ids=[308834]), 2)
+        self.assertEqual(self.store.series(79349, "en"), None)
+        self.assertEqual(self.store.invalidate([79349]), 0)
+
+    def test_bad_archive(self):
+        """A broken archive should raise BadData"""
+        self.assertRaises(error.BadData, self.store.ingest, b"PK broken")
+
+
+if __name__ == "__main__":
+    sys.exit(unittest.main())
@@ -18,7 +18,7 @@
 # along with pytvdbapi.  If not, see <http://www.gnu.org/licenses/>.
 
 from __future__ import absolute_import, print_function
-from pytvdbapi.utils import InsensitiveDictionary
+from pytvdbapi.utils import InsensitiveDictionary, LazyDictionary, LRUCache
 import unittest
 
 
@@ -90,3 +90,87 @@ class TestInsensitiveDictionary(unittest.TestCase):
         self.assertEqual('hello' in d, True)
         self.assertEqual('HeLlO' in d, True)
         self.assertEqual('foo' in d, False)
+
+
+class TestLazyDictionary(unittest.TestCase):
+    """Test the lazy dictionary"""
+
+    class Record(dict):
+        """A record counting the converted values"""
+        def __init__(self, *args, **kwargs):
+            super(TestLazyDictionary.Record, self).__init__(*args, **kwargs)
+            self.calls = list()
+
+        def convert(self, key):
+            self.calls.append(key)
+            return int(self[key])
+
+    def test_convert_once(self):
+        """The raw values should be converted once, when first accessed"""
+        record = self.Record(Number='1', Other='2')
+        d = LazyDictionary(ignore_case=True)
+        d.update_raw(record)
+
+        self.assertEqual('number' in d, True)
+        self.assertEqual(record.calls, [])
+        self.assertEqual((d['NUMBER'], d['number']), (1, 1))
+        self.assertEqual(record.calls, ['Number'])
+
+        d['other'] = 'two'
+        self.assertEqual(sorted(d.items()), [('number', 1), ('other', 'two')])
+        self.assertEqual(record.calls, ['Number'])
+
+    def test_items(self):
+        """All raw values should be converted when listing the values"""
+        d = LazyDictionary([('Text', 'text')])
+        d.update_raw(self.Record(Number='1'))
+
+        self.assertEqual(sorted(d.items()), [('Number', 1), ('Text', 'text')])
+        self.assertEqual(d, InsensitiveDictionary(Number=1, Text='text'))
+
+
+class TestLRUCache(unittest.TestCase):
+    """Test the bounded cache"""
+    def setUp(self):
+        self.now = 1000.0
+        self.cache = LRUCache(max_entries=2, ttl=10)
+        self.cache._clock = lambda: self.now
+
+    def test_lru(self):
+        """The least recently used entry should be removed when full"""
+        self.cache['a'], self.cache['b'] = 1, 2
+        self.assertEqual(self.cache.get('a'), 1)
+
+        self.cache['c'] = 3
+        self.assertEqual(len(self.cache), 2)
+        self.assertFalse('b' in self.cache)
+        self.assertEqual(self.cache.get('c'), 3)
+
+    def test_batch_eviction(self):
+        """A tenth of the entries should be removed at once when full"""
+        cache = LRUCache(max_entries=100)
+        for i in range(101):
+            cache[i] = i
+        cache.get(0)
+
+        self.assertEqual(len(cache), 90)
+        self.assertEqual((0 in cache, 1 in cache, 11 in cache, 100 in cache), (False, False, True, True))
+
+        for i in range(101, 111):
+            cache[i] = i
+        self.assertEqual(len(cache), 100)
+
+    def test_ttl(self):
+        """Entries older than the ttl should not be returned"""
+        self.cache['a'] = 1
+        self.now += 10
+        self.assertEqual(self.cache.get('a', 'missing'), 'missing')
+        self.assertFalse('a' in self.cache)
+
+    def test_stats(self):
+        """The hits and misses should be counted"""
+        self.cache['a'] = 1
+        self.cache.get('a')
+        self.cache.get('b')
+        self.assertEqual(self.cache.stats, dict(hits=1, misses=1))
+
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2011 - 2013 Björn Larsson
+
+# This file is part of pytvdbapi.
+#
+# pytvdbapi is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pytvdbapi is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pytvdbapi.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import, print_function
+import datetime
+import os
+import random
+import re
+import unittest
+
+from pytvdbapi import error, xmlhelpers
+from pytvdbapi.xmlhelpers import RawRecord, _convert, generate_tree, iterparse_xml, parse_xml
+from pytvdbapi.tests.utils import DATA_PATH
+
+
+def _reference(value):
+    """The conversion by trial used before, kept to compare with"""
+    value = value.strip() if value else ""
+
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        if '|' in value:
+            return [s.strip() for s in value.strip("|").split("|")]
+        elif re.match(r"^\d+\.\d+$", value):
+            return float(value)
+        elif re.match(r"^\d+$", value):
+            return int(value)
+        return value
+
+
+class TestConvert(unittest.TestCase):
+    """Tests the conversion of the element values"""
+
+    def _check(self, value):
+        expected, result = _reference(value), _convert(value)
+        self.assertEqual((type(result), result), (type(expected), expected), repr(value))
+
+    def test_values(self):
+        """The values should be converted to the expected types"""
+        values = [None, "", "  ", "Dexter", " 42 ", "0", "007", "8.5", "8.", ".5", "1.2.3", "-1",
+                  "2006-10-01", "2006-1-1", "2006-01- 5", "2006-13-01", "2006-02-30", "0000-01-01",
+                  "206-01-01", "2006-01-01x", "2006-01-01 ", "|Drama|Crime|", "|Drama|", "Drama|",
+                  "| |", "|", "1|2", "2006-01-01|", "12 monkeys", "1e5", "+1", "1 000"]
+        for value in values:
+            self._check(value)
+
+    def test_random(self):
+        """Random values should be converted the same as by the reference"""
+        generator = random.Random(0)
+        for _ in range(20000):
+            self._check(''.join(generator.choice("0123456789-|. a") for _ in range(generator.randint(0, 11))))
+
+        for _ in range(20000):
+            self._check('-'.join(''.join(generator.choice("0123 ") for _ in range(generator.randint(1, n)))
+                                 for n in (5, 3, 3)))
+
+
+class TestSchema(unittest.TestCase):
+    """Tests the conversion of the known tags using the schemas"""
+
+    data = ('<Data><Episode><id>1</id><GuestStars>Mark Pellegrino</GuestStars><Writer></Writer>'
+            '<ProductionCode>102</ProductionCode><Rating>8</Rating><FirstAired>2006-10-01</FirstAired>'
+            '<EpisodeName>1|2</EpisodeName><Unknown>42</Unknown></Episode>'
+            '<Banner><SeriesName>false</SeriesName><Colors>|1,2,3|</Colors><Season></Season></Banner></Data>')
+
+    def test_episode(self):
+        """The known tags of an episode should be converted to their type"""
+        episode = parse_xml(generate_tree(self.data), 'Episode')[0]
+
+        self.assertEqual(episode, {'id': 1, 'GuestStars': ['Mark Pellegrino'], 'Writer': [],
+                                   'ProductionCode': '102', 'Rating': 8.0,
+                                   'FirstAired': datetime.date(2006, 10, 1),
+                                   'EpisodeName': '1|2', 'Unknown': 42})
+        self.assertEqual(type(episode['Rating']), float)
+
+    def test_series(self):
+        """A single alias name should be converted to a list"""
+        data = '<Data><Series><AliasNames>Dexter: New Blood</AliasNames><Genre>Drama</Genre></Series></Data>'
+        series = parse_xml(generate_tree(data), 'Series')[0]
+        self.assertEqual(series, {'AliasNames': ['Dexter: New Blood'], 'Genre': ['Drama']})
+
+    def test_banner(self):
+        """The known tags of a banner should be converted to their type"""
+        banner = parse_xml(generate_tree(self.data), 'Banner')[0]
+        self.assertEqual(banner, {'SeriesName': False, 'Colors': ['1,2,3'], 'Season': ''})
+
+    def test_no_schema(self):
+        """An empty schema should convert all tags by guessing their type"""
+        episode = parse_xml(generate_tree(self.data), 'Episode', schema={})[0]
+        self.assertEqual((episode['GuestStars'], episode['ProductionCode']), ('Mark Pellegrino', 102))
+
+    def test_iterparse(self):
+        """The schemas should be used when parsing while reading"""
+        self.assertEqual(list(iterparse_xml(self.data, ['Episode'])),
+                         [('Episode', parse_xml(generate_tree(self.data), 'Episode')[0])])
+
+    def test_lazy(self):
+        """The raw records should convert the values the same way"""
+        tree = generate_tree(self.data)
+
+        for element in ('Episode', 'Banner'):
+            record = parse_xml(tree, element, lazy=True)[0]
+            self.assertEqual(type(record), RawRecord)
+            self.assertEqual(record.converted(), parse_xml(tree, element)[0])
+
+        record = list(iterparse_xml(self.data, ['Episode'], lazy=True))[0][1]
+        self.assertEqual((record['GuestStars'], record.convert('GuestStars')),
+                         ('Mark Pellegrino', ['Mark Pellegrino']))
+
+
+class TestBackends(unittest.TestCase):
+    """Tests that all backends give the same result"""
+
+    elements = ('Series', 'Episode', 'Actor', 'Banner', 'Mirror')
+
+    def tearDown(self):
+        xmlhelpers.set_backend('etree')
+
+    def _parse(self, data, lazy):
+        """Returns the parsed data using the tree and while read"""
+        tree = generate_tree(data)
+        records = iterparse_xml(data, self.elements, lazy)
+        return ([(element, parse_xml(tree, element, lazy=lazy)) for element in self.elements],
+                [(element, record, type(record)) for element, record in records])
+
+    def test_same_result(self):
+        """The result of all backends should be the same as of etree"""
+        data = [open(os.path.join(DATA_PATH, name), 'rb').read() for name in sorted(os.listdir(DATA_PATH))]
+        data.append(b'<Data><!-- comment --><Episode><id>1<b/>2</id><Empty/><Text>a<b/>b</Text></Episode>'
+                    b'<Episode/><Episode><id> 3 </id><x:a xmlns:x="urn:x">4</x:a></Episode></Data>')
+
+        expected = [self._parse(item, lazy) for item in data for lazy in (False, True)]
+        for backend in xmlhelpers.BACKENDS:
+            xmlhelpers.set_backend(backend)
+            self.assertEqual(xmlhelpers.get_backend(), backend)
+            result = [self._parse(item, lazy) for item in data for lazy in (False, True)]
+            self.assertEqual(result, expected, backend)
+
+    def test_bad_data(self):
+        """All backends should raise BadData for bad data"""
+        for backend in xmlhelpers.BACKENDS:
+            xmlhelpers.set_backend(backend)
+            for data in (b'', b'<Data><Episode><id>1</id></Episode>', '<Data><Episode></Data>'):
+                self.assertRaises(error.BadData, generate_tree, data)
+                self.assertRaises(error.BadData, list, iterparse_xml(data, ['Episode']))
+
+    def test_invalid_backend(self):
+        """Selecting an unknown backend should raise TVDBValueError"""
+        self.assertRaises(error.TVDBValueError, xmlhelpers.set_backend, 'foo')
+        self.assertEqual(xmlhelpers.get_backend(), 'etree')
@@ -17,7 +17,7 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with pytvdbapi.  If not, see <http://www.gnu.org/licenses/>.
 
-__all__ = ['file_loader']
+__all__ = ['file_loader', 'FixtureLoader']
 
 # pylint: disable W0622
 try:
@@ -26,6 +26,39 @@ except ImportError:
     pass
 # pylint: enable W0622
 
+import io
+import os
+import re
+import zipfile
+
+from pytvdbapi import error
+
+DATA_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "data"))
+
+# Maps the thetvdb.com URLs to the files in the data folder
+FIXTURES = [(re.compile(r'/mirrors\.xml$'), 'mirrors.xml'),
+            (re.compile(r'/GetSeries\.php\?'), 'search.xml'),
+            (re.compile(r'/series/79349/all/en\.xml$'), 'series.xml'),
+            (re.compile(r'/series/79349/actors\.xml$'), 'actors.xml'),
+            (re.compile(r'/series/79349/banners\.xml$'), 'banners.xml'),
+            (re.compile(r'/episodes/308834/en\.xml$'), 'episode.xml'),
+            (re.compile(r'/Updates\.php\?'), 'updates.xml')]
+
+# The files included in the full series zip archive
+ZIP_FIXTURES = [('en.xml', 'series.xml'), ('actors.xml', 'actors.xml'),
+                ('banners.xml', 'banners.xml')]
+
+
+def zip_fixture(files=ZIP_FIXTURES):
+    """Creates the zip archive of the files in the data folder"""
+    data = io.BytesIO()
+    archive = zipfile.ZipFile(data, 'w', zipfile.ZIP_DEFLATED)
+    for name, fixture in files:
+        archive.write(os.path.join(DATA_PATH, fixture), name)
+    archive.close()
+
+    return data.getvalue()
+
 
 def file_loader(file):
     try:
@@ -38,3 +71,23 @@ def file_loader(file):
         handle.close()
 
     return data
+
+
+class FixtureLoader(object):
+    """
+    A loader serving the files in the data folder instead of loading them
+    from thetvdb.com. Any other URL will raise TVDBNotFoundError.
+    """
+    def __init__(self):
+        self.urls = list()
+
+    def load(self, url, cache=True):
+        self.urls.append(url)
+        if re.search(r'/series/79349/all/en\.zip$', url):
+            return zip_fixture()
+
+        for regexp, name in FIXTURES:
+            if regexp.search(url):
+                with open(os.path.join(DATA_PATH, name), 'rb') as handle:
+                    return handle.read()
+        raise error.TVDBNotFoundError("Data not found")
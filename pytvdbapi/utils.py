@@ -23,9 +23,11 @@
 A module for utility functionality.
 """
 
+import threading
+import time
 from collections import MutableMapping
 
-__all__ = ['merge', 'TransformedDictionary', 'InsensitiveDictionary']
+__all__ = ['merge', 'TransformedDictionary', 'InsensitiveDictionary', 'LazyDictionary', 'LRUCache']
 
 
 def merge(dict1, dict2, decision=lambda x, y: y):
@@ -108,3 +110,159 @@ class InsensitiveDictionary(TransformedDictionary):
                 return key
         else:
             return key
+
+
+class LazyDictionary(InsensitiveDictionary):
+    """
+    A dictionary supporting the use of case insensitive keys, where the
+    values of the records added using :func:`update_raw` are only converted
+    when first accessed. A record is a dictionary with a *convert* method
+    returning the converted value of a key, see
+    :class:`pytvdbapi.xmlhelpers.RawRecord`.
+    """
+    def __init__(self, *args, **kwargs):
+        self._raw = dict()
+        super(LazyDictionary, self).__init__(*args, **kwargs)
+
+    def __getitem__(self, item):
+        key = self.__transform__(item)
+        value = self._data[key]
+
+        raw = self._raw.pop(key, None)
+        if raw is not None:
+            value = self._data[key] = raw[0].convert(raw[1])
+        return value
+
+    def __setitem__(self, key, value):
+        key = self.__transform__(key)
+        self._raw.pop(key, None)
+        self._data[key] = value
+
+    def __delitem__(self, key):
+        key = self.__transform__(key)
+        self._raw.pop(key, None)
+        del self._data[key]
+
+    def __contains__(self, item):
+        return self.__transform__(item) in self._data
+
+    def update_raw(self, record):
+        """Adds the values of the record, to be converted when first accessed"""
+        for key in record:
+            transformed = self.__transform__(key)
+            self._data[transformed] = record[key]
+            self._raw[transformed] = (record, key)
+
+    def clear(self):
+        """"""
+        self._raw.clear()
+        self._data.clear()
+
+    def items(self):
+        """"""
+        return [(key, self[key]) for key in list(self._data)]
+
+    def values(self):
+        """"""
+        return [self[key] for key in list(self._data)]
+
+
+class LRUCache(object):
+    """
+    :param max_entries: The maximum number of entries to keep
+    :param ttl: Optional. The number of seconds to keep each entry
+
+    A thread safe dictionary like container keeping at most *max_entries*
+    entries, removing the least recently used entries when full. Entries older
+    than *ttl* seconds are not returned. The number of *hits* and *misses*
+    of :func:`get` are available through :attr:`stats`.
+    """
+
+    # The function used to keep track of time, replaceable for testing
+    _clock = staticmethod(time.time)
+
+    def __init__(self, max_entries=128, ttl=None):
+        self.max_entries, self.ttl = max_entries, ttl
+
+        self._entries = dict()
+        self._tick = 0
+        self._lock = threading.Lock()
+        self._stats = dict(hits=0, misses=0)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self):
+        """A dictionary with the number of *hits* and *misses*"""
+        with self._lock:
+            return dict(self._stats)
+
+    def _expired(self, entry, now):
+        """Checks if the entry is older than the ttl"""
+        return self.ttl is not None and entry[1] + self.ttl <= now
+
+    def get(self, key, default=None):
+        """
+        :param key: The key of the entry
+        :param default: The value to return if not found
+        :return: The value of the entry, or *default* if not found or expired
+        """
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self._stats['misses'] += 1
+                return default
+
+            self._stats['hits'] += 1
+            self._tick += 1
+            entry[0] = self._tick
+            return entry[2]
+
+    def __setitem__(self, key, value):
+        now = self._clock()
+        with self._lock:
+            self._tick += 1
+            self._entries[key] = [self._tick, now, value]
+
+            if len(self._entries) > self.max_entries:
+                # Drop the expired entries, and the least recently used so that
+                # a tenth of the entries are free, to only do this once in a while
+                for name in [name for name, entry in self._entries.items() if self._expired(entry, now)]:
+                    del self._entries[name]
+
+                excess = len(self._entries) - self.max_entries + self.max_entries // 10
+                if excess > 0:
+                    for name in sorted(self._entries, key=lambda name: self._entries[name][0])[:excess]:
+                        del self._entries[name]
+
+    def __contains__(self, key):
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._expired(entry, now)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def discard(self, key):
+        """Removes the entry, if it exists"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Removes all entries"""
+        with self._lock:
+            self._entries = dict()
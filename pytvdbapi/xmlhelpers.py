@@ -19,12 +19,28 @@
 
 """
 A helper module for parsing XML data.
+
+The XML data is parsed by one of the following backends, selected using
+:func:`set_backend`:
+
+* *etree* Uses :mod:`xml.etree.ElementTree`, the default.
+* *lxml* Uses `lxml <http://lxml.de>`_, available when it is installed.
+* *expat* Uses :mod:`xml.parsers.expat` to build the records of
+  :func:`iterparse_xml` directly, without creating the elements. The
+  element tree is built using :mod:`xml.etree.ElementTree`.
+
+All backends give the same result. lxml parses the data faster, but
+reading the parsed elements from Python is slower, so that parsing the full
+series data takes longer overall. Use benchmarks/parse_backends.py to
+compare the backends on a given system.
 """
 
 import datetime
+import io
 import logging
 import re
 import xml.etree.ElementTree as ET
+from xml.parsers import expat
 
 try:
     from xml.etree.ElementTree import ParseError  # pylint: disable=E0611
@@ -32,35 +48,237 @@ except ImportError:
     # For Python 2.6
     from xml.parsers.expat import ExpatError as ParseError
 
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None  # pylint: disable=C0103
+
 from pytvdbapi import error
 
-__all__ = ['generate_tree', 'parse_xml']
+__all__ = ['generate_tree', 'parse_xml', 'iterparse_xml', 'RawRecord', 'SCHEMAS',
+           'BACKENDS', 'get_backend', 'set_backend']
 
 #Module level logger object
 logger = logging.getLogger(__name__)
 
+# The date format %Y-%m-%d, as matched by strptime
+_DATE = re.compile(r"(\d\d\d\d)-(1[0-2]|0[1-9]|[1-9])-(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])$")
 
-def generate_tree(xml_data):
+# Integers and floats
+_NUMBER = re.compile(r"\d+(\.\d+)?$")
+
+# The size of the chunks of data passed to the expat parser
+_CHUNK_SIZE = 64 * 1024
+
+try:
+    _TEXT = unicode  # pylint: disable=E0602, C0103
+except NameError:
+    _TEXT = str  # pylint: disable=C0103
+
+
+class _ElementTreeBackend(object):
+    """Parses the data using xml.etree.ElementTree"""
+    name = 'etree'
+
+    # The exceptions raised for bad data
+    errors = (ParseError,)
+
+    def tree(self, xml_data):
+        """Returns the root element of the data"""
+        try:
+            return ET.fromstring(xml_data)
+        except self.errors:
+            raise error.BadData("Bad XML data received")
+
+    def _iterparse(self, xml_data):
+        """Returns an iterator of the (event, element) tuples of the data"""
+        return ET.iterparse(io.BytesIO(xml_data), events=('start', 'end'))
+
+    def records(self, xml_data, elements, lazy):
+        """
+        Yields the (element name, record) tuples of the *elements* directly
+        below the root, see :func:`iterparse_xml`
+        """
+        record = _raw_record if lazy else _record
+        root, depth = None, 0
+        try:
+            for event, item in self._iterparse(xml_data):
+                if event == 'start':
+                    if root is None:
+                        root = item
+                    depth += 1
+                    continue
+
+                depth -= 1
+                if depth == 1:
+                    if item.tag in elements:
+                        yield item.tag, record(item, SCHEMAS.get(item.tag, _EMPTY))
+                    root.clear()
+        except self.errors:
+            raise error.BadData("Bad XML data received")
+
+
+class _LxmlBackend(_ElementTreeBackend):
+    """Parses the data using lxml"""
+    name = 'lxml'
+
+    # Comments and processing instructions are removed, as done by ElementTree
+    options = dict(remove_comments=True, remove_pis=True, resolve_entities=False, no_network=True)
+
+    def __init__(self):
+        if lxml_etree is not None:
+            self.errors = (lxml_etree.XMLSyntaxError,)
+
+    def tree(self, xml_data):
+        # The parsers of lxml can not be shared between threads
+        try:
+            return lxml_etree.fromstring(xml_data, lxml_etree.XMLParser(**self.options))
+        except self.errors:
+            raise error.BadData("Bad XML data received")
+
+    def _iterparse(self, xml_data):
+        return lxml_etree.iterparse(io.BytesIO(xml_data), events=('start', 'end'), **self.options)
+
+
+class _RecordHandler(object):
     """
-    Converts the xml data into an element tree
+    The expat handler building the records of the elements directly below
+    the root. The text of a tag is its text before any sub element, as the
+    text of an element of ElementTree.
     """
+    def __init__(self, elements, lazy):
+        self.elements, self.lazy = elements, lazy
+        self.records = list()
+        self.depth = 0
+        self.element = self.schema = self.data = None
+        self.tag = self.text = self.parts = None
+
+    def start(self, tag, attributes):  # pylint: disable=W0613
+        """Handles the start of an element"""
+        if '}' in tag:  # Format the namespace as ElementTree does
+            tag = '{' + tag
+
+        self.depth += 1
+        if self.depth == 2 and tag in self.elements:
+            self.element, self.schema = tag, SCHEMAS.get(tag, _EMPTY)
+            self.data = RawRecord(self.schema) if self.lazy else dict()
+        elif self.depth == 3 and self.data is not None:
+            self.tag, self.text, self.parts = tag, None, list()
+        elif self.depth == 4 and self.parts is not None:
+            self.text, self.parts = ''.join(self.parts) or None, None
+
+    def end(self, tag):  # pylint: disable=W0613
+        """Handles the end of an element"""
+        if self.depth == 3 and self.tag is not None:
+            text = self.text if self.parts is None else ''.join(self.parts) or None
+            self.data[self.tag] = text if self.lazy else self.schema.get(self.tag, _convert)(text)
+            self.tag = self.parts = None
+        elif self.depth == 2 and self.data is not None:
+            self.records.append((self.element, self.data))
+            self.data = None
+        self.depth -= 1
+
+    def character_data(self, text):
+        """Handles the text of an element"""
+        if self.parts is not None and self.depth == 3:
+            self.parts.append(text)
+
+    def take(self):
+        """Returns and forgets the finished records"""
+        records, self.records = self.records, list()
+        return records
+
+
+class _ExpatBackend(_ElementTreeBackend):
+    """Builds the records using expat, without creating the elements"""
+    name = 'expat'
+
+    def records(self, xml_data, elements, lazy):
+        handler = _RecordHandler(elements, lazy)
+
+        parser = expat.ParserCreate(None, '}')
+        parser.buffer_text = True
+        parser.StartElementHandler = handler.start
+        parser.EndElementHandler = handler.end
+        parser.CharacterDataHandler = handler.character_data
+
+        try:
+            for start in range(0, len(xml_data), _CHUNK_SIZE):
+                parser.Parse(xml_data[start:start + _CHUNK_SIZE], False)
+                for record in handler.take():
+                    yield record
+            parser.Parse(b'', True)
+        except expat.ExpatError:
+            raise error.BadData("Bad XML data received")
+
+        for record in handler.take():
+            yield record
+
+
+#: The available backends by name
+BACKENDS = dict((backend.name, backend)
+                for backend in (_ElementTreeBackend(), _LxmlBackend(), _ExpatBackend())
+                if backend.name != 'lxml' or lxml_etree is not None)
+
+_backend = BACKENDS['etree']  # pylint: disable=C0103
+
+
+def get_backend():
+    """
+    .. versionadded:: 0.5
+
+    :return: The name of the backend used to parse the data
+    """
+    return _backend.name
+
+
+def set_backend(name):
+    """
+    .. versionadded:: 0.5
+
+    :param name: The name of the backend, one of *etree*, *lxml* or *expat*
+    :raise: :class:`pytvdbapi.error.TVDBValueError` if the backend is not
+        available
+
+    Selects the backend used to parse the data.
+    """
+    global _backend  # pylint: disable=W0603, C0103
+
     try:
-        return ET.fromstring(xml_data.encode('utf-8'))
-    except ParseError:
-        raise error.BadData("Bad XML data received")
+        _backend = BACKENDS[name]
+    except KeyError:
+        raise error.TVDBValueError("The XML backend {0} is not available".format(name))
 
 
-def parse_xml(etree, element):
+def generate_tree(xml_data):
+    """
+    Converts the xml data into an element tree. The data should preferably
+    be provided as bytes, as it is then parsed without being copied. Strings
+    are encoded before being parsed.
+    """
+    if isinstance(xml_data, _TEXT):
+        xml_data = xml_data.encode('utf-8')
+
+    return _backend.tree(xml_data)
+
+
+def parse_xml(etree, element, schema=None, lazy=False):
     """
     :param etree:
     :param element:
+    :param schema: Optional. A dictionary of tag:converter used to convert
+        the data, defaults to the schema of *element* in :data:`SCHEMAS`.
+    :param lazy: Optional. If True, the data is not converted and a
+        :class:`RawRecord` is returned for each element.
     :return: A list of dictionaries containing the data of the format tag:value
 
     Parses the element tree for elements of type *element* and converts the
     data into a dictionary.
 
-    It will attempt some attempts to convert the data into native Python
-    types. The following conversions will be applied.
+    The data of the tags found in the schema is converted using the
+    converter of the tag. For other tags it will attempt some attempts to
+    convert the data into native Python types. The following conversions
+    will be applied.
 
       * yyyy-mm-dd will be converted into a datetime.date object.
       * Integers will be converted to int
@@ -72,30 +290,193 @@ def parse_xml(etree, element):
 
     logger.debug("Parsing element tree for {0}".format(element))
 
-    _list = list()
-    for item in etree.findall(element):
-        data = dict()
-        for child in list(item):
-            tag, value = child.tag, child.text
+    if schema is None:
+        schema = SCHEMAS.get(element, _EMPTY)
 
-            if value:
-                value = value.strip()
-            else:
-                value = ""
-
-            try:  # Try to format as a datetime object
-                value = datetime.datetime.strptime(value, "%Y-%m-%d").date()
-            except ValueError:
-                if '|' in value:  # Split piped values into a list
-                    value = value.strip("|").split("|")
-                    value = [s.strip() for s in value]
-                else:
-                    if re.match(r"^\d+\.\d+$", value):  # Convert float
-                        value = float(value)
-                    elif re.match(r"^\d+$", value):  # Convert integer
-                        value = int(value)
-
-            data[tag] = value
-        _list.append(data)
+    record = _raw_record if lazy else _record
+    _list = [record(item, schema) for item in etree.findall(element)]
     logger.debug("Found {0} element".format(len(_list)))
     return _list
+
+
+def iterparse_xml(xml_data, elements, lazy=False):
+    """
+    .. versionadded:: 0.5
+
+    :param xml_data: The XML data, preferably as bytes
+    :param elements: The names of the elements to parse
+    :param lazy: Optional. If True, the data is not converted and a
+        :class:`RawRecord` is returned for each element.
+    :return: An iterator of (element name, dictionary) tuples
+    :raise: :class:`pytvdbapi.error.BadData`
+
+    Parses the elements of the given names, directly below the root of the
+    document, while the document is read. The data of each element is
+    converted in the same way as by :func:`parse_xml`, and the element is
+    removed from the document once converted. Unlike building the element
+    tree using :func:`generate_tree`, only the element being parsed is kept
+    in memory.
+    """
+    if isinstance(xml_data, _TEXT):
+        xml_data = xml_data.encode('utf-8')
+
+    return _backend.records(xml_data, frozenset(elements), lazy)
+
+
+def _record(item, schema):
+    """
+    Converts the children of the element into a dictionary, using the
+    converter of the schema for known tags
+    """
+    data = dict()
+    for child in list(item):
+        data[child.tag] = schema.get(child.tag, _convert)(child.text)
+    return data
+
+
+class RawRecord(dict):
+    """
+    .. versionadded:: 0.5
+
+    A dictionary of the unconverted text of the tags of an element, as
+    returned by :func:`parse_xml` and :func:`iterparse_xml` when *lazy* is
+    True. The values are converted in the same way as the other records
+    using :func:`convert` and :func:`converted`.
+    """
+    def __init__(self, schema, *args, **kwargs):
+        super(RawRecord, self).__init__(*args, **kwargs)
+        self.schema = schema
+
+    def convert(self, tag):
+        """
+        :param tag: The tag to convert
+        :return: The converted value of *tag*
+        :raise: KeyError if the tag is not in the record
+        """
+        return self.schema.get(tag, _convert)(self[tag])
+
+    def converted(self):
+        """
+        :return: A dictionary with the converted values of all tags
+        """
+        return dict((tag, self.convert(tag)) for tag in self)
+
+
+def _raw_record(item, schema):
+    """Keeps the text of the children of the element, see :class:`RawRecord`"""
+    return RawRecord(schema, [(child.tag, child.text) for child in item])
+
+
+def _convert(value):
+    """
+    Converts the text of an element into a native Python type, classifying
+    the value from its first character instead of trying each conversion.
+    The result is the same as trying :func:`datetime.datetime.strptime` with
+    the format *%Y-%m-%d*, then splitting piped values, then converting
+    floats and integers.
+    """
+    if not value:
+        return ""
+
+    value = value.strip()
+    if '|' in value:  # Split piped values into a list
+        return [s.strip() for s in value.strip("|").split("|")]
+
+    if not value or not value[0].isdigit():
+        return value
+
+    if '-' in value:  # Convert date, matching as strptime would
+        match = _DATE.match(value)
+        if match is not None:
+            try:
+                return datetime.date(*[int(group) for group in match.groups()])
+            except ValueError:
+                pass
+        return value
+
+    match = _NUMBER.match(value)
+    if match is None:
+        return value
+    return float(value) if match.group(1) else int(value)
+
+
+def _text(value):
+    """Converts the text of an element into a string"""
+    return value.strip() if value else ""
+
+
+def _integer(value):
+    """Converts the text of an element into an int"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return _convert(value)
+
+
+def _float(value):
+    """Converts the text of an element into a float"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return _convert(value)
+
+
+def _date(value):
+    """Converts the text of an element of the format yyyy-mm-dd into a date"""
+    match = _DATE.match(_text(value))
+    if match is not None:
+        try:
+            return datetime.date(*[int(group) for group in match.groups()])
+        except ValueError:
+            pass
+    return _convert(value)
+
+
+def _boolean(value):
+    """Converts the text of an element of the value true or false into a bool"""
+    text = _text(value).lower()
+    if text in ('true', 'false'):
+        return text == 'true'
+    return _convert(value)
+
+
+def _list(value):
+    """Converts the text of an element into a list, splitting piped values"""
+    return [s.strip() for s in _text(value).split("|") if s.strip()]
+
+
+_EMPTY = dict()
+
+#: The converter used for each known tag of the Series, Episode, Actor and
+#: Banner elements. The data of other tags is converted by guessing its type.
+SCHEMAS = {
+    'Series': {
+        'id': _integer, 'seriesid': _integer, 'SeriesID': _integer,
+        'Actors': _list, 'Genre': _list, 'AliasNames': _list,
+        'Airs_DayOfWeek': _text, 'Airs_Time': _text, 'ContentRating': _text,
+        'FirstAired': _date, 'IMDB_ID': _text, 'Language': _text, 'language': _text,
+        'Network': _text, 'NetworkID': _text, 'Overview': _text,
+        'Rating': _float, 'RatingCount': _integer, 'Runtime': _integer,
+        'SeriesName': _text, 'Status': _text, 'added': _text,
+        'banner': _text, 'fanart': _text, 'poster': _text,
+        'lastupdated': _integer, 'zap2it_id': _text},
+    'Episode': {
+        'id': _integer, 'Combined_season': _integer, 'DVD_chapter': _integer,
+        'DVD_discid': _text, 'DVD_season': _integer,
+        'Director': _list, 'GuestStars': _list, 'Writer': _list,
+        'EpImgFlag': _integer, 'EpisodeName': _text, 'EpisodeNumber': _integer,
+        'FirstAired': _date, 'IMDB_ID': _text, 'Language': _text, 'Overview': _text,
+        'ProductionCode': _text, 'Rating': _float, 'RatingCount': _integer,
+        'SeasonNumber': _integer, 'absolute_number': _integer,
+        'airsafter_season': _integer, 'airsbefore_episode': _integer,
+        'airsbefore_season': _integer, 'filename': _text, 'lastupdated': _integer,
+        'seasonid': _integer, 'seriesid': _integer, 'thumb_added': _text,
+        'thumb_height': _integer, 'thumb_width': _integer},
+    'Actor': {
+        'id': _integer, 'Image': _text, 'Name': _text, 'SortOrder': _integer},
+    'Banner': {
+        'id': _integer, 'BannerPath': _text, 'BannerType': _text, 'BannerType2': _text,
+        'Colors': _list, 'Language': _text, 'Rating': _float, 'RatingCount': _integer,
+        'Season': _integer, 'SeriesName': _boolean, 'ThumbnailPath': _text,
+        'VignettePath': _text},
+}